@@ -0,0 +1,46 @@
+"""
+    Benchmark of the per-event cost of delivering gateway events to a client, comparing direct parser calls with
+    events sent through ``received_message`` as json and zlib-stream frames.
+
+    Run with ``python -m benchmarks.bench_gateway``
+"""
+import asyncio
+import time
+
+import discord
+from discord.ext import commands
+
+import discord.ext.test as dpytest
+from discord.ext.test import backend
+from discord.ext.test.websocket import WireFormat
+
+
+async def run(wire_format: WireFormat | None, number: int) -> float:
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    bot = commands.Bot(command_prefix="!", intents=intents)
+    await bot._async_setup_hook()
+    config = dpytest.configure(bot, members=10, wire_format=wire_format).runner
+    assert config is not None
+    channel = config.channels[0]
+    members = config.members
+
+    start = time.perf_counter()
+    for i in range(number):
+        backend.make_message(f"Message {i}", members[i % len(members)], channel)
+    elapsed = time.perf_counter() - start
+
+    await dpytest.empty_queue()
+    return elapsed
+
+
+def main(number: int = 20_000) -> None:
+    formats: tuple[WireFormat | None, ...] = (None, "json", "zlib-stream")
+    for wire_format in formats:
+        elapsed = asyncio.run(run(wire_format, number))
+        print(f"{wire_format or 'direct':>11}: {elapsed / number * 1e6:8.1f} us/event")
+
+
+if __name__ == "__main__":
+    main()
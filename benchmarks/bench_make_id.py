@@ -0,0 +1,38 @@
+"""
+    Micro-benchmark for snowflake generation, comparing the integer generator with the old implementation
+    that built ids from binary strings.
+
+    Run with ``python -m benchmarks.bench_make_id``
+"""
+import datetime as dt
+import timeit
+
+from discord.ext.test import factories
+
+_legacy_generated = 0
+
+
+def legacy_make_id() -> int:
+    global _legacy_generated
+    discord_epoch = str(bin(int(dt.datetime.now().timestamp() * 1000) - 1420070400000))[2:]
+    discord_epoch = "0" * (42 - len(discord_epoch)) + discord_epoch
+    generated = str(bin(_legacy_generated)[2:])
+    _legacy_generated = (_legacy_generated + 1) % 4096
+    generated = "0" * (12 - len(generated)) + generated
+    return int(discord_epoch + "00001" + "00000" + generated, 2)
+
+
+def main(number: int = 200_000) -> None:
+    seeded = factories.SnowflakeGenerator(seed=0)
+    cases = {
+        "legacy": legacy_make_id,
+        "make_id": factories.make_id,
+        "seeded": seeded,
+    }
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        print(f"{name:>8}: {best / number * 1e9:8.1f} ns/id")
+
+
+if __name__ == "__main__":
+    main()
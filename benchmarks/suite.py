@@ -0,0 +1,228 @@
+"""
+    Benchmark suite for dpytest's hot paths: configuring worlds of various sizes, message round trips, paging
+    channel history, reaction storms, verification throughput and attachment sends.
+
+    Each case runs several times with a fresh client, and the best and median time per operation are written as
+    JSON. When a baseline file exists, the results are compared to it, and the run fails if any case got slower
+    than the allowed ratio.
+
+    Run with ``python -m benchmarks.suite``, or ``inv bench``. Record a baseline with ``--save-baseline``.
+"""
+import argparse
+import asyncio
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, NamedTuple
+
+import discord
+from discord.ext import commands
+
+import discord.ext.test as dpytest
+from discord.ext.test import backend
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+
+class Case(NamedTuple):
+    """
+        A benchmark, timing ``number`` operations against a fresh client
+    """
+
+    name: str
+    func: Callable[[commands.Bot, int], Awaitable[float]]
+    number: int
+
+
+async def _make_bot() -> commands.Bot:
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    bot = commands.Bot(command_prefix="!", intents=intents)
+    await bot._async_setup_hook()
+
+    @bot.command()
+    async def ping(ctx: commands.Context[commands.Bot]) -> None:
+        await ctx.send("Pong !")
+
+    return bot
+
+
+def _configure(members: int, guilds: int = 1) -> Callable[[commands.Bot, int], Awaitable[float]]:
+    async def bench(bot: commands.Bot, number: int) -> float:
+        start = time.perf_counter()
+        for _ in range(number):
+            dpytest.configure(bot, guilds=guilds, text_channels=5, members=members)
+        return time.perf_counter() - start
+
+    return bench
+
+
+async def _message_round_trip(bot: commands.Bot, number: int) -> float:
+    dpytest.configure(bot, members=10)
+    start = time.perf_counter()
+    for _ in range(number):
+        await dpytest.message("!ping")
+        dpytest.get_message()
+    return time.perf_counter() - start
+
+
+async def _history_paging(bot: commands.Bot, number: int) -> float:
+    config = dpytest.configure(bot, members=10).runner
+    assert config is not None
+    channel = config.channels[0]
+    assert isinstance(channel, discord.TextChannel)
+    for i in range(1000):
+        backend.make_message(f"Message {i}", config.members[i % 10], channel)
+
+    start = time.perf_counter()
+    for _ in range(number):
+        assert len([m async for m in channel.history(limit=None)]) == 1000
+    return time.perf_counter() - start
+
+
+async def _reaction_storm(bot: commands.Bot, number: int) -> float:
+    config = dpytest.configure(bot, members=100).runner
+    assert config is not None
+    mes = await dpytest.message("React to me")
+    emojis = ["\N{THUMBS UP SIGN}", "\N{HEAVY BLACK HEART}", "\N{FACE WITH TEARS OF JOY}"]
+
+    start = time.perf_counter()
+    for i in range(number):
+        await dpytest.add_reaction(config.members[i % 100], mes, emojis[i % 3])
+    return time.perf_counter() - start
+
+
+async def _verify_throughput(bot: commands.Bot, number: int) -> float:
+    config = dpytest.configure(bot).runner
+    assert config is not None
+    channel = config.channels[0]
+    assert isinstance(channel, discord.TextChannel)
+    for i in range(number):
+        await channel.send(f"Message {i}")
+
+    start = time.perf_counter()
+    for i in range(number):
+        assert dpytest.verify().message().content(f"Message {i}")
+    return time.perf_counter() - start
+
+
+async def _attachment_send(bot: commands.Bot, number: int) -> float:
+    config = dpytest.configure(bot).runner
+    assert config is not None
+    channel = config.channels[0]
+    assert isinstance(channel, discord.TextChannel)
+    payload = b"x" * 64 * 1024
+
+    start = time.perf_counter()
+    for i in range(number):
+        await channel.send(file=discord.File(io.BytesIO(payload), f"file_{i}.bin"))
+    elapsed = time.perf_counter() - start
+    await dpytest.empty_queue()
+    # dat files are created when using attachments
+    for path in Path('.').glob('dpytest_*.dat'):
+        path.unlink(missing_ok=True)
+    return elapsed
+
+
+CASES = [
+    Case("configure_10_members", _configure(10), 20),
+    Case("configure_1000_members", _configure(1000), 5),
+    Case("configure_10_guilds_100_members", _configure(100, guilds=10), 5),
+    Case("message_round_trip", _message_round_trip, 500),
+    Case("history_paging_1000", _history_paging, 20),
+    Case("reaction_storm", _reaction_storm, 500),
+    Case("verify_throughput", _verify_throughput, 1000),
+    Case("attachment_send_64k", _attachment_send, 200),
+]
+
+
+async def _run_once(case: Case, number: int) -> float:
+    bot = await _make_bot()
+    try:
+        return await case.func(bot, number)
+    finally:
+        await dpytest.empty_queue()
+
+
+def run_case(case: Case, repeat: int, scale: float = 1.0) -> dict[str, Any]:
+    """
+        Time a case, with a fresh client and event loop for every repeat
+
+    :param case: Case to run
+    :param repeat: How many times to run it
+    :param scale: Factor applied to the number of operations per run
+    :return: JSON-ready result, with times per operation in microseconds
+    """
+    number = max(1, int(case.number * scale))
+    times = [asyncio.run(_run_once(case, number)) / number * 1e6 for _ in range(repeat)]
+    return {"number": number, "repeat": repeat, "best_us": min(times), "median_us": statistics.median(times)}
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """
+        Compare results to a baseline, using the best time of each case
+
+    :param results: Results of this run
+    :param baseline: Results to compare to
+    :param threshold: Largest allowed ratio of this run's time to the baseline's
+    :return: Description of every case that got slower than allowed
+    """
+    regressions = []
+    for name, result in results["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None:
+            continue
+        ratio = result["best_us"] / base["best_us"]
+        result["baseline_us"] = base["best_us"]
+        result["ratio"] = ratio
+        if ratio > threshold:
+            regressions.append(f"{name}: {result['best_us']:.1f}us vs {base['best_us']:.1f}us ({ratio:.2f}x)")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case")
+    parser.add_argument("--scale", type=float, default=1.0, help="Factor applied to the operations per run")
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"), help="File to write results to")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline to compare to")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Largest allowed ratio of a case's time to its baseline")
+    args = parser.parse_args(argv)
+
+    results: dict[str, Any] = {
+        "python": platform.python_version(),
+        "discord.py": discord.__version__,
+        "platform": platform.platform(),
+        "cases": {},
+    }
+    for case in CASES:
+        if args.filter not in case.name:
+            continue
+        result = results["cases"][case.name] = run_case(case, args.repeat, args.scale)
+        print(f"{case.name:<34}{result['best_us']:>12.1f} us/op (median {result['median_us']:.1f})")
+
+    regressions: list[str] = []
+    if args.baseline.exists() and not args.save_baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+
+    args.output.write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+    if regressions:
+        print(f"Slower than the baseline by more than {args.threshold}x:")
+        print("\n".join(f"    {line}" for line in regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,9 @@ from . import backend as backend
 
 from .runner import *
 
+from .session import Session as Session
+from .session import get_session as get_session
+
 from .utils import embed_eq as embed_eq
 from .utils import activity_eq as activity_eq
 from .utils import embed_proxy_eq as embed_proxy_eq
@@ -18,3 +21,36 @@ from .verify import verify as verify
 from .verify import Verify as Verify
 from .verify import VerifyMessage as VerifyMessage
 from .verify import VerifyActivity as VerifyActivity
+
+from .replay import load_trace as load_trace
+from .replay import replay_trace as replay_trace
+from .replay import ReplayReport as ReplayReport
+
+from .recorder import ActivityRecorder as ActivityRecorder
+from .recorder import recording as recording
+from .recorder import start_recording as start_recording
+from .recorder import stop_recording as stop_recording
+
+from .latency import LatencyTracker as LatencyTracker
+from .latency import track_latency as track_latency
+from .latency import stop_tracking_latency as stop_tracking_latency
+
+from .ratelimit import RateLimiter as RateLimiter
+from .ratelimit import RouteLimit as RouteLimit
+from .ratelimit import enable_rate_limits as enable_rate_limits
+from .ratelimit import disable_rate_limits as disable_rate_limits
+
+from .network import Fixed as Fixed
+from .network import Uniform as Uniform
+from .network import LogNormal as LogNormal
+from .network import Histogram as Histogram
+from .network import NetworkConditions as NetworkConditions
+from .network import simulate_network as simulate_network
+from .network import stop_simulating_network as stop_simulating_network
+
+from .load import LoadReport as LoadReport
+from .load import generate_load as generate_load
+
+from .stream import BotAction as BotAction
+from .stream import EventStream as EventStream
+from .stream import events as events
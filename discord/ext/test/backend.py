@@ -8,28 +8,151 @@
 """
 
 import asyncio
+import bisect
+import copy
+import itertools
 import sys
+import types
 import logging
 import re
-import datetime
 
 import discord
 import discord.http as dhttp
+from discord.shard import Shard
 import pathlib
 import urllib.parse
 import urllib.request
 
 from discord.types import member
 from requests import Response
-from typing import NamedTuple, Any, ClassVar, NoReturn, Literal, Pattern, overload, Sequence, Iterable
+from typing import (NamedTuple, Any, ClassVar, NoReturn, Literal, Pattern, overload, Sequence, Iterable, Callable,
+                    Coroutine)
 
-from . import factories as facts, state as dstate, callbacks, websocket, _types
+from . import factories as facts, state as dstate, callbacks, latency, websocket, _types
 from ._types import Undef, undefined
+from .session import Session, get_session
 from discord.types.snowflake import Snowflake
 
 from .callbacks import CallbackEvent
 
 
+class LazyMember(NamedTuple):
+    """
+        A compact row for a guild member that the client hasn't seen yet. Rows are only turned into
+        a ``discord.Member`` once the bot touches them, see :py:func:`materialize_member`
+    """
+    id: int
+    name: str
+    discriminator: str
+    nick: str | None
+    roles: tuple[int, ...] = ()
+
+
+class MemberIndex:
+    """
+        Usernames and nicknames of a guild's members, materialized or not, sorted for prefix search like
+        discord's member search, and their IDs sorted for paging through them. Built when a guild is first
+        searched or paged, then kept up to date as members join, change names and leave, see
+        :py:func:`update_member_index`
+    """
+
+    def __init__(self, guild: discord.Guild, rows: Iterable[LazyMember] = ()) -> None:
+        # Member ID -> casefolded username and nickname, as currently indexed
+        self.members: dict[int, tuple[str, str | None]] = {}
+        for row in rows:
+            self.members[row.id] = (row.name.casefold(), row.nick.casefold() if row.nick else None)
+        for mem in guild.members:
+            self.members[mem.id] = (mem.name.casefold(), mem.nick.casefold() if mem.nick else None)
+        entries = []
+        for id_num, (name, nick) in self.members.items():
+            entries.append((name, id_num))
+            if nick:
+                entries.append((nick, id_num))
+        entries.sort()
+        self.names = [name for name, _ in entries]
+        self.ids = [id_num for _, id_num in entries]
+        self.member_ids = sorted(self.members)
+
+    def _insert(self, name: str, id_num: int) -> None:
+        lo = bisect.bisect_left(self.names, name)
+        pos = bisect.bisect_left(self.ids, id_num, lo, bisect.bisect_right(self.names, name, lo))
+        self.names.insert(pos, name)
+        self.ids.insert(pos, id_num)
+
+    def _delete(self, name: str, id_num: int) -> None:
+        lo = bisect.bisect_left(self.names, name)
+        pos = bisect.bisect_left(self.ids, id_num, lo, bisect.bisect_right(self.names, name, lo))
+        del self.names[pos]
+        del self.ids[pos]
+
+    def update(self, id_num: int, name: str, nick: str | None) -> None:
+        """
+            Index a member under new names, replacing its old ones. Does nothing if the names didn't change.
+
+        :param id_num: ID of the member
+        :param name: Username of the member
+        :param nick: Nickname of the member, or None
+        """
+        names = (name.casefold(), nick.casefold() if nick else None)
+        old = self.members.get(id_num)
+        if old == names:
+            return
+        if old is None:
+            bisect.insort(self.member_ids, id_num)
+        else:
+            self._unindex(id_num, old)
+        self.members[id_num] = names
+        self._insert(names[0], id_num)
+        if names[1]:
+            self._insert(names[1], id_num)
+
+    def remove(self, id_num: int) -> None:
+        """
+            Stop indexing a member, if it is
+
+        :param id_num: ID of the member
+        """
+        old = self.members.pop(id_num, None)
+        if old is None:
+            return
+        self._unindex(id_num, old)
+        del self.member_ids[bisect.bisect_left(self.member_ids, id_num)]
+
+    def _unindex(self, id_num: int, names: tuple[str, str | None]) -> None:
+        self._delete(names[0], id_num)
+        if names[1]:
+            self._delete(names[1], id_num)
+
+    def search(self, query: str, limit: int = 0) -> list[int]:
+        """
+            Find the members whose username or nickname starts with a query, ignoring case
+
+        :param query: Prefix to search for
+        :param limit: Most members to find, or 0 for no limit
+        :return: IDs of the matching members, in order of the name that matched
+        """
+        query = query.casefold()
+        found: dict[int, None] = {}
+        for pos in range(bisect.bisect_left(self.names, query), len(self.names)):
+            if not self.names[pos].startswith(query):
+                break
+            found[self.ids[pos]] = None
+            if limit and len(found) >= limit:
+                break
+        return list(found)
+
+    def page(self, limit: int, after: int = 0) -> list[int]:
+        """
+            Get a page of member IDs, in ascending order
+
+        :param limit: Most IDs to get
+        :param after: Only get IDs greater than this
+        :return: IDs of the members in the page
+        """
+        start = bisect.bisect_right(self.member_ids, after)
+        return self.member_ids[start:start + limit]
+
+
 class BackendState(NamedTuple):
     """
         The dpytest backend, with all the state it needs to hold to be able to pretend to be
@@ -37,10 +160,41 @@ class BackendState(NamedTuple):
     """
     messages: dict[int, list[_types.message.Message]]
     state: dstate.FakeState
+    lazy_members: dict[int, dict[int, LazyMember]]
+    member_indexes: dict[int, MemberIndex]
+    guilds: dict[int, discord.Guild]
+    channel_guilds: dict[int, int]
+    users: dict[int, discord.user.BaseUser]
+    permissions: dict[int, dict[tuple[int, int], int]]
+
+
+class BackendSnapshot(NamedTuple):
+    """
+        A cheap record of the backend world at one point in time, used to reset it in between tests.
+        See :py:func:`take_snapshot` and :py:func:`restore_snapshot`
+    """
+    guilds: dict[int, _types.guild.Guild]
+    channels: dict[int, dict[int, _types.channel.Channel]]
+    roles: dict[int, dict[int, _types.role.Role]]
+    members: dict[int, dict[int, tuple[tuple[int, ...], str | None]]]
+    lazy_members: dict[int, dict[int, LazyMember]]
+    # Only recorded for seeded sessions, so ids and random choices after a reset don't depend on earlier tests
+    ids: facts.SnowflakeGenerator | None = None
+    rng: tuple[Any, ...] | None = None
 
 
 log = logging.getLogger("discord.ext.tests")
-_cur_config: BackendState | None = None
+
+
+# Most members and guilds discord returns per page
+MAX_MEMBERS_PAGE = 1000
+MAX_GUILDS_PAGE = 200
+
+# Code of wrappers around FakeHttp methods, which _get_higher_locs looks past to find their real caller
+transparent_frames: set[types.CodeType] = set()
+
+HttpRoute = Callable[..., Coroutine[Any, Any, Any]]
+HttpMiddleware = Callable[[str, HttpRoute], HttpRoute]
 
 
 def _get_higher_locs(num: int) -> dict[str, Any]:
@@ -51,12 +205,32 @@ def _get_higher_locs(num: int) -> dict[str, Any]:
     :param num: How many calls up to retrieve from
     :return: The local variables of that call, as a dictionary
     """
-    frame = sys._getframe(num + 1)
+    frame = sys._getframe(1)
+    for _ in range(num):
+        frame = frame.f_back  # type: ignore[assignment]
+        while frame.f_code in transparent_frames:
+            frame = frame.f_back  # type: ignore[assignment]
     locs = frame.f_locals
     del frame
     return locs
 
 
+def _message_id(data: _types.message.Message) -> int:
+    return int(data["id"])
+
+
+def _in_session(http: 'FakeHttp', func: HttpRoute) -> HttpRoute:
+    """
+        Wrap a route so it always runs in the session of its client, wherever it was called from
+    """
+    async def session_http(*args: Any, **kwargs: Any) -> Any:
+        with http.session.activate():
+            return await func(*args, **kwargs)
+
+    transparent_frames.add(session_http.__code__)
+    return session_http
+
+
 class FakeRequest(Response):
     """
         A fake web response, for use with discord ``HTTPException``s
@@ -73,18 +247,61 @@ class FakeHttp(dhttp.HTTPClient):
     """
         A mock implementation of an ``HTTPClient``. Instead of actually sending requests to discord, it triggers
         a runner callback and calls the ``dpytest`` backend to update any necessary state and trigger any necessary
-        fake messages to the client.
+        fake messages to the client. Routes always run in the session of the client, wherever they're called from.
     """
     fileno: ClassVar[int] = 0
     state: dstate.FakeState
+    session: Session
+    middleware: list[HttpMiddleware]
 
     def __init__(self, loop: asyncio.AbstractEventLoop | None = None) -> None:
         if loop is None:
             loop = asyncio.get_event_loop()
 
         self.state = None  # type: ignore[assignment]
+        self.session = get_session()
+        self.middleware = []
 
         super().__init__(connector=None, loop=loop)
+        self._apply_middleware()
+
+    @classmethod
+    def routes(cls) -> list[str]:
+        """
+            Names of all the routes this fake serves
+
+        :return: Names of the coroutine methods standing in for discord routes
+        """
+        return [name for name, value in vars(cls).items()
+                if asyncio.iscoroutinefunction(value) and not name.startswith("_") and name != "request"]
+
+    def add_middleware(self, middleware: HttpMiddleware) -> None:
+        """
+            Wrap every route of this instance. Middleware gets the name of a route and the coroutine function
+            serving it, and returns a replacement. Wrappers must be registered in ``transparent_frames``.
+            Middleware added later wraps that added before.
+
+        :param middleware: Middleware to add
+        """
+        self.middleware.append(middleware)
+        self._apply_middleware()
+
+    def remove_middleware(self, middleware: HttpMiddleware) -> None:
+        """
+            Stop wrapping the routes of this instance with some middleware
+
+        :param middleware: Middleware to remove
+        """
+        self.middleware.remove(middleware)
+        self._apply_middleware()
+
+    def _apply_middleware(self) -> None:
+        for name in self.routes():
+            self.__dict__.pop(name, None)
+            func = getattr(self, name)
+            for middleware in self.middleware:
+                func = middleware(name, func)
+            setattr(self, name, _in_session(self, func))
 
     async def request(
             self,
@@ -152,14 +369,10 @@ class FakeHttp(dhttp.HTTPClient):
     async def get_channel(self, channel_id: Snowflake) -> _types.channel.Channel:
         await callbacks.dispatch_event(CallbackEvent.get_channel, channel_id)
 
-        find = None
-        for guild in get_state().guilds:
-            for channel in guild.channels:
-                if channel.id == channel_id:
-                    find = facts.dict_from_object(channel)
-        if find is None:
+        channel = find_channel(int(channel_id))
+        if channel is None:
             raise discord.errors.NotFound(FakeRequest(404, "Not Found"), "Unknown Channel")
-        return find
+        return facts.dict_from_object(channel)
 
     async def start_private_message(self, user_id: Snowflake) -> _types.channel.DMChannel:
         locs = _get_higher_locs(1)
@@ -180,6 +393,8 @@ class FakeHttp(dhttp.HTTPClient):
         poll = locs["poll"]
 
         payload = params.payload
+        reference = payload.get("message_reference") if payload else None
+        latency.note_reply(int(reference["message_id"]) if reference and reference.get("message_id") else None)
 
         embeds = []
         attachments = []
@@ -195,6 +410,14 @@ class FakeHttp(dhttp.HTTPClient):
             if payload.get("embeds"):
                 embeds = [discord.Embed.from_dict(e) for e in payload.get("embeds", [])]
 
+        user = self.state.user
+        required = ["send_messages"]
+        if embeds:
+            required.append("embed_links")
+        if params.files:
+            required.append("attach_files")
+        check_permissions(channel, user, *required)
+
         # ATTACHMENTS
         if params.files:
             paths = []
@@ -208,14 +431,6 @@ class FakeHttp(dhttp.HTTPClient):
                 paths.append((path, file.filename))
             attachments = list(map(lambda x: make_attachment(*x), paths))
 
-        user = self.state.user
-        if channel.guild:
-            perm = channel.permissions_for(channel.guild.get_member(user.id))
-        else:
-            perm = channel.permissions_for(user)
-        if not (perm.send_messages or perm.administrator):
-            raise discord.errors.Forbidden(FakeRequest(403, "missing send_messages"), "send_messages")
-
         message = make_message(channel=channel, author=self.state.user,
                                content=content,
                                tts=tts,
@@ -238,6 +453,8 @@ class FakeHttp(dhttp.HTTPClient):
                              reason: str | None = None) -> None:
         locs = _get_higher_locs(1)
         message = locs["self"]
+        if message.author.id != self.state.user.id:
+            check_permissions(message.channel, self.state.user, "manage_messages")
 
         await callbacks.dispatch_event(CallbackEvent.delete_message, message.channel, message, reason=reason)
 
@@ -250,6 +467,7 @@ class FakeHttp(dhttp.HTTPClient):
 
         await callbacks.dispatch_event(CallbackEvent.edit_message, message.channel, message, fields)
 
+        latency.note_reply()
         return edit_message(message, **fields)
 
     async def add_reaction(self, channel_id: Snowflake, message_id: Snowflake,
@@ -261,6 +479,12 @@ class FakeHttp(dhttp.HTTPClient):
         user = locs.get("member", self.state.user)
 
         emoji = emoji  # TODO: Turn this back into class?
+        # Adding to a reaction that's already there doesn't need add_reactions
+        partial = _reaction_emoji(emoji)
+        if any(_same_emoji(_reaction_emoji(str(r.emoji)), partial) for r in message.reactions):
+            check_permissions(message.channel, user, "read_message_history")
+        else:
+            check_permissions(message.channel, user, "read_message_history", "add_reactions")
 
         await callbacks.dispatch_event(CallbackEvent.add_reaction, message, emoji)
 
@@ -272,6 +496,8 @@ class FakeHttp(dhttp.HTTPClient):
         locs = _get_higher_locs(1)
         message = locs["self"]
         member = locs["member"]
+        if member.id != self.state.user.id:
+            check_permissions(message.channel, self.state.user, "manage_messages")
 
         await callbacks.dispatch_event(CallbackEvent.remove_reaction, message, emoji, member)
 
@@ -290,6 +516,7 @@ class FakeHttp(dhttp.HTTPClient):
     async def clear_reactions(self, channel_id: Snowflake, message_id: Snowflake) -> None:
         locs = _get_higher_locs(1)
         message = locs["self"]
+        check_permissions(message.channel, self.state.user, "manage_messages")
         clear_reactions(message)
 
     async def get_message(self, channel_id: Snowflake,
@@ -316,21 +543,21 @@ class FakeHttp(dhttp.HTTPClient):
         locs = _get_higher_locs(1)
         channel = locs["self"]
 
-        await callbacks.dispatch_event(CallbackEvent.logs_from, channel, limit, before=None, after=None, around=None)
+        await callbacks.dispatch_event(CallbackEvent.logs_from, channel, limit, before=before, after=after,
+                                       around=around)
 
-        messages = get_config().messages[int(channel_id)]
+        # Messages are stored oldest first, and discord returns each page newest first
+        messages = get_config().messages.get(int(channel_id), [])
         if after is not None:
-            start = next(i for i, v in enumerate(messages) if v["id"] == after)
-            return messages[start:start + limit]
+            start = bisect.bisect_right(messages, int(after), key=_message_id)
+            page = messages[start:start + limit]
         elif around is not None:
-            start = next(i for i, v in enumerate(messages) if v["id"] == around)
-            return messages[start - limit // 2:start + limit // 2]
+            middle = bisect.bisect_left(messages, int(around), key=_message_id)
+            page = messages[max(0, middle - limit // 2):middle + (limit + 1) // 2]
         else:
-            if before is None:
-                start = len(messages)
-            else:
-                start = next(i for i, v in enumerate(messages) if v["id"] == before)
-            return messages[start - limit:start]
+            end = len(messages) if before is None else bisect.bisect_left(messages, int(before), key=_message_id)
+            page = messages[max(0, end - limit):end]
+        return page[::-1]
 
     async def kick(self, user_id: Snowflake, guild_id: Snowflake,
                    reason: str | None = None) -> None:
@@ -379,22 +606,35 @@ class FakeHttp(dhttp.HTTPClient):
 
         await callbacks.dispatch_event(CallbackEvent.edit_member, fields, member, reason=reason)
         member = update_member(member, nick=fields.get('nick'), roles=fields.get('roles'))
+        row = get_config().lazy_members.get(member.guild.id, {}).get(member.id)
+        if row is not None:
+            return _lazy_member_dict(row)
         return facts.dict_from_object(member)
 
     async def get_members(
         self, guild_id: Snowflake, limit: int, after: Snowflake | None
     ) -> list[member.MemberWithUser]:
-        locs = _get_higher_locs(1)
-        guild = locs["self"]
-        return list(map(facts.dict_from_object, guild.members))
+        guild = get_config().guilds.get(int(guild_id))
+        if guild is None:
+            raise discord.errors.NotFound(FakeRequest(404, "Not Found"), "Unknown Guild")
+        limit = max(1, min(limit, MAX_MEMBERS_PAGE))
+
+        rows = get_config().lazy_members.get(guild.id, {})
+        out: list[member.MemberWithUser] = []
+        for user_id in member_index(guild).page(limit, int(after or 0)):
+            mem = guild.get_member(user_id)
+            # Members the bot hasn't touched yet are served straight from their rows, like discord doesn't
+            # cache the results of a fetch either
+            out.append(facts.dict_from_object(mem) if mem is not None else _lazy_member_dict(rows[user_id]))
+        return out
 
     async def get_member(self, guild_id: Snowflake,
                          member_id: Snowflake) -> _types.member.MemberWithUser:
         locs = _get_higher_locs(1)
         guild: discord.Guild = locs["self"]
-        member = discord.utils.get(guild.members, id=member_id)
+        member = materialize_member(guild, int(member_id))
         if member is None:
-            raise ValueError(f"No member {member_id} in guild {guild_id}")
+            raise discord.errors.NotFound(FakeRequest(404, "Not Found"), "Unknown Member")
 
         return facts.dict_from_object(member)
 
@@ -441,6 +681,7 @@ class FakeHttp(dhttp.HTTPClient):
 
         for pair in positions:
             guild._roles[pair["id"]].position = pair["position"]
+        facts.invalidate(guild.id)
         return list(guild._roles.values())
 
     async def add_role(self, guild_id: Snowflake, user_id: Snowflake,
@@ -451,8 +692,7 @@ class FakeHttp(dhttp.HTTPClient):
 
         await callbacks.dispatch_event(CallbackEvent.add_role, member, role, reason=reason)
 
-        roles = [role] + [x for x in member.roles if x.id != member.guild.id]
-        update_member(member, roles=roles)
+        update_members([member], add=[role])
 
     async def remove_role(self, guild_id: Snowflake, user_id: Snowflake,
                           role_id: Snowflake, *,
@@ -463,8 +703,7 @@ class FakeHttp(dhttp.HTTPClient):
 
         await callbacks.dispatch_event(CallbackEvent.remove_role, member, role, reason=reason)
 
-        roles = [x for x in member.roles if x != role and x.id != member.guild.id]
-        update_member(member, roles=roles)
+        update_members([member], remove=[role])
 
     async def application_info(self) -> _types.appinfo.AppInfo:
         # TODO: make these values configurable
@@ -495,13 +734,7 @@ class FakeHttp(dhttp.HTTPClient):
         channel: discord.TextChannel = locs["self"]
         target = locs["target"]
 
-        user = self.state.user
-        member = channel.guild.get_member(user.id)
-        if member is None:
-            raise RuntimeError(f"Couldn't find user {user.id} in guild {channel.guild.id}")
-        perm: discord.Permissions = channel.permissions_for(member)
-        if not (perm.administrator or perm.manage_permissions):
-            raise discord.errors.Forbidden(FakeRequest(403, "missing manage_roles"), "manage_roles")
+        check_permissions(channel, self.state.user, "manage_roles")
 
         update_text_channel(channel, target, None)
 
@@ -519,13 +752,7 @@ class FakeHttp(dhttp.HTTPClient):
         channel: discord.TextChannel = locs["self"]
         target = locs["target"]
 
-        user = self.state.user
-        member = channel.guild.get_member(user.id)
-        if member is None:
-            raise RuntimeError(f"Couldn't find user {user.id} in guild {channel.guild.id}")
-        perm: discord.Permissions = channel.permissions_for(member)
-        if not (perm.administrator or perm.manage_permissions):
-            raise discord.errors.Forbidden(FakeRequest(403, "missing manage_roles"), "manage_roles")
+        check_permissions(channel, self.state.user, "manage_roles")
 
         ovr = discord.PermissionOverwrite.from_pair(discord.Permissions(int(allow_value)),
                                                     discord.Permissions(int(deny_value)))
@@ -539,24 +766,32 @@ class FakeHttp(dhttp.HTTPClient):
 
     async def get_user(self, user_id: Snowflake) -> _types.user.User:
         # return self.request(Route('GET', '/users/{user_id}', user_id=user_id))
-        locs = _get_higher_locs(1)
-        client: discord.Client = locs["self"]
-        guild = client.guilds[0]
-        member = discord.utils.get(guild.members, id=user_id)
-        if member is None:
-            raise ValueError(f"Failed to locate user {user_id} in test state")
-        return facts.dict_from_object(member._user)
+        user = get_config().users.get(int(user_id))
+        if user is not None:
+            return facts.dict_from_object(user)
+        # Users only known as lazy members are served from their rows, without caching them
+        for rows in get_config().lazy_members.values():
+            row = rows.get(int(user_id))
+            if row is not None:
+                return _lazy_member_dict(row)['user']
+        raise discord.errors.NotFound(FakeRequest(404, "Not Found"), "Unknown User")
 
     async def pin_message(self, channel_id: Snowflake, message_id: Snowflake,
                           reason: str | None = None) -> None:
         # return self.request(Route('PUT', '/channels/{channel_id}/pins/{message_id}',
         #                          channel_id=channel_id, message_id=message_id), reason=reason)
+        channel = find_channel(int(channel_id))
+        if channel is not None:
+            check_permissions(channel, self.state.user, "manage_messages")
         pin_message(channel_id, message_id)
 
     async def unpin_message(self, channel_id: Snowflake, message_id: Snowflake,
                             reason: str | None = None) -> None:
         # return self.request(Route('DELETE', '/channels/{channel_id}/pins/{message_id}',
         #                          channel_id=channel_id, message_id=message_id), reason=reason)
+        channel = find_channel(int(channel_id))
+        if channel is not None:
+            check_permissions(channel, self.state.user, "manage_messages")
         unpin_message(channel_id, message_id)
 
     async def get_guilds(self, limit: int, before: Snowflake | None = None,
@@ -570,30 +805,27 @@ class FakeHttp(dhttp.HTTPClient):
             after=after,
             with_counts=with_counts,
         )
-        guilds = get_state().guilds  # List[]
-
-        guilds_new = [facts.dict_from_object(guild) for guild in guilds]
-
-        if not limit:
-            limit = 100
-        if after is not None:
-            start = next(i for i, v in enumerate(guilds) if v.id == after)
-            return guilds_new[start:start + limit]
+        guilds = get_config().guilds
+        # Guild IDs are made in order, so this is close to linear
+        ids = sorted(guilds)
+        limit = max(1, min(limit or MAX_GUILDS_PAGE, MAX_GUILDS_PAGE))
+
+        if before is not None and after is None:
+            end = bisect.bisect_left(ids, int(before))
+            page = ids[max(0, end - limit):end]
         else:
-            if before is None:
-                start = int(len(guilds) / 2)
-            else:
-                start = next(i for i, v in enumerate(guilds) if v.id == before)
-            return guilds_new[start - limit: start]
+            start = bisect.bisect_right(ids, int(after or 0))
+            page = ids[start:start + limit]
+            if before is not None:
+                page = page[:bisect.bisect_left(page, int(before))]
+        return [facts.dict_from_object(guilds[guild_id]) for guild_id in page]
 
     async def get_guild(self, guild_id: Snowflake, *, with_counts: bool = True) -> _types.guild.Guild:
         # return self.request(Route('GET', '/guilds/{guild_id}', guild_id=guild_id))
         # TODO: Respect with_counts
-        locs = _get_higher_locs(1)
-        client: discord.Client = locs["self"]
-        guild = discord.utils.get(client.guilds, id=guild_id)
+        guild = get_config().guilds.get(int(guild_id))
         if guild is None:
-            raise RuntimeError(f"Couldn't find guild with ID {guild_id} in test client")
+            raise discord.errors.NotFound(FakeRequest(404, "Not Found"), "Unknown Guild")
         return facts.dict_from_object(guild)
 
 
@@ -603,15 +835,99 @@ def get_state() -> dstate.FakeState:
 
     :return: Current backend state
     """
-    if _cur_config is None:
-        raise ValueError("Dpytest backend not configured")
-    return _cur_config.state
+    return get_config().state
 
 
 def get_config() -> BackendState:
-    if _cur_config is None:
+    config = get_session().backend
+    if config is None:
         raise ValueError("Dpytest backend not configured")
-    return _cur_config
+    return config
+
+
+def find_channel(channel_id: int) -> discord.abc.GuildChannel | None:
+    """
+        Find a guild channel by ID, in any guild of the backend
+
+    :param channel_id: ID of the channel
+    :return: The channel, or None if there's no such channel
+    """
+    guild = get_config().guilds.get(get_config().channel_guilds.get(channel_id, 0))
+    if guild is None:
+        return None
+    return guild.get_channel(channel_id)
+
+
+def permissions_for(channel: _types.AnyChannel, user: discord.user.BaseUser | discord.abc.User) -> discord.Permissions:
+    """
+        Get the permissions of a user in a channel, like ``channel.permissions_for``. In guilds they are cached
+        per channel and member, until roles, member roles, channel overwrites or the guild change.
+
+    :param channel: Channel to get the permissions in
+    :param user: User or member to get the permissions of
+    :return: Permissions of the user, or none if they aren't in the channel's guild
+    """
+    guild: discord.Guild | None = getattr(channel, "guild", None)
+    if guild is None:
+        return channel.permissions_for(user)  # type: ignore[arg-type]
+
+    cache = get_config().permissions.setdefault(guild.id, {})
+    key = (channel.id, user.id)
+    value = cache.get(key)
+    if value is None:
+        member = user if isinstance(user, discord.Member) else guild.get_member(user.id)
+        if member is None:
+            return discord.Permissions.none()
+        value = cache[key] = channel.permissions_for(member).value
+    return discord.Permissions(value)
+
+
+def check_permissions(channel: _types.AnyChannel, user: discord.user.BaseUser | discord.abc.User,
+                      *names: str) -> None:
+    """
+        Check a user has permissions in a channel, raising ``Forbidden`` like discord does if they don't
+
+    :param channel: Channel to check the permissions in
+    :param user: User or member to check
+    :param names: Names of the permissions needed, as on ``discord.Permissions``
+    """
+    perm = permissions_for(channel, user)
+    if perm.administrator:
+        return
+    for name in names:
+        if not getattr(perm, name):
+            raise discord.errors.Forbidden(FakeRequest(403, f"missing {name}"), name)
+
+
+def invalidate_permissions(guild_id: int | None = None) -> None:
+    """
+        Drop the cached permissions of a guild's members, so they are resolved again when next checked
+
+    :param guild_id: ID of the guild, or None for every guild
+    """
+    config = get_session().backend
+    if config is None:
+        return
+    if guild_id is None:
+        config.permissions.clear()
+    else:
+        config.permissions.pop(guild_id, None)
+
+
+def _index_guild(guild: discord.Guild) -> None:
+    config = get_config()
+    config.guilds[guild.id] = guild
+    for channel in guild.channels:
+        config.channel_guilds[channel.id] = guild.id
+    for mem in guild.members:
+        config.users[mem.id] = mem._user
+
+
+def _unindex_guild(guild: discord.Guild) -> None:
+    config = get_config()
+    config.guilds.pop(guild.id, None)
+    for channel in guild.channels:
+        config.channel_guilds.pop(channel.id, None)
 
 
 def make_guild(
@@ -630,11 +946,17 @@ def make_guild(
     :param channels: Existing channels in the guild or None
     :param roles: Existing roles in the guild or None
     :param owner: Whether the configured client owns the guild, default is false
-    :param id_num: ID of the guild, or nothing to auto-generate
-    :return: Newly created guild
+    :param id_num: ID of the guild, or nothing to auto-generate one on a shard the client runs
+    :return: Newly created guild. If it is on a shard the client doesn't run, it only exists in the backend,
+             and the client never hears about it.
     """
+    state = get_state()
+    client = state._get_client()
     if id_num == -1:
-        id_num = facts.make_id()
+        if isinstance(client, discord.AutoShardedClient) and client.shard_count:
+            id_num = facts.make_shard_id(client.shards, client.shard_count)
+        else:
+            id_num = facts.make_id()
     if roles is None:
         roles = [facts.make_role_dict("@everyone", id_num, position=0)]
     if channels is None:
@@ -643,17 +965,20 @@ def make_guild(
         members = []
     member_count = len(members) if len(members) != 0 else 1
 
-    state = get_state()
-
     owner_id = state.user.id if owner else 0
 
     data: _types.guild.Guild = facts.make_guild_dict(
         name, owner_id, roles, id_num=id_num, member_count=member_count, members=members, channels=channels
     )
 
-    state.parse_guild_create(data)
+    state.receive_event("GUILD_CREATE", data)
 
-    return state._get_guild(id_num)  # type: ignore[return-value]
+    guild = state._get_guild(id_num)
+    if guild is None:
+        # On a shard the client doesn't run, so the event never reached it
+        guild = discord.Guild(data=data, state=state)
+    _index_guild(guild)
+    return guild
 
 
 def update_guild(guild: discord.Guild, roles: list[discord.Role] | None = None) -> discord.Guild:
@@ -671,7 +996,7 @@ def update_guild(guild: discord.Guild, roles: list[discord.Role] | None = None)
         data["roles"] = list(map(facts.dict_from_object, roles))
 
     state = get_state()
-    state.parse_guild_update(data)
+    state.receive_event("GUILD_UPDATE", data)
 
     return guild
 
@@ -714,7 +1039,7 @@ def make_role(
     }
 
     state = get_state()
-    state.parse_guild_role_create(data)
+    state.receive_event("GUILD_ROLE_CREATE", data)
 
     return guild.get_role(int(r_dict["id"]))  # type: ignore[return-value]
 
@@ -743,28 +1068,15 @@ def update_role(
     :param name: New name for the role
     :return: Role that was updated
     """
+    if color is not None:
+        colour = color
     data: _types.gateway._GuildRoleEvent = {
         "guild_id": role.guild.id,
-        "role": facts.dict_from_object(role),
+        "role": facts.make_role_update_dict(role, colour, colors, permissions, hoist, mentionable, name),
     }
-    if color is not None:
-        colour = color
-    if colour is not None:
-        data["role"]["color"] = colour
-    if colors is not None:
-        data["role"]["colors"] = colors
-    if permissions is not None:
-        data["role"]["permissions"] = str(permissions)
-
-    if hoist is not None:
-        data["role"]["hoist"] = hoist
-    if mentionable is not None:
-        data["role"]["mentionable"] = mentionable
-    if name is not None:
-        data["role"]["name"] = name
 
     state = get_state()
-    state.parse_guild_role_update(data)
+    state.receive_event("GUILD_ROLE_UPDATE", data)
 
     return role
 
@@ -776,7 +1088,7 @@ def delete_role(role: discord.Role) -> None:
     :param role: Role to delete
     """
     state = get_state()
-    state.parse_guild_role_delete({"guild_id": role.guild.id, "role_id": role.id})
+    state.receive_event("GUILD_ROLE_DELETE", {"guild_id": role.guild.id, "role_id": role.id})
 
 
 def make_text_channel(
@@ -794,7 +1106,8 @@ def make_text_channel(
                                           permission_overwrites=permission_overwrites, parent_id=parent_id)
 
     state = get_state()
-    state.parse_channel_create(c_dict)
+    state.receive_event("CHANNEL_CREATE", c_dict)
+    get_config().channel_guilds[int(c_dict["id"])] = guild.id
 
     return guild.get_channel(int(c_dict["id"]))  # type: ignore[return-value]
 
@@ -811,7 +1124,8 @@ def make_category_channel(
     c_dict = facts.make_category_channel_dict(name, id_num, position=position, guild_id=guild.id,
                                               permission_overwrites=permission_overwrites)
     state = get_state()
-    state.parse_channel_create(c_dict)
+    state.receive_event("CHANNEL_CREATE", c_dict)
+    get_config().channel_guilds[int(c_dict["id"])] = guild.id
 
     return guild.get_channel(int(c_dict["id"]))  # type: ignore[return-value]
 
@@ -833,7 +1147,8 @@ def make_voice_channel(
                                            permission_overwrites=permission_overwrites, parent_id=parent_id,
                                            bitrate=bitrate, user_limit=user_limit)
     state = get_state()
-    state.parse_channel_create(c_dict)
+    state.receive_event("CHANNEL_CREATE", c_dict)
+    get_config().channel_guilds[int(c_dict["id"])] = guild.id
 
     return guild.get_channel(int(c_dict["id"]))  # type: ignore[return-value]
 
@@ -842,7 +1157,8 @@ def delete_channel(channel: discord.abc.GuildChannel) -> None:
     c_dict = facts.make_text_channel_dict(channel.name, id_num=channel.id, guild_id=channel.guild.id)
 
     state = get_state()
-    state.parse_channel_delete(c_dict)
+    state.receive_event("CHANNEL_DELETE", c_dict)
+    get_config().channel_guilds.pop(channel.id, None)
 
 
 def update_text_channel(
@@ -850,18 +1166,13 @@ def update_text_channel(
         target: discord.Member | discord.Role | discord.Object,
         override: discord.PermissionOverwrite | None | Undef = undefined
 ) -> None:
-    c_dict = facts.dict_from_object(channel)
-    if override is not undefined:
-        ovr = c_dict.get("permission_overwrites", [])
-        existing = [o for o in ovr if o.get("id") == target.id]
-        if existing:
-            ovr.remove(existing[0])
-        if override:
-            ovr = ovr + [facts.dict_from_object(override, target=target)]
-        c_dict["permission_overwrites"] = ovr
+    if override is undefined:
+        c_dict = facts.dict_from_object(channel)
+    else:
+        c_dict = facts.make_channel_update_dict(channel, target, override)
 
     state = get_state()
-    state.parse_channel_update(c_dict)
+    state.receive_event("CHANNEL_UPDATE", c_dict)
 
 
 def make_user(username: str, discrim: str | int, avatar: str | None = None,
@@ -873,6 +1184,8 @@ def make_user(username: str, discrim: str | int, avatar: str | None = None,
 
     state = get_state()
     user = state.store_user(data)
+    # The client only keeps weak references to users, the backend knows them for as long as it lives
+    get_config().users[user.id] = user
 
     return user
 
@@ -890,29 +1203,369 @@ def make_member(user: discord.user.BaseUser, guild: discord.Guild,
     }
 
     state = get_state()
-    state.parse_guild_member_add(data)
+    state.receive_event("GUILD_MEMBER_ADD", data)
+    get_config().users.setdefault(user.id, user)
+
+    member = guild.get_member(user.id)
+    if member is None:
+        member = discord.Member(data=data, guild=guild, state=state)
+        if user.id == state.self_id:
+            # A client always knows itself, whatever it caches
+            guild._add_member(member)
+        else:
+            # The client doesn't cache members or isn't sent member events, so only the backend knows about them
+            # until the client touches them, like lazy members
+            rows = get_config().lazy_members.setdefault(guild.id, {})
+            rows[user.id] = LazyMember(user.id, user.name, user.discriminator, nick,
+                                       tuple(_role_ids(guild, role_ids)))
+    return member
+
 
-    return guild.get_member(user.id)  # type: ignore[return-value]
+def _role_ids(guild: discord.Guild, roles: Iterable[discord.abc.Snowflake | Snowflake]) -> list[int]:
+    # The default role is implied, and never part of a member payload
+    ids = (int(r) if isinstance(r, (int, str)) else r.id for r in roles)
+    return [r for r in ids if r != guild.id]
 
 
 def update_member(member: discord.Member, nick: str | None = None,
-                  roles: list[discord.Role] | None = None) -> discord.Member:
-    data = facts.dict_from_object(member, guild=True)
-    if nick is not None:
-        data["nick"] = nick
+                  roles: Iterable[discord.abc.Snowflake | Snowflake] | None = None) -> discord.Member:
+    """
+        Update an existing member, triggering a member update event. The event only carries the fields
+        that changed, plus what discord.py needs to keep the rest as is.
+
+    :param member: Member to update
+    :param nick: New nickname, or None to keep the current one
+    :param roles: New roles or role IDs, or None to keep the current ones
+    :return: Member that was updated
+    """
+    # Members the client doesn't cache are only up to date in their row
+    row = get_config().lazy_members.get(member.guild.id, {}).get(member.id)
     if roles is not None:
-        data["roles"] = list(map(lambda x: x.id, roles))
+        role_ids: Iterable[int] | None = _role_ids(member.guild, roles)
+    else:
+        role_ids = row.roles if row is not None else None
+    if nick is None and row is not None:
+        nick = row.nick
+    data = facts.make_member_update_dict(member, nick=nick, roles=role_ids)
+
+    state = get_state()
+    state.receive_event("GUILD_MEMBER_UPDATE", data)
 
+    return member
+
+
+def update_members(
+        members: Iterable[discord.Member],
+        add: Iterable[discord.abc.Snowflake] = (),
+        remove: Iterable[discord.abc.Snowflake] = (),
+) -> list[discord.Member]:
+    """
+        Apply the same role change to many members in one pass, triggering a member update event for each member
+        whose roles actually changed. Members that already have the roles being added and lack the roles being
+        removed are skipped.
+
+    :param members: Members to update
+    :param add: Roles to give every member
+    :param remove: Roles to take from every member
+    :return: Members that were updated
+    """
+    add_ids = [r.id for r in add]
+    remove_ids = {r.id for r in remove}
     state = get_state()
-    state.parse_guild_member_update(data)
+    lazy_members = get_config().lazy_members
+
+    updated = []
+    for mem in members:
+        # Members the client doesn't cache are only up to date in their row
+        row = lazy_members.get(mem.guild.id, {}).get(mem.id)
+        current = row.roles if row is not None else tuple(mem._roles)
+        new = [r for r in add_ids if r not in current and r not in remove_ids and r != mem.guild.id]
+        if not new and not any(r in current for r in remove_ids):
+            continue
+        roles = [r for r in current if r not in remove_ids]
+        roles.extend(new)
+        state.receive_event("GUILD_MEMBER_UPDATE", facts.make_member_update_dict(mem, roles=roles))
+        updated.append(mem)
+    return updated
+
+
+def make_lazy_members(
+        guild: discord.Guild,
+        names: Iterable[str],
+        nicks: Iterable[str | None] | None = None,
+) -> list[int]:
+    """
+        Add members to a guild without creating any ``discord.Member`` objects for them. The client only
+        learns about each member once it touches them, through a mention, fetch, chunk or event, matching how
+        large guilds look to a bot without the members intent.
+
+    :param guild: Guild the members are in
+    :param names: Usernames of the new members
+    :param nicks: Nicknames of the new members, or None for no nicknames
+    :return: IDs of the new members, in order
+    """
+    rows = get_config().lazy_members.setdefault(guild.id, {})
+    if nicks is None:
+        nicks = itertools.repeat(None)
 
+    ids = []
+    for num, (name, nick) in enumerate(zip(names, nicks)):
+        id_num = facts.make_id()
+        rows[id_num] = LazyMember(id_num, name, f"{num % 9999 + 1:04}", nick)
+        ids.append(id_num)
+
+    if guild._member_count is not None:
+        guild._member_count += len(ids)
+    invalidate_member_index(guild.id)
+    return ids
+
+
+def update_lazy_member(guild_id: int, data: _types.gateway.GuildMemberUpdateEvent) -> None:
+    """
+        Apply a member update to the row of a member the client doesn't have, so the backend stays up to date
+        even though the client never sees the update
+
+    :param guild_id: ID of the guild the member is in
+    :param data: Payload of the update
+    """
+    rows = get_config().lazy_members.get(guild_id)
+    if not rows:
+        return
+    user_id = int(data["user"]["id"])
+    row = rows.get(user_id)
+    if row is None:
+        return
+    if "roles" in data:
+        row = row._replace(roles=tuple(int(r) for r in data["roles"]))
+    if "nick" in data:
+        row = row._replace(nick=data["nick"])
+    rows[user_id] = row
+
+
+def _lazy_member_dict(row: LazyMember) -> _types.member.MemberWithUser:
+    out: _types.member.MemberWithUser = {
+        'user': facts.make_user_dict(row.name, row.discriminator, None, row.id),
+        'roles': list(row.roles),
+        'joined_at': None,
+        'deaf': False,
+        'mute': False,
+        'flags': 0,
+    }
+    if row.nick is not None:
+        out['nick'] = row.nick
+    return out
+
+
+def materialize_member(guild: discord.Guild, user_id: int) -> discord.Member | None:
+    """
+        Get a member of a guild, turning its lazy row into a ``discord.Member`` first if the client hasn't
+        seen it yet. This doesn't dispatch a member join, as the member was in the guild all along.
+
+    :param guild: Guild to get the member from
+    :param user_id: ID of the member
+    :return: The member, or None if they aren't in the guild
+    """
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+
+    rows = get_config().lazy_members.get(guild.id)
+    if not rows or user_id not in rows:
+        return None
+    row = rows.pop(user_id)
+
+    state = get_state()
+    data = _lazy_member_dict(row)
+    get_config().users.setdefault(user_id, state.store_user(data['user']))
+    member = discord.Member(data=data, guild=guild, state=state)
+    guild._add_member(member)
     return member
 
 
+def materialize_members(guild: discord.Guild) -> list[discord.Member]:
+    """
+        Turn every lazy row of a guild into a ``discord.Member``, as if the guild was chunked
+
+    :param guild: Guild to materialize the members of
+    :return: All members of the guild
+    """
+    rows = get_config().lazy_members.get(guild.id)
+    if rows:
+        for user_id in list(rows):
+            materialize_member(guild, user_id)
+    return list(guild.members)
+
+
+def member_index(guild: discord.Guild) -> MemberIndex:
+    """
+        Get the name index of a guild's members, building it if the members changed since it was last used
+
+    :param guild: Guild to get the index of
+    :return: Index over the guild's members and lazy rows
+    """
+    config = get_config()
+    index = config.member_indexes.get(guild.id)
+    if index is None:
+        index = MemberIndex(guild, config.lazy_members.get(guild.id, {}).values())
+        config.member_indexes[guild.id] = index
+    return index
+
+
+def invalidate_member_index(guild_id: int | None = None) -> None:
+    """
+        Drop the name index of a guild's members, so the next search sees their current names
+
+    :param guild_id: ID of the guild, or None for every guild
+    """
+    config = get_session().backend
+    if config is None:
+        return
+    if guild_id is None:
+        config.member_indexes.clear()
+    else:
+        config.member_indexes.pop(guild_id, None)
+
+
+def update_member_index(guild_id: int, event: str, data: Any) -> None:
+    """
+        Apply a ``GUILD_MEMBER_ADD``, ``GUILD_MEMBER_UPDATE`` or ``GUILD_MEMBER_REMOVE`` event to the name index
+        of a guild, if it has been built, instead of dropping the whole index
+
+    :param guild_id: ID of the guild
+    :param event: Name of the event
+    :param data: Payload of the event
+    """
+    config = get_session().backend
+    if config is None:
+        return
+    index = config.member_indexes.get(guild_id)
+    if index is None:
+        return
+    user = data["user"]
+    id_num = int(user["id"])
+    if event == "GUILD_MEMBER_REMOVE":
+        index.remove(id_num)
+        return
+    # Updates without a nickname leave it as it is
+    if "nick" in data:
+        nick = data["nick"]
+    else:
+        old = index.members.get(id_num)
+        nick = old[1] if old is not None else None
+    index.update(id_num, user["username"], nick)
+
+
+def request_members(
+        guild: discord.Guild,
+        *,
+        query: str = "",
+        limit: int = 0,
+        user_ids: Iterable[int] | None = None,
+        nonce: str | None = None,
+) -> list[int]:
+    """
+        Answer a request for a guild's members, like one sent over the gateway, by sending the matching members
+        back as ``GUILD_MEMBERS_CHUNK`` events of at most 1000 members each. Lazy members sent are cached by the
+        client as it parses the chunks, if it asked to cache them.
+
+    :param guild: Guild to get members of
+    :param query: Prefix of the username or nickname of the members to get, or empty for every member
+    :param limit: Most members to get, or 0 for no limit
+    :param user_ids: IDs of the members to get, instead of searching by name
+    :param nonce: Nonce of the request, sent back with every chunk
+    :return: IDs of the members sent
+    """
+    rows = get_config().lazy_members.get(guild.id, {})
+    not_found = []
+    if user_ids is not None:
+        ids = []
+        for user_id in user_ids:
+            if guild.get_member(user_id) is not None or user_id in rows:
+                ids.append(user_id)
+            else:
+                not_found.append(user_id)
+    elif query:
+        ids = member_index(guild).search(query, limit)
+    else:
+        ids = [mem.id for mem in guild.members]
+        ids.extend(rows)
+        if limit:
+            ids = ids[:limit]
+
+    members: list[_types.member.MemberWithUser] = []
+    for user_id in ids:
+        mem = guild.get_member(user_id)
+        members.append(facts.dict_from_object(mem) if mem is not None else _lazy_member_dict(rows[user_id]))
+
+    state = get_state()
+    chunk_count = max(1, -(-len(members) // 1000))
+    for chunk_index in range(chunk_count):
+        data: dict[str, Any] = {
+            "guild_id": str(guild.id),
+            "members": members[chunk_index * 1000:(chunk_index + 1) * 1000],
+            "chunk_index": chunk_index,
+            "chunk_count": chunk_count,
+        }
+        if nonce is not None:
+            data["nonce"] = nonce
+        if not_found and chunk_index == 0:
+            data["not_found"] = not_found
+        state.receive_event("GUILD_MEMBERS_CHUNK", data)
+
+    # The client cached some of the rows it was sent, so they aren't lazy anymore
+    for user_id in ids:
+        if user_id in rows and guild.get_member(user_id) is not None:
+            del rows[user_id]
+    return ids
+
+
+class LazyMemberList(Sequence[discord.Member]):
+    """
+        A read-only list of lazily added members across guilds, indexing into it materializes the member.
+        Used as the runner config's members when configured with ``lazy_members``
+    """
+
+    def __init__(self) -> None:
+        self._entries: list[tuple[discord.Guild, list[int]]] = []
+        self._len = 0
+
+    def extend(self, guild: discord.Guild, ids: list[int]) -> None:
+        self._entries.append((guild, ids))
+        self._len += len(ids)
+
+    def __len__(self) -> int:
+        return self._len
+
+    @overload
+    def __getitem__(self, index: int) -> discord.Member: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[discord.Member]: ...
+
+    def __getitem__(self, index: int | slice) -> discord.Member | list[discord.Member]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("lazy member index out of range")
+        for guild, ids in self._entries:
+            if index < len(ids):
+                return materialize_member(guild, ids[index])  # type: ignore[return-value]
+            index -= len(ids)
+        raise IndexError("lazy member index out of range")
+
+
 def delete_member(member: discord.Member) -> None:
+    guild = member.guild
+    get_config().lazy_members.get(guild.id, {}).pop(member.id, None)
     out = facts.dict_from_object(member, guild=True)
     state = get_state()
-    state.parse_guild_member_remove(out)
+    state.receive_event("GUILD_MEMBER_REMOVE", out)
+    # Without the members intent the client isn't told, but the member is gone from the guild all the same
+    cached = guild.get_member(member.id)
+    if cached is not None:
+        guild._remove_member(cached)
 
 
 def make_message(
@@ -928,30 +1581,37 @@ def make_message(
 ) -> discord.Message:
     guild = channel.guild if hasattr(channel, "guild") else None
     guild_id = guild.id if guild else None
+    if isinstance(author, discord.Member) and guild is not None and guild.get_member(author.id) is None:
+        # The client doesn't have the author, so only their row has their current roles and nickname
+        row = get_config().lazy_members.get(guild.id, {}).get(author.id)
+        if row is not None:
+            author = discord.Member(data=_lazy_member_dict(row), guild=guild, state=get_state())
 
-    mentions = find_member_mentions(content, guild)
-    role_mentions = find_role_mentions(content, guild)
-    channel_mentions = find_channel_mentions(content, guild)
+    mentions = find_mentions(content, guild, author)
 
     kwargs: dict[str, Any] = {}
     if nonce is not None:
         kwargs["nonce"] = nonce
 
     data = facts.make_message_dict(
-        channel, author, id_num, content=content, mentions=mentions, tts=tts, embeds=embeds, attachments=attachments,
-        poll=facts.dict_from_object(poll) if poll else None, mention_roles=role_mentions,
-        mention_channels=channel_mentions, guild_id=guild_id, **kwargs
+        channel, author, id_num, content=content, mentions=mentions.users, tts=tts, embeds=embeds,
+        attachments=attachments, poll=facts.dict_from_object(poll) if poll else None, mention_roles=mentions.roles,
+        mention_channels=mentions.channels, mention_everyone=mentions.everyone, guild_id=guild_id, **kwargs
     )
 
     state = get_state()
-    state.parse_message_create(data)
+    state.receive_event("MESSAGE_CREATE", data)
 
     messages = get_config().messages
     if channel.id not in messages:
         messages[channel.id] = []
     messages[channel.id].append(data)
 
-    return state._get_message(int(data["id"]))  # type: ignore[return-value]
+    message = state._get_message(int(data["id"]))
+    if message is None:
+        # The client isn't sent messages of this channel, so it never cached it
+        message = discord.Message(state=state, channel=channel, data=data)  # type: ignore[arg-type]
+    return message
 
 
 def edit_message(
@@ -976,32 +1636,84 @@ def edit_message(
     return data
 
 
-MEMBER_MENTION: Pattern[str] = re.compile(r"<@!?([0-9]{17,21})>", re.MULTILINE)
-ROLE_MENTION: Pattern[str] = re.compile(r"<@&([0-9]{17,21})>", re.MULTILINE)
-CHANNEL_MENTION: Pattern[str] = re.compile(r"<#([0-9]{17,21})>", re.MULTILINE)
+# Every kind of mention, matched in a single pass: the sigil and ID of a user, role or channel, or everyone/here
+MENTION: Pattern[str] = re.compile(r"<(@[!&]?|#)([0-9]{17,21})>|(?<![\w@])@(everyone|here)\b")
+
+
+class Mentions(NamedTuple):
+    """
+        Everything a message's content mentions, resolved like discord does when the message is sent
+    """
+    users: list[discord.Member | discord.User]
+    roles: list[Snowflake]
+    channels: list[_types.AnyChannel]
+    everyone: bool
+
+
+def find_mentions(
+        content: str | None,
+        guild: discord.Guild | None,
+        author: discord.user.BaseUser | discord.Member | None = None,
+) -> Mentions:
+    """
+        Resolve the mentions in a message's content, in one pass over it. Users, roles and channels are each
+        mentioned once however often they appear, and ones that don't exist aren't mentioned. ``@everyone`` and
+        ``@here`` only count in a guild, if the author is allowed to mention everyone.
+
+    :param content: Content of the message
+    :param guild: Guild the message is sent in, or None for a DM
+    :param author: Author of the message, or None to skip the permission check of ``@everyone``
+    :return: The mentioned users, role IDs and channels, and whether everyone was mentioned
+    """
+    if content is None:
+        return Mentions([], [], [], False)
+
+    users: dict[int, discord.Member | discord.User] = {}
+    roles: dict[int, Snowflake] = {}
+    channels: dict[int, _types.AnyChannel] = {}
+    everyone = False
+    known_users = get_config().users
+    for sigil, id_str, group in MENTION.findall(content):
+        if group:
+            everyone = guild is not None
+            continue
+        id_num = int(id_str)
+        if sigil == "#":
+            if guild is not None and id_num not in channels:
+                chan = guild.get_channel(id_num)
+                if chan is not None:
+                    channels[id_num] = chan
+        elif sigil == "@&":
+            if guild is not None and guild.get_role(id_num) is not None:
+                roles.setdefault(id_num, id_str)
+        elif id_num not in users:
+            user: discord.Member | discord.User | None = None
+            if guild is not None:
+                user = materialize_member(guild, id_num)
+            if user is None:
+                # Anyone discord knows of can be mentioned in a DM, whether the client has them cached or not
+                user = known_users.get(id_num)  # type: ignore[assignment]
+            if user is not None:
+                users[id_num] = user
+
+    if everyone and guild is not None and author is not None:
+        member = author if isinstance(author, discord.Member) else guild.get_member(author.id)
+        everyone = member is not None and member.guild_permissions.mention_everyone
+    return Mentions(list(users.values()), list(roles.values()), list(channels.values()), everyone)
 
 
 def find_member_mentions(content: str | None, guild: discord.Guild | None) -> list[discord.Member | discord.User]:
-    if guild is None or content is None:
-        return []  # TODO: Check for dm user mentions
-    matches = re.findall(MEMBER_MENTION, content)
-    return [discord.utils.get(guild.members, id=int(match)) for match in matches]  # type: ignore[misc]
+    return find_mentions(content, guild).users
 
 
 def find_role_mentions(content: str | None, guild: discord.Guild | None) -> list[Snowflake]:
-    if guild is None or content is None:
-        return []
-    matches = re.findall(ROLE_MENTION, content)
-    return matches
+    return find_mentions(content, guild).roles
 
 
 def find_channel_mentions(content: str | None,
                           guild: discord.Guild | None
                           ) -> list[_types.AnyChannel]:
-    if guild is None or content is None:
-        return []
-    matches = re.findall(CHANNEL_MENTION, content)
-    return [discord.utils.get(guild.channels, id=int(match)) for match in matches]  # type: ignore[misc]
+    return find_mentions(content, guild).channels
 
 
 def delete_message(message: discord.Message) -> None:
@@ -1013,7 +1725,7 @@ def delete_message(message: discord.Message) -> None:
         data["guild_id"] = message.guild.id
 
     state = get_state()
-    state.parse_message_delete(data)
+    state.receive_event("MESSAGE_DELETE", data)
 
     messages = get_config().messages[message.channel.id]
     index = next(i for i, v in enumerate(messages) if v["id"] == message.id)
@@ -1033,19 +1745,24 @@ def make_attachment(filename: pathlib.Path, name: str | None = None, id_num: int
     )
 
 
+def _reaction_emoji(emoji: str) -> _types.emoji.PartialEmoji:
+    """
+        Parse the emoji of a reaction route, ``name:id`` or ``<:name:id>`` for custom emoji, or a unicode emoji
+    """
+    parsed = discord.PartialEmoji.from_str(emoji)
+    return {"id": parsed.id, "name": parsed.name}
+
+
+def _same_emoji(first: _types.emoji.PartialEmoji, second: _types.emoji.PartialEmoji) -> bool:
+    # Custom emoji are the same whatever their name, unicode ones have no id
+    if first["id"] is not None or second["id"] is not None:
+        return first["id"] is not None and second["id"] is not None and int(first["id"]) == int(second["id"])
+    return first["name"] == second["name"]
+
+
 def add_reaction(message: discord.Message, user: discord.user.BaseUser | discord.abc.User,
                  emoji: str) -> None:
-    if ":" in emoji:
-        temp = emoji.split(":")
-        partial: _types.emoji.PartialEmoji = {
-            "id": temp[0],
-            "name": temp[1]
-        }
-    else:
-        partial = {
-            "id": None,
-            "name": emoji
-        }
+    partial = _reaction_emoji(emoji)
 
     data: _types.gateway.MessageReactionAddEvent = {
         "message_id": message.id,
@@ -1062,7 +1779,7 @@ def add_reaction(message: discord.Message, user: discord.user.BaseUser | discord
         data["member"] = facts.dict_from_object(user)
 
     state = get_state()
-    state.parse_message_reaction_add(data)
+    state.receive_event("MESSAGE_REACTION_ADD", data)
 
     messages = get_config().messages[message.channel.id]
     message_data = next(filter(lambda x: x["id"] == message.id, messages), None)
@@ -1070,11 +1787,7 @@ def add_reaction(message: discord.Message, user: discord.user.BaseUser | discord
         if "reactions" not in message_data:
             message_data["reactions"] = []
 
-        react: _types.message.Reaction | None = None
-        for react in message_data["reactions"]:
-            if react["emoji"]["id"] == partial["id"] and react["emoji"]["name"] == partial["name"]:
-                break
-
+        react = next((r for r in message_data["reactions"] if _same_emoji(r["emoji"], partial)), None)
         if react is None:
             react = {
                 "count": 0,
@@ -1096,17 +1809,7 @@ def add_reaction(message: discord.Message, user: discord.user.BaseUser | discord
 
 
 def remove_reaction(message: discord.Message, user: discord.abc.Snowflake, emoji: str) -> None:
-    if ":" in emoji:
-        temp = emoji.split(":")
-        partial: _types.emoji.PartialEmoji = {
-            "id": temp[0],
-            "name": temp[1]
-        }
-    else:
-        partial = {
-            "id": None,
-            "name": emoji
-        }
+    partial = _reaction_emoji(emoji)
 
     data: _types.gateway.MessageReactionRemoveEvent = {
         "message_id": message.id,
@@ -1120,7 +1823,7 @@ def remove_reaction(message: discord.Message, user: discord.abc.Snowflake, emoji
         data["guild_id"] = message.guild.id
 
     state = get_state()
-    state.parse_message_reaction_remove(data)
+    state.receive_event("MESSAGE_REACTION_REMOVE", data)
 
     messages = get_config().messages[message.channel.id]
     message_data = next(filter(lambda x: x["id"] == message.id, messages), None)
@@ -1128,10 +1831,7 @@ def remove_reaction(message: discord.Message, user: discord.abc.Snowflake, emoji
         if "reactions" not in message_data:
             message_data["reactions"] = []
 
-        react: _types.message.Reaction | None = None
-        for react in message_data["reactions"]:
-            if react["emoji"]["id"] == partial["id"] and react["emoji"]["name"] == partial["name"]:
-                break
+        react = next((r for r in message_data["reactions"] if _same_emoji(r["emoji"], partial)), None)
         if react is None:
             return
 
@@ -1153,7 +1853,7 @@ def clear_reactions(message: discord.Message) -> None:
         data["guild_id"] = message.guild.id
 
     state = get_state()
-    state.parse_message_reaction_remove_all(data)
+    state.receive_event("MESSAGE_REACTION_REMOVE_ALL", data)
 
     messages = get_config().messages[message.channel.id]
     message_data = next(filter(lambda x: x["id"] == message.id, messages), None)
@@ -1164,10 +1864,10 @@ def clear_reactions(message: discord.Message) -> None:
 def pin_message(channel_id: Snowflake, message_id: Snowflake) -> None:
     data: _types.gateway.ChannelPinsUpdateEvent = {
         "channel_id": channel_id,
-        "last_pin_timestamp": datetime.datetime.now().isoformat(),
+        "last_pin_timestamp": facts.utcnow().isoformat(),
     }
     state = get_state()
-    state.parse_channel_pins_update(data)
+    state.receive_event("CHANNEL_PINS_UPDATE", data)
 
 
 def unpin_message(channel_id: Snowflake, message_id: Snowflake) -> None:
@@ -1176,26 +1876,194 @@ def unpin_message(channel_id: Snowflake, message_id: Snowflake) -> None:
         "last_pin_timestamp": None,
     }
     state = get_state()
-    state.parse_channel_pins_update(data)
+    state.receive_event("CHANNEL_PINS_UPDATE", data)
+
+
+def set_latency(latency: float | None, shard_id: int | None = None) -> None:
+    """
+        Set the latency the client's websocket reports, for a single shard or all of them
+
+    :param latency: Latency in seconds, or None to go back to discord.py's own measurement
+    :param shard_id: Shard to set the latency of, or None for every shard
+    """
+    client = get_state()._get_client()
+    if isinstance(client, discord.AutoShardedClient):
+        shards = client.shards
+        if shard_id is not None:
+            shards = {shard_id: shards[shard_id]}
+        websockets = [shard._parent.ws for shard in shards.values()]
+    else:
+        websockets = [client.ws]
+
+    for ws in websockets:
+        if isinstance(ws, websocket.FakeWebSocket):
+            ws.fake_latency = latency
+
+
+def take_snapshot() -> BackendSnapshot:
+    """
+        Record the current guilds, channels, roles and members of the backend, so they can be restored later
+
+    :return: Snapshot of the current backend world
+    """
+    state = get_state()
+    guilds = {}
+    channels = {}
+    roles = {}
+    members = {}
+    for guild in state.guilds:
+        g_dict = facts.dict_from_object(guild)
+        g_dict["member_count"] = guild._member_count  # type: ignore[typeddict-item]
+        guilds[guild.id] = g_dict
+        channels[guild.id] = {channel.id: facts.dict_from_object(channel) for channel in guild.channels}
+        roles[guild.id] = {role.id: facts.dict_from_object(role) for role in guild.roles}
+        members[guild.id] = {mem.id: (tuple(mem._roles), mem.nick) for mem in guild.members}
+
+    lazy_members = {guild_id: dict(rows) for guild_id, rows in get_config().lazy_members.items()}
+    session = get_session()
+    if session.ids.seed is None:
+        return BackendSnapshot(guilds, channels, roles, members, lazy_members)
+    return BackendSnapshot(guilds, channels, roles, members, lazy_members,
+                           copy.deepcopy(session.ids), session.rng.getstate())
+
+
+def _snapshot_member_dict(user_id: int,
+                          saved: tuple[tuple[int, ...], str | None]) -> _types.member.MemberWithUser | None:
+    user = get_config().users.get(user_id)
+    if user is None:
+        return None
+    return facts.make_member_dict(user, list(saved[0]), nick=saved[1])
+
+
+def _restore_guild(snapshot: BackendSnapshot, guild_id: int) -> None:
+    """
+        Recreate a guild deleted since the snapshot, with its channels, roles and members
+    """
+    state = get_state()
+    data = dict(snapshot.guilds[guild_id])
+    data["channels"] = list(snapshot.channels[guild_id].values())
+    data["roles"] = list(snapshot.roles[guild_id].values())
+    data["members"] = [
+        m_dict for user_id, saved in snapshot.members[guild_id].items()
+        if (m_dict := _snapshot_member_dict(user_id, saved)) is not None
+    ]
+    state.receive_event("GUILD_CREATE", data)
+    guild = state._get_guild(guild_id)
+    if guild is not None:
+        _index_guild(guild)
+
+
+def restore_snapshot(snapshot: BackendSnapshot) -> None:
+    """
+        Put the backend world back how it was when the snapshot was taken, without dispatching any events to
+        the client. Guilds, channels, roles and members created since are removed, changed ones are reverted, and
+        deleted ones are recreated from the snapshot. Lazy members are put back to the rows of the snapshot.
+        When the snapshot was taken in a seeded session, the id generator and random choices are rewound too.
+
+    :param snapshot: Snapshot to restore
+    """
+    state = get_state()
+    config = get_config()
+    state.stop_dispatch()
+    try:
+        for guild in list(state.guilds):
+            if guild.id not in snapshot.guilds:
+                state._remove_guild(guild)
+                _unindex_guild(guild)
+                invalidate_permissions(guild.id)
+                facts.invalidate(guild.id)
+                config.lazy_members.pop(guild.id, None)
+                continue
+
+            # Roles first, as channel overwrites and members refer to them
+            saved_roles = snapshot.roles[guild.id]
+            for role in list(guild.roles):
+                r_dict = saved_roles.get(role.id)
+                if r_dict is None:
+                    delete_role(role)
+                elif r_dict != facts.dict_from_object(role):
+                    state.receive_event("GUILD_ROLE_UPDATE", {"guild_id": guild.id, "role": r_dict})
+            for role_id, r_dict in saved_roles.items():
+                if guild.get_role(role_id) is None:
+                    state.receive_event("GUILD_ROLE_CREATE", {"guild_id": guild.id, "role": r_dict})
+
+            saved_channels = snapshot.channels[guild.id]
+            for channel in list(guild.channels):
+                c_dict = saved_channels.get(channel.id)
+                if c_dict is None:
+                    delete_channel(channel)
+                elif c_dict != facts.dict_from_object(channel):
+                    state.receive_event("CHANNEL_UPDATE", c_dict)
+            for channel_id, c_dict in saved_channels.items():
+                if guild.get_channel(channel_id) is None:
+                    state.receive_event("CHANNEL_CREATE", c_dict)
+                    config.channel_guilds[channel_id] = guild.id
+
+            lazy_rows = snapshot.lazy_members.get(guild.id, {})
+            saved_members = snapshot.members[guild.id]
+            for mem in list(guild.members):
+                saved = saved_members.get(mem.id)
+                if saved is None:
+                    if mem.id in lazy_rows:
+                        # Materialized since the snapshot, forget about it again
+                        guild._remove_member(mem)
+                    else:
+                        delete_member(mem)
+                elif saved != (tuple(mem._roles), mem.nick):
+                    data = facts.dict_from_object(mem, guild=True)
+                    data["roles"] = list(saved[0])
+                    data["nick"] = saved[1]  # type: ignore[typeddict-item]
+                    state.receive_event("GUILD_MEMBER_UPDATE", data)
+            for user_id, saved in saved_members.items():
+                if guild.get_member(user_id) is None:
+                    m_dict = _snapshot_member_dict(user_id, saved)
+                    if m_dict is not None:
+                        state.receive_event("GUILD_MEMBER_ADD", {"guild_id": guild.id, **m_dict})
+
+            # Rows added since are dropped, and rows materialized or deleted since come back
+            config.lazy_members[guild.id] = dict(lazy_rows)
+            guild._member_count = snapshot.guilds[guild.id].get("member_count")
+
+        for guild_id in snapshot.guilds:
+            if state._get_guild(guild_id) is None:
+                _restore_guild(snapshot, guild_id)
+                config.lazy_members[guild_id] = dict(snapshot.lazy_members.get(guild_id, {}))
+    finally:
+        state.start_dispatch()
+
+    config.messages.clear()
+    config.member_indexes.clear()
+    config.permissions.clear()
+    if state._messages is not None:
+        state._messages.clear()
+    state._private_channels.clear()
+    state._private_channels_by_user.clear()
+
+    if snapshot.ids is not None and snapshot.rng is not None:
+        session = get_session()
+        session.ids = copy.deepcopy(snapshot.ids)
+        session.rng.setstate(snapshot.rng)
 
 
 @overload
-def configure(client: discord.Client) -> None: ...
+def configure(client: discord.Client, *, wire_format: websocket.WireFormat | None = ...) -> None: ...
 
 
 @overload
-def configure(client: discord.Client | None, *, use_dummy: bool = ...) -> None: ...
+def configure(client: discord.Client | None, *, use_dummy: bool = ...,
+              wire_format: websocket.WireFormat | None = ...) -> None: ...
 
 
-def configure(client: discord.Client | None, *, use_dummy: bool = False) -> None:
+def configure(client: discord.Client | None, *, use_dummy: bool = False,
+              wire_format: websocket.WireFormat | None = None) -> None:
     """
-        Configure the backend, optionally with the provided client
+        Configure the backend of the current session, optionally with the provided client
 
     :param client: Client to use, or None
     :param use_dummy: Whether to use a dummy if client param is None, or error
+    :param wire_format: Format of the gateway frames events are sent to the client in, see
+                        :py:meth:`discord.ext.test.websocket.FakeWebSocket.set_wire_format`
     """
-    global _cur_config
-
     if client is None and use_dummy:
         log.info("None passed to backend configuration, dummy client will be used")
         client = discord.Client(intents=discord.Intents.all())
@@ -1211,12 +2079,43 @@ def configure(client: discord.Client | None, *, use_dummy: bool = False) -> None
     http = FakeHttp(loop=loop)
     client.http = http
 
-    ws = websocket.FakeWebSocket(None, loop=loop)
+    if isinstance(client, discord.AutoShardedClient):
+        # One websocket per shard, guilds get routed to them by discord's (guild_id >> 22) % shard_count rule
+        if client.shard_count is None:
+            client.shard_count = 1
+        shard_ids = client.shard_ids if client.shard_ids is not None else range(client.shard_count)
+        shards: dict[int, Shard] = getattr(client, "_AutoShardedClient__shards")
+        shards.clear()
+        # Normally set by connect, which never runs against the fake gateway
+        client._reconnect = False
+        fake_websockets = []
+        for shard_id in shard_ids:
+            shard_ws = websocket.FakeWebSocket(None, loop=loop)
+            shard_ws.shard_id = shard_id
+            shards[shard_id] = Shard(shard_ws, client, lambda item: None)
+            fake_websockets.append(shard_ws)
+        ws = shards[min(shard_ids)].ws
+    else:
+        ws = websocket.FakeWebSocket(None, loop=loop)
+        fake_websockets = [ws]
     client.ws = ws
 
     test_state = dstate.FakeState(client, http=http, loop=loop)
     http.state = test_state
 
+    # Everything the client calls into resolves the backend through its own session, not the caller's
+    session = get_session()
+    http.session = session
+    test_state.session = session
+
     client._connection = test_state
+    facts.invalidate()
+
+    for fake_ws in fake_websockets:
+        fake_ws.session = session
+        fake_ws._discord_parsers = test_state.parsers
+        if wire_format is not None:
+            fake_ws._dispatch = test_state.dispatch
+        fake_ws.set_wire_format(wire_format)
 
-    _cur_config = BackendState({}, test_state)
+    session.backend = BackendState({}, test_state, {}, {}, {}, {}, {}, {})
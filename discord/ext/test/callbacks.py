@@ -2,19 +2,31 @@
     Module containing registered callbacks for various events. These events are how various parts of discord.py
     can communicate with the frontend runner or a user's custom runner setup. These callbacks should not
     be used to trigger backend changes, that is the responsibility of the library internals.
+
+    Each event has one callback set with :py:func:`set_callback`, which the runner uses, and any number of
+    subscribers added with :py:func:`subscribe`, optionally only for one guild or channel. Subscribers can be
+    any callable, and whatever awaitable they return is awaited.
 """
 
+import inspect
 import logging
+import time
 import discord
 from enum import Enum
 from typing import Callable, overload, Literal, Any, Awaitable
 
 from . import _types
+from .session import get_session
 
 GetChannelCallback = Callable[[_types.snowflake.Snowflake], Awaitable[None]]
 SendMessageCallback = Callable[[discord.Message], Awaitable[None]]
 EditMemberCallback = Callable[[dict[str, Any], discord.Member, str | None], Awaitable[None]]
 Callback = GetChannelCallback | SendMessageCallback | EditMemberCallback | Callable[..., Awaitable[None]]
+Subscriber = Callable[..., Awaitable[None] | None]
+
+# What happens when a callback raises: log it and carry on, raise it to the code that caused the event, or keep it
+# in CallbackBus.errors to check later
+ErrorPolicy = Literal["log", "raise", "collect"]
 
 log = logging.getLogger("discord.ext.tests")
 
@@ -47,24 +59,123 @@ class CallbackEvent(Enum):
     get_guilds = "get_guilds"
 
 
-_callbacks: dict[CallbackEvent, Callback] = {}
+class Subscription:
+    """
+        A subscriber of an event, as returned by :py:func:`subscribe`
+    """
+
+    def __init__(self, event: CallbackEvent, callback: Subscriber, key: tuple[str, int] | None,
+                 errors: ErrorPolicy | None, keep: bool = False) -> None:
+        self.event = event
+        self.callback = callback
+        self.key = key
+        self.errors = errors
+        self.keep = keep
+
+    def __repr__(self) -> str:
+        return f"<Subscription event={self.event.value} callback={self.callback!r} key={self.key}>"
+
+
+class CallbackBus:
+    """
+        Callbacks and subscribers of every event of a session. Subscribers are grouped by the guild or channel
+        they filter on, so dispatching an event only looks up the groups it belongs to.
+    """
+
+    def __init__(self) -> None:
+        self.primary: dict[CallbackEvent, Callback] = {}
+        self.subscribers: dict[CallbackEvent, dict[tuple[str, int] | None, list[Subscription]]] = {}
+        self.error_policy: ErrorPolicy = "log"
+        self.errors: list[tuple[CallbackEvent, Exception]] = []
+
+    def targets(self, event: CallbackEvent, args: tuple[Any, ...]) -> list[Subscription]:
+        """
+            Get the subscribers an event goes to, given its arguments
+
+        :param event: Event being dispatched
+        :param args: Arguments of the event, which its guild and channel are found from
+        :return: Subscribers without filters, then those of the event's guild, then those of its channel
+        """
+        groups = self.subscribers.get(event)
+        if not groups:
+            return []
+        out = list(groups.get(None, ()))
+        # Only work out where the event happened if someone filters on it
+        if len(groups) > (None in groups):
+            guild_id, channel_id = _scope(args)
+            if guild_id is not None:
+                out.extend(groups.get(("guild", guild_id), ()))
+            if channel_id is not None:
+                out.extend(groups.get(("channel", channel_id), ()))
+        return out
+
+    def handle_error(self, event: CallbackEvent, error: Exception, policy: ErrorPolicy | None = None) -> None:
+        """
+            Deal with an error raised by a callback, according to the error policy
+
+        :param event: Event the callback was called for
+        :param error: Error it raised
+        :param policy: Policy of the subscriber, or None for the bus' policy
+        """
+        policy = policy or self.error_policy
+        if policy == "raise":
+            raise error
+        if policy == "collect":
+            self.errors.append((event, error))
+        else:
+            log.error(f"Error in handler for event {event}: {error}")
+
+
+def _scope(args: tuple[Any, ...]) -> tuple[int | None, int | None]:
+    # The guild and channel of an event are those of its first argument that belongs to one
+    for arg in args:
+        if isinstance(arg, discord.Message):
+            return (arg.guild.id if arg.guild is not None else None), arg.channel.id
+        if isinstance(arg, discord.abc.GuildChannel):
+            return arg.guild.id, arg.id
+        if isinstance(arg, discord.abc.PrivateChannel):
+            return None, arg.id
+        if isinstance(arg, discord.Guild):
+            return arg.id, None
+        if isinstance(arg, (discord.Member, discord.Role)):
+            return arg.guild.id, None
+    return None, None
 
 
 async def dispatch_event(event: CallbackEvent, *args: Any, **kwargs: Any) -> None:
     """
-        Dispatch an event to a set handler, if one exists. Will ignore handler errors,
-        just print a log
+        Dispatch an event to its callback and subscribers, if there are any. What happens to errors they raise
+        depends on the error policy, see :py:func:`set_error_policy`
 
     :param event: Name of the event to dispatch
-    :param args: Arguments to the callback
-    :param kwargs: Keyword arguments to the callback
+    :param args: Arguments to the callbacks
+    :param kwargs: Keyword arguments to the callbacks
     """
-    cb = _callbacks.get(event)
-    if cb is not None:
-        try:
-            await cb(*args, **kwargs)
-        except Exception as e:
-            log.error(f"Error in handler for event {event}: {e}")
+    session = get_session()
+    bus = session.callbacks
+    cb = bus.primary.get(event)
+    targets = bus.targets(event, args)
+    if cb is None and not targets:
+        return
+
+    start = time.perf_counter_ns()
+    try:
+        if cb is not None:
+            try:
+                await cb(*args, **kwargs)
+            except Exception as e:
+                bus.handle_error(event, e)
+        for sub in targets:
+            try:
+                # Covers coroutine functions, but also lambdas, mocks and callable objects returning awaitables
+                result = sub.callback(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                bus.handle_error(event, e, sub.errors)
+    finally:
+        if session.recorder is not None:
+            session.recorder.add("callback", event.value, start)
 
 
 @overload
@@ -81,12 +192,12 @@ def set_callback(cb: EditMemberCallback, event: Literal[CallbackEvent.edit_membe
 
 def set_callback(cb: Callback, event: CallbackEvent) -> None:
     """
-        Set the callback to use for a specific event
+        Set the callback to use for a specific event, replacing the one set before. Subscribers are kept.
 
     :param cb: Callback to use
     :param event: Name of the event to register for
     """
-    _callbacks[event] = cb
+    get_session().callbacks.primary[event] = cb
 
 
 def get_callback(event: CallbackEvent) -> Callback:
@@ -96,9 +207,10 @@ def get_callback(event: CallbackEvent) -> Callback:
     :param event: Event to get callback for
     :return: Callback for event, if one is set
     """
-    if _callbacks.get(event) is None:
+    cb = get_session().callbacks.primary.get(event)
+    if cb is None:
         raise ValueError(f"Callback for event {event} not set")
-    return _callbacks[event]
+    return cb
 
 
 def remove_callback(event: CallbackEvent) -> Callback | None:
@@ -108,4 +220,98 @@ def remove_callback(event: CallbackEvent) -> Callback | None:
     :param event: Event to remove callback for
     :return: Callback that was previously set or None
     """
-    return _callbacks.pop(event, None)
+    return get_session().callbacks.primary.pop(event, None)
+
+
+def subscribe(
+        event: CallbackEvent,
+        callback: Subscriber,
+        *,
+        guild: discord.abc.Snowflake | int | None = None,
+        channel: discord.abc.Snowflake | int | None = None,
+        errors: ErrorPolicy | None = None,
+        keep: bool = False,
+) -> Subscription:
+    """
+        Add a subscriber to an event, alongside its callback and any other subscribers
+
+    :param event: Event to subscribe to
+    :param callback: Callable called with the event's arguments, its result is awaited if it's awaitable
+    :param guild: Only get events in this guild
+    :param channel: Only get events in this channel. Conflicts with ``guild``
+    :param errors: Error policy for this subscriber, or None for the session's
+    :param keep: Whether the subscriber outlives :py:func:`discord.ext.test.runner.reset`, for subscribers that
+                 remove themselves, like event streams. Others are removed on reset.
+    :return: The subscription, to pass to :py:func:`unsubscribe`
+    """
+    if guild is not None and channel is not None:
+        raise ValueError("Subscribers can filter on a guild or a channel, not both")
+    key: tuple[str, int] | None = None
+    if guild is not None:
+        key = ("guild", guild if isinstance(guild, int) else guild.id)
+    elif channel is not None:
+        key = ("channel", channel if isinstance(channel, int) else channel.id)
+
+    sub = Subscription(event, callback, key, errors, keep)
+    get_session().callbacks.subscribers.setdefault(event, {}).setdefault(key, []).append(sub)
+    return sub
+
+
+def unsubscribe(sub: Subscription) -> None:
+    """
+        Remove a subscriber. Does nothing if it was already removed.
+
+    :param sub: Subscription returned by :py:func:`subscribe`
+    """
+    groups = get_session().callbacks.subscribers.get(sub.event, {})
+    group = groups.get(sub.key)
+    if group is not None and sub in group:
+        group.remove(sub)
+        if not group:
+            del groups[sub.key]
+
+
+def set_error_policy(policy: ErrorPolicy) -> None:
+    """
+        Set what happens when a callback or subscriber raises an error: ``log`` it and carry on, ``raise`` it to the
+        code that caused the event, or ``collect`` it to check later with :py:func:`collected_errors`
+
+    :param policy: Policy to use
+    """
+    get_session().callbacks.error_policy = policy
+
+
+def collected_errors(clear: bool = True) -> list[tuple[CallbackEvent, Exception]]:
+    """
+        Get the errors collected under the ``collect`` error policy
+
+    :param clear: Whether to forget them afterwards
+    :return: Event and error of every collected error, oldest first
+    """
+    bus = get_session().callbacks
+    out = list(bus.errors)
+    if clear:
+        bus.errors.clear()
+    return out
+
+
+def clear_callbacks(subscribers: bool = False, keep: bool = False) -> None:
+    """
+        Remove all currently set callbacks, and optionally subscribers
+
+    :param subscribers: Whether to remove subscribers as well. Event streams subscribed to the bus stop receiving
+                        events without being closed, so prefer closing them instead.
+    :param keep: When removing subscribers, whether to leave those subscribed with ``keep``
+    """
+    bus = get_session().callbacks
+    bus.primary.clear()
+    if not subscribers:
+        return
+    if not keep:
+        bus.subscribers.clear()
+        return
+    for groups in bus.subscribers.values():
+        for key, group in list(groups.items()):
+            group[:] = [sub for sub in group if sub.keep]
+            if not group:
+                del groups[key]
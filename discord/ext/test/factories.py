@@ -2,35 +2,207 @@
     Module for (mostly) stateless creation/destructuring of discord.py objects. Primarily a utility
     for the rest of the library, which often needs to convert between objects and JSON at various stages.
 """
+import copy
 import functools
 import datetime as dt
+import os
+import random
+import time
 from typing import Any, Literal, overload, Iterable, Protocol, NoReturn, Callable, ParamSpec, TypeVar
 
 import discord
 from . import _types
+from .session import get_session
 
 
 P = ParamSpec('P')
 T = TypeVar('T')
+P_co = TypeVar('P_co', covariant=True)
 
-generated_ids: int = 0
+DISCORD_EPOCH = 1420070400000
+
+
+def _xdist_process_id() -> int:
+    """
+        Give every pytest-xdist worker its own process id, so ids from parallel workers never collide
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "")
+    if worker.startswith("gw") and worker[2:].isdigit():
+        return int(worker[2:]) % 32
+    return 0
+
+
+class _Clock:
+    """
+        Timestamp and counter of the last id a generator made
+    """
+
+    __slots__ = ("timestamp", "counter")
+
+    def __init__(self, timestamp: int) -> None:
+        self.timestamp = timestamp
+        self.counter = 0
+
+
+# Shared by every unseeded generator, so ids stay unique across sessions and reconfigures in the same millisecond
+_wall_clock = _Clock(-1)
+
+
+class SnowflakeGenerator:
+    """
+        Generator of discord snowflakes, built with integer arithmetic. Generated ids are strictly increasing:
+        when more than 4096 ids are made in one millisecond, the timestamp is moved forward instead of letting
+        the counter overflow into the process bits. Unseeded generators all share one clock, so no two of them
+        ever make the same id.
+
+        With a seed, the generator is deterministic. Timestamps then come from a logical clock starting at a point
+        picked by the seed, which only moves forward when the counter runs out, so the same seed always produces
+        the same ids.
+    """
+
+    def __init__(self, worker_id: int = 1, process_id: int | None = None, seed: int | None = None) -> None:
+        if process_id is None:
+            process_id = _xdist_process_id()
+        if not (0 <= worker_id < 32 and 0 <= process_id < 32):
+            raise ValueError("Snowflake worker and process ids must be between 0 and 31")
+        self.seed = seed
+        self._node = (worker_id << 17) | (process_id << 12)
+        # How many ids on_shard has made, to deal them out to the shards in turn
+        self._shard_turn = 0
+        if seed is None:
+            self._clock = _wall_clock
+        else:
+            # Somewhere in 2020-2024, so ids look like real ones
+            self._clock = _Clock(157766400000 + random.Random(seed).randrange(126230400000))
+
+    def now(self) -> dt.datetime:
+        """
+            Current time according to this generator, the logical clock when seeded or else the wall clock
+        """
+        if self.seed is None:
+            return dt.datetime.now(tz=dt.timezone.utc)
+        return dt.datetime.fromtimestamp((self._clock.timestamp + DISCORD_EPOCH) / 1000, tz=dt.timezone.utc)
+
+    def advance(self, milliseconds: int) -> None:
+        """
+            Move the logical clock of a seeded generator forward
+
+        :param milliseconds: How far to move the clock
+        """
+        if self.seed is None:
+            raise ValueError("Only the clock of a seeded generator can be advanced")
+        if milliseconds < 0:
+            raise ValueError("The clock can't go backwards")
+        self._clock.timestamp += milliseconds
+        self._clock.counter = 0
+
+    def __call__(self) -> int:
+        clock = self._clock
+        if self.seed is None:
+            now = time.time_ns() // 1_000_000 - DISCORD_EPOCH
+            if now > clock.timestamp:
+                clock.timestamp = now
+                clock.counter = 0
+                return (now << 22) | self._node
+        counter = clock.counter + 1
+        if counter > 0xFFF:
+            clock.timestamp += 1
+            counter = 0
+        clock.counter = counter
+        return (clock.timestamp << 22) | self._node | counter
+
+    def on_shard(self, shard_ids: Iterable[int], shard_count: int) -> int:
+        """
+            Make an id that discord would route to one of the given shards, moving the timestamp forward by up
+            to ``shard_count - 1`` milliseconds if needed. Later ids still come after it. Successive ids go
+            to each of the shards in turn, so they are spread evenly.
+
+        :param shard_ids: Shards the id may land on
+        :param shard_count: Total number of shards
+        :return: New id
+        """
+        shards = sorted(shard_ids)
+        shard = shards[self._shard_turn % len(shards)]
+        self._shard_turn += 1
+        id_num = self()
+        timestamp = id_num >> 22
+        offset = (shard - timestamp) % shard_count
+        if offset == 0:
+            return id_num
+        self._clock.timestamp = timestamp + offset
+        self._clock.counter = 0
+        return (self._clock.timestamp << 22) | self._node
 
 
 def make_id() -> int:
-    global generated_ids
-    # timestamp
-    discord_epoch = str(bin(int(dt.datetime.now().timestamp() * 1000) - 1420070400000))[2:]
-    discord_epoch = "0" * (42 - len(discord_epoch)) + discord_epoch
-    # internal worker id
-    worker = "00001"
-    # internal process id
-    process = "00000"
-    # determine how many ids have been generated so far
-    generated = str(bin(generated_ids)[2:])
-    generated_ids += 1
-    generated = "0" * (12 - len(generated)) + generated
-    # and now finally return the ID
-    return int(discord_epoch + worker + process + generated, 2)
+    return get_session().ids()
+
+
+def make_shard_id(shard_ids: Iterable[int], shard_count: int) -> int:
+    """
+        Make an id that lands on one of the given shards, for guilds, see :py:meth:`SnowflakeGenerator.on_shard`
+    """
+    return get_session().ids.on_shard(shard_ids, shard_count)
+
+
+def get_rng() -> random.Random:
+    """
+        Random number generator for anything dpytest picks at random, seeded along with the current session
+
+    :return: Generator of the current session
+    """
+    return get_session().rng
+
+
+def get_seed() -> int | None:
+    """
+        Seed of the current session, see :py:func:`seed`
+
+    :return: The seed, or None if the session isn't seeded
+    """
+    return get_session().ids.seed
+
+
+def utcnow() -> dt.datetime:
+    """
+        Current time for anything dpytest timestamps. Follows the logical clock when seeded, see :py:func:`seed`
+
+    :return: Current aware UTC datetime
+    """
+    return get_session().ids.now()
+
+
+def advance_clock(delta: dt.timedelta) -> None:
+    """
+        Move the logical clock forward, only possible when seeded
+
+    :param delta: How far to move the clock
+    """
+    get_session().ids.advance(delta // dt.timedelta(milliseconds=1))
+
+
+def seed_ids(seed: int | None, worker_id: int = 1, process_id: int | None = None) -> None:
+    """
+        Switch :py:func:`make_id` in the current session to a new generator, deterministic if a seed is given,
+        or based on the wall clock if the seed is None
+
+    :param seed: Seed for deterministic ids, or None
+    :param worker_id: Worker id to put in new ids
+    :param process_id: Process id to put in new ids, or None to pick one per xdist worker
+    """
+    get_session().ids = SnowflakeGenerator(worker_id, process_id, seed)
+
+
+def seed(seed: int | None) -> None:
+    """
+        Make everything dpytest generates in the current session reproducible: ids, timestamps and random choices
+        such as discriminators all derive from the seed and a logical clock. Other sessions aren't affected.
+        Passing None goes back to the wall clock and unseeded randomness.
+
+    :param seed: Seed to use, or None
+    """
+    seed_ids(seed)
+    get_session().rng.seed(seed)
 
 
 @overload
@@ -201,6 +373,150 @@ def user_with_member(user: discord.User | discord.Member) -> _types.member.UserW
     return out
 
 
+# Update payloads. discord.py resets most fields missing from an update event, so these copy what it would
+# reset straight from the object's stored fields, and only add the optional ones that actually changed. That
+# skips the role, asset and timestamp objects ``dict_from_object`` goes through.
+
+def _user_update_dict(user: discord.user.BaseUser) -> _types.user.User:
+    out: _types.user.User = {
+        'id': user.id,
+        'username': user.name,
+        'discriminator': user.discriminator,
+        'avatar': user._avatar,
+        'global_name': user.global_name,
+        'public_flags': user._public_flags,
+        'bot': user.bot,
+    }
+    if user._avatar_decoration_data is not None:
+        out['avatar_decoration_data'] = user._avatar_decoration_data
+    if user._primary_guild is not None:
+        out['primary_guild'] = user._primary_guild  # type: ignore[typeddict-unknown-key]
+    return out
+
+
+def make_member_update_dict(
+        member: discord.Member,
+        nick: str | None = None,
+        roles: Iterable[_types.snowflake.Snowflake] | None = None,
+) -> _types.gateway.GuildMemberUpdateEvent:
+    """
+        Build a minimal GUILD_MEMBER_UPDATE payload for a member, with some fields changed
+
+    :param member: Member the update is for
+    :param nick: New nickname, or None to leave it as is
+    :param roles: New role IDs, not including the default role, or None to leave them as they are
+    :return: Payload for the update event
+    """
+    out: _types.gateway.GuildMemberUpdateEvent = {
+        'guild_id': member.guild.id,
+        'user': _user_update_dict(member._user),
+        'roles': list(member._roles) if roles is None else list(roles),
+        'avatar': member._avatar,
+        'joined_at': member.joined_at.isoformat() if member.joined_at else None,
+        'flags': member._flags,
+    }
+    if nick is not None:
+        out['nick'] = nick
+    if member.premium_since is not None:
+        out['premium_since'] = member.premium_since.isoformat()
+    if member.timed_out_until is not None:
+        out['communication_disabled_until'] = member.timed_out_until.isoformat()
+    if member._banner is not None:
+        out['banner'] = member._banner  # type: ignore[typeddict-unknown-key]
+    if member._avatar_decoration_data is not None:
+        out['avatar_decoration_data'] = member._avatar_decoration_data
+    return out
+
+
+def _role_tags_dict(tags: discord.RoleTags) -> _types.role.RoleTags:
+    out: _types.role.RoleTags = {}
+    if tags.bot_id is not None:
+        out['bot_id'] = tags.bot_id
+    if tags.integration_id is not None:
+        out['integration_id'] = tags.integration_id
+    if tags.subscription_listing_id is not None:
+        out['subscription_listing_id'] = tags.subscription_listing_id
+    # discord marks these flags by a present null value
+    if tags._premium_subscriber:
+        out['premium_subscriber'] = None
+    if tags._available_for_purchase:
+        out['available_for_purchase'] = None
+    if tags._guild_connections:
+        out['guild_connections'] = None
+    return out
+
+
+def make_role_update_dict(
+        role: discord.Role,
+        colour: int | None = None,
+        colors: _types.role.RoleColours | None = None,
+        permissions: int | None = None,
+        hoist: bool | None = None,
+        mentionable: bool | None = None,
+        name: str | None = None,
+) -> _types.role.Role:
+    """
+        Build a role payload for a GUILD_ROLE_UPDATE event, with some fields changed.
+        Any value passed None keeps the role's current value.
+
+    :param role: Role the update is for
+    :param colour: New primary color
+    :param colors: New colors for multi-color roles, overriding ``colour``
+    :param permissions: New permissions value
+    :param hoist: New hoist value
+    :param mentionable: New mention value
+    :param name: New name
+    :return: Role payload for the update event
+    """
+    if colors is None:
+        colors = {
+            'primary_color': role._colour if colour is None else colour,
+            'secondary_color': role._secondary_colour,
+            'tertiary_color': role._tertiary_colour,
+        }
+    out: _types.role.Role = {
+        'id': role.id,
+        'name': role.name if name is None else name,
+        'color': colors['primary_color'],
+        'colors': colors,
+        'hoist': role.hoist if hoist is None else hoist,
+        'position': role.position,
+        'permissions': str(role._permissions if permissions is None else permissions),
+        'managed': role.managed,
+        'mentionable': role.mentionable if mentionable is None else mentionable,
+        'flags': role._flags,
+    }
+    if role._icon is not None:
+        out['icon'] = role._icon
+    if role.unicode_emoji is not None:
+        out['unicode_emoji'] = role.unicode_emoji
+    if role.tags is not None:
+        out['tags'] = _role_tags_dict(role.tags)
+    return out
+
+
+def make_channel_update_dict(
+        channel: discord.TextChannel,
+        target: discord.Member | discord.Role | discord.Object,
+        overwrite: discord.PermissionOverwrite | None,
+) -> _types.channel.TextChannel:
+    """
+        Build a CHANNEL_UPDATE payload for a text channel, with the permission overwrite for one target
+        replaced. The other overwrites are copied as stored, instead of resolving their targets.
+
+    :param channel: Channel the update is for
+    :param target: Role or member the overwrite is for
+    :param overwrite: New overwrite for the target, or None to remove it
+    :return: Payload for the update event
+    """
+    out: _types.channel.TextChannel = dict_from_object(channel)
+    ovr = [o._asdict() for o in channel._overwrites if o.id != target.id]
+    if overwrite is not None:
+        ovr.append(dict_from_object(overwrite, target=target))
+    out['permission_overwrites'] = ovr
+    return out
+
+
 class DictFromObject(Protocol):
     @overload
     def __call__(self, obj: discord.user.BaseUser) -> _types.member.UserWithMember: ...
@@ -285,6 +601,42 @@ class DictFromObject(Protocol):
 dict_from_object: DictFromObject
 
 
+def _cached(guild_of: Callable[[Any], int]) -> Callable[[Callable[[T], P_co]], Callable[[T], P_co]]:
+    """
+        Memoise the payload of a guild-bound object in the current session, until :py:func:`invalidate` is called
+        for its guild. The object is kept along with its payload, so its id can't be reused while cached. Hits cost
+        a shallow copy, so nested values are shared with the cache and must not be mutated.
+
+    :param guild_of: Function getting the id of the guild an object belongs to
+    """
+    def decorator(func: Callable[[T], P_co]) -> Callable[[T], P_co]:
+        @functools.wraps(func)
+        def wrapper(obj: T) -> P_co:
+            bucket = get_session().payloads.setdefault(guild_of(obj), {})
+            entry = bucket.get(id(obj))
+            if entry is None:
+                entry = (obj, func(obj))
+                bucket[id(obj)] = entry
+            payload: P_co = entry[1]
+            return copy.copy(payload)
+        return wrapper
+    return decorator
+
+
+def invalidate(guild_id: int | None = None) -> None:
+    """
+        Forget the cached payloads of one guild and everything in it, or of all guilds, in the current session.
+        The backend does this whenever it sends an event that could change them.
+
+    :param guild_id: ID of the guild to invalidate, or None for all guilds
+    """
+    payloads = get_session().payloads
+    if guild_id is None:
+        payloads.clear()
+    else:
+        payloads.pop(guild_id, None)
+
+
 @functools.singledispatch  # type: ignore[no-redef]
 def dict_from_object(obj: object, **_kwargs: Any) -> Any:
     raise TypeError(f"Unrecognized discord model type {type(obj)}")
@@ -344,6 +696,7 @@ def _from_member(
 
 
 @dict_from_object.register(discord.Role)
+@_cached(lambda role: role.guild.id)
 def _from_role(role: discord.Role) -> _types.role.Role:
     return {
         'id': role.id,
@@ -365,6 +718,7 @@ def _from_role(role: discord.Role) -> _types.role.Role:
 
 # TODO: support all channel attributes
 @dict_from_object.register(discord.TextChannel)
+@_cached(lambda channel: channel.guild.id)
 def _from_text_channel(channel: discord.TextChannel) -> _types.channel.TextChannel:
     return {
         'name': channel.name,
@@ -391,6 +745,7 @@ def _from_dm_channel(channel: discord.DMChannel) -> _types.channel.DMChannel:
 
 
 @dict_from_object.register(discord.CategoryChannel)
+@_cached(lambda channel: channel.guild.id)
 def _from_category_channel(channel: discord.CategoryChannel) -> _types.channel.CategoryChannel:
     return {
         'name': channel.name,
@@ -405,6 +760,7 @@ def _from_category_channel(channel: discord.CategoryChannel) -> _types.channel.C
 
 
 @dict_from_object.register(discord.VoiceChannel)
+@_cached(lambda channel: channel.guild.id)
 def _from_voice_channel(channel: discord.VoiceChannel) -> _types.channel.VoiceChannel:
     return {
         'name': channel.name,
@@ -579,6 +935,7 @@ def _from_scheduled_event(event: discord.ScheduledEvent) -> _types.scheduled_eve
 
 
 @dict_from_object.register(discord.Guild)
+@_cached(lambda guild: guild.id)
 def _from_guild(guild: discord.Guild) -> _types.guild.Guild:
     return {
         'id': guild.id,
@@ -637,8 +994,8 @@ def _from_poll(poll: discord.Poll) -> _types.poll.Poll:
     out: _types.poll.Poll = {
         'allow_multiselect': poll.multiple,
         'answers': [dict_from_object(answer, count=False) for answer in poll.answers],
-        'expiry': (poll.expires_at or (dt.datetime.now(tz=dt.timezone.utc) + poll.duration)).isoformat(),
-        'layout_type': poll.layout_type,  # type: ignore[typeddict-item]
+        'expiry': (poll.expires_at or (utcnow() + poll.duration)).isoformat(),
+        'layout_type': poll.layout_type.value,
         'question': dict_from_object(poll._question_media),
         'results': {
             'is_finalized': poll.is_finalized(),
@@ -817,8 +1174,8 @@ def make_message_dict(
     if isinstance(channel, discord.abc.GuildChannel):
         kwargs["guild_id"] = channel.guild.id
     if isinstance(author, discord.Member):
-        author = author._user
         kwargs["member"] = dict_from_object(author)
+        author = author._user
     if timestamp is None:
         timestamp = str(int(discord.utils.snowflake_time(id_num).timestamp()))
     mentions_json = list(map(user_with_member, mentions)) if mentions else []
@@ -0,0 +1,249 @@
+"""
+    Measurement of how long the client takes to respond to messages. While a session has a
+    :py:class:`LatencyTracker`, every message faked with :py:func:`discord.ext.test.runner.message` is linked
+    to the messages the client sends or edits in response, either because they happen in a handler the message
+    started, or because they reply to it. Latencies are kept per command, from the moment the message is
+    delivered to the client's first response.
+
+    .. code:: python
+
+        tracker = dpytest.track_latency()
+        for _ in range(100):
+            await dpytest.message("!ping")
+        assert tracker.commands["ping"].percentile(95) < 0.01
+
+    The pytest plugin can also track every test using ``dpytest_bot``, and write a report when the run ends, with
+    ``--dpytest-latency-report=latency.json``.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import math
+import os
+import time
+from typing import Any, Iterator
+
+import discord
+from discord.ext import commands
+
+from . import utils
+from .session import get_session
+
+
+class _Pending:
+    """
+        A faked message waiting for the client to respond
+    """
+
+    __slots__ = ("message_id", "start", "first_reply", "replies", "handlers")
+
+    def __init__(self, message_id: int) -> None:
+        self.message_id = message_id
+        self.start = time.perf_counter()
+        self.first_reply: float | None = None
+        self.replies = 0
+        self.handlers = 0
+
+    def reply(self) -> None:
+        if self.first_reply is None:
+            self.first_reply = time.perf_counter() - self.start
+        self.replies += 1
+
+
+# The faked message whose handlers are running, inherited by the tasks dispatch starts for it
+_current: contextvars.ContextVar[_Pending | None] = contextvars.ContextVar("dpytest_latency", default=None)
+
+
+class CommandLatency:
+    """
+        Response times of one command, in seconds
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.samples: list[float] = []
+        self.unanswered = 0
+        self.replies = 0
+        self.handlers = 0
+
+    @property
+    def count(self) -> int:
+        """
+            How many times the command was run
+        """
+        return len(self.samples) + self.unanswered
+
+    def percentile(self, percent: float) -> float:
+        """
+            Get a percentile of the response times
+
+        :param percent: Percentile to get, between 0 and 100
+        :return: Response time in seconds, or 0 if the command never responded
+        """
+        return utils.percentile(self.samples, percent)
+
+    def histogram(self) -> dict[float, int]:
+        """
+            Count response times in buckets whose upper bounds double from 0.1ms onwards
+
+        :return: Number of responses per bucket, keyed by upper bound in milliseconds
+        """
+        out: dict[float, int] = {}
+        for sample in self.samples:
+            bucket = max(0, math.ceil(math.log2(max(sample * 1000, 1e-9) / 0.1)))
+            bound = 0.1 * 2 ** bucket
+            out[bound] = out.get(bound, 0) + 1
+        return dict(sorted(out.items()))
+
+    def summary(self) -> dict[str, Any]:
+        """
+            Summarise the command's response times, in milliseconds
+
+        :return: JSON-ready summary
+        """
+        return {
+            "count": self.count,
+            "unanswered": self.unanswered,
+            "replies": self.replies,
+            "handlers": self.handlers,
+            "p50": self.percentile(50) * 1000,
+            "p95": self.percentile(95) * 1000,
+            "p99": self.percentile(99) * 1000,
+            "max": self.percentile(100) * 1000,
+            "histogram": {str(bound): count for bound, count in self.histogram().items()},
+        }
+
+
+class LatencyTracker:
+    """
+        Response times of the client, per command
+    """
+
+    def __init__(self) -> None:
+        self.commands: dict[str, CommandLatency] = {}
+        self._by_message: dict[int, _Pending] = {}
+
+    def begin(self, message_id: int) -> _Pending:
+        pending = _Pending(message_id)
+        self._by_message[message_id] = pending
+        return pending
+
+    def finish(self, pending: _Pending, command: str) -> None:
+        self._by_message.pop(pending.message_id, None)
+        stats = self.commands.get(command)
+        if stats is None:
+            stats = self.commands[command] = CommandLatency(command)
+        if pending.first_reply is None:
+            stats.unanswered += 1
+        else:
+            stats.samples.append(pending.first_reply)
+        stats.replies += pending.replies
+        stats.handlers += pending.handlers
+
+    def reply(self, reference: int | None) -> None:
+        pending = _current.get()
+        if pending is None and reference is not None:
+            pending = self._by_message.get(reference)
+        if pending is not None:
+            pending.reply()
+
+    def report(self) -> dict[str, dict[str, Any]]:
+        """
+            Summarise the response times of every command, see :py:meth:`CommandLatency.summary`
+
+        :return: JSON-ready report, keyed by command
+        """
+        return {name: stats.summary() for name, stats in sorted(self.commands.items())}
+
+    def format(self) -> str:
+        """
+            Human readable table of the response times of every command
+        """
+        lines = [f"{'command':<24}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for name, summary in self.report().items():
+            lines.append(f"{name:<24}{summary['count']:>7}{summary['p50']:>10.2f}{summary['p95']:>10.2f}"
+                         f"{summary['p99']:>10.2f}{summary['max']:>10.2f}")
+        return "\n".join(lines)
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        """
+            Write the report to a JSON file
+
+        :param path: File to write
+        """
+        with open(path, "w", encoding="utf-8") as fd:
+            json.dump(self.report(), fd, indent=2)
+
+
+def track_latency(tracker: LatencyTracker | None = None) -> LatencyTracker:
+    """
+        Start tracking response times in the current session
+
+    :param tracker: Tracker to add to, to collect results across sessions, or None for a new one
+    :return: The tracker in use
+    """
+    if tracker is None:
+        tracker = LatencyTracker()
+    get_session().latency = tracker
+    return tracker
+
+
+def stop_tracking_latency() -> LatencyTracker | None:
+    """
+        Stop tracking response times in the current session
+
+    :return: The tracker that was in use, if any
+    """
+    session = get_session()
+    tracker = session.latency
+    session.latency = None
+    return tracker
+
+
+@contextlib.contextmanager
+def measure(pending: _Pending) -> Iterator[_Pending]:
+    """
+        Link what the client does in a ``with`` block, and in the handlers it starts there, to a faked message,
+        and count those handlers. Deliver the message inside the block.
+
+    :param pending: The faked message, from :py:meth:`LatencyTracker.begin`
+    """
+    before = _handler_tasks()
+    token = _current.set(pending)
+    try:
+        yield pending
+    finally:
+        _current.reset(token)
+        pending.handlers += len(_handler_tasks() - before)
+
+
+def note_reply(reference: int | None = None) -> None:
+    """
+        Tell the tracker of the current session, if any, that the client sent or edited a message
+
+    :param reference: Id of the message it replied to, if any
+    """
+    tracker = get_session().latency
+    if tracker is not None:
+        tracker.reply(reference)
+
+
+async def command_name(client: discord.Client, message: discord.Message) -> str:
+    """
+        Work out which command a message runs, to group its response times by
+
+    :param client: Client the message was sent to
+    :param message: Message that was sent
+    :return: Qualified name of the command, ``(no command)`` if a bot doesn't have one, or the first word of the
+             message for other clients
+    """
+    if isinstance(client, (commands.Bot, commands.AutoShardedBot)):
+        ctx: commands.Context[Any] = await client.get_context(message)
+        return ctx.command.qualified_name if ctx.command is not None else "(no command)"
+    return message.content.split(maxsplit=1)[0] if message.content.strip() else "(empty)"
+
+
+def _handler_tasks() -> set[asyncio.Task[Any]]:
+    return {t for t in asyncio.all_tasks() if getattr(t.get_coro(), "__name__", None) == "_run_event"}
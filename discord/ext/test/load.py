@@ -0,0 +1,272 @@
+"""
+    Load generation against the configured client, to capacity-test its handlers. Simulated members send
+    messages, add reactions and join guilds for a given duration, without waiting for the client to be idle
+    between actions, as real users wouldn't.
+
+    In an open loop, actions arrive at a target rate whether or not the client keeps up, so the delay between
+    when an action was due and when it could be sent shows how far behind the event loop fell. In a closed loop,
+    a fixed number of workers each act as a random simulated member, wait for the handlers of that action to
+    finish, then think for a while before acting again, so the rate is whatever the client can sustain.
+
+    Simulated members only act in the guild they are in: they send messages in its channels and react to
+    messages sent there.
+
+    .. code:: python
+
+        report = await dpytest.generate_load(10.0, rate=200, users=50, contents=["!ping", "!help", "hello"])
+        print(report.format())
+        assert report.errors == 0
+"""
+
+import asyncio
+import collections
+import itertools
+import math
+import random
+import time
+from typing import Any, Iterable, Literal, NamedTuple
+
+import discord
+
+from . import backend as back, factories as facts, utils
+from .runner import get_config
+from .session import get_session
+
+Action = Literal["message", "reaction", "join"]
+
+DEFAULT_MIX: dict[Action, float] = {"message": 0.8, "reaction": 0.15, "join": 0.05}
+DEFAULT_EMOJIS = ("\N{THUMBS UP SIGN}", "\N{HEAVY BLACK HEART}", "\N{FACE WITH TEARS OF JOY}")
+
+
+class LoadReport(NamedTuple):
+    """
+        Results of a load run. Queueing delays are measured from when an action was due until it was sent, and
+        latencies from sending it until every handler it started has finished, both in seconds.
+    """
+
+    actions: dict[str, int]
+    duration: float
+    queue_delays: list[float]
+    latencies: list[float]
+    errors: int
+    error_types: dict[str, int]
+    failed: int
+    replies: int
+
+    @property
+    def total(self) -> int:
+        """
+            Number of actions sent
+        """
+        return sum(self.actions.values())
+
+    @property
+    def throughput(self) -> float:
+        """
+            Actions handled per second
+        """
+        return self.total / self.duration if self.duration > 0 else math.inf
+
+    def percentile(self, percent: float, queueing: bool = False) -> float:
+        """
+            Get a percentile of the handler latencies, or of the queueing delays
+
+        :param percent: Percentile to get, between 0 and 100
+        :param queueing: Whether to look at queueing delays instead of latencies
+        :return: Time in seconds, or 0 if nothing was sent
+        """
+        return utils.percentile(self.queue_delays if queueing else self.latencies, percent)
+
+    def format(self) -> str:
+        """
+            Human readable summary of the run
+        """
+        actions = ", ".join(f"{count} {name}" for name, count in self.actions.items())
+        return (f"{self.total} actions ({actions}) in {self.duration:.3f}s, {self.throughput:.1f} actions/s, "
+                f"{self.replies} replies, {self.errors} command errors, {self.failed} failed actions\n"
+                f"latency p50 {self.percentile(50) * 1000:.2f}ms p95 {self.percentile(95) * 1000:.2f}ms "
+                f"p99 {self.percentile(99) * 1000:.2f}ms max {self.percentile(100) * 1000:.2f}ms, "
+                f"queueing p50 {self.percentile(50, True) * 1000:.2f}ms "
+                f"p99 {self.percentile(99, True) * 1000:.2f}ms max {self.percentile(100, True) * 1000:.2f}ms")
+
+
+class _LoadRun:
+    """
+        State of one load run: the simulated members, what they can act on, and the measurements so far
+    """
+
+    def __init__(self, members: list[discord.Member], channels: list[discord.TextChannel], mix: dict[Action, float],
+                 contents: list[str], emojis: list[str], rng: random.Random,
+                 collector: utils.HandlerCollector) -> None:
+        self.members = members
+        # Channels and recent messages of each guild, so members only act where they are
+        self.channels: dict[int, list[discord.TextChannel]] = {}
+        for channel in channels:
+            self.channels.setdefault(channel.guild.id, []).append(channel)
+        self.guilds = [chans[0].guild for chans in self.channels.values()]
+        self.recent: dict[int, collections.deque[discord.Message]] = {
+            guild_id: collections.deque(maxlen=100) for guild_id in self.channels
+        }
+        self.kinds = list(mix)
+        self.weights = list(mix.values())
+        self.contents = contents
+        self.emojis = emojis
+        self.rng = rng
+        self.collector = collector
+        self.actions: collections.Counter[str] = collections.Counter()
+        self.queue_delays: list[float] = []
+        self.latencies: list[float] = []
+        self.handlers: set[asyncio.Task[None]] = set()
+        self.error_types: collections.Counter[str] = collections.Counter()
+        self.failed = 0
+        self.replies = 0
+
+    def _act(self, member: discord.Member) -> None:
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        recent = self.recent[member.guild.id]
+        if kind == "reaction" and not recent:
+            kind = "message"
+
+        if kind == "message":
+            channel = self.rng.choice(self.channels[member.guild.id])
+            content = self.rng.choice(self.contents)
+            recent.append(back.make_message(content, member, channel))
+        elif kind == "reaction":
+            back.add_reaction(self.rng.choice(recent), member, self.rng.choice(self.emojis))
+        else:
+            guild = self.rng.choice(self.guilds)
+            user = back.make_user("LoadUser", self.rng.randint(1, 9999))
+            self.members.append(back.make_member(user, guild))
+        self.actions[kind] += 1
+
+    def act(self, due: float) -> asyncio.Future[Any] | None:
+        """
+            Send an action from a random simulated member
+
+        :param due: When the action was due, from ``time.perf_counter``
+        :return: Future done once every handler the action started has finished, or None if it started none
+        """
+        start = time.perf_counter()
+        self.queue_delays.append(max(0.0, start - due))
+        try:
+            self._act(self.rng.choice(self.members))
+        except Exception:
+            self.failed += 1
+        started = self.collector.take()
+        self.handlers.update(started)
+        if not started:
+            self.latencies.append(time.perf_counter() - start)
+            return None
+
+        done = asyncio.gather(*started, return_exceptions=True)
+        done.add_done_callback(lambda _: self.latencies.append(time.perf_counter() - start))
+        return done
+
+    def drain(self) -> None:
+        """
+            Count and take off the messages and command errors the client queued so far
+        """
+        session = get_session()
+        while not session.sent_queue.empty():
+            session.sent_queue.get_nowait()
+            self.replies += 1
+        while not session.error_queue.empty():
+            _, error = session.error_queue.get_nowait()
+            self.error_types[type(error).__name__] += 1
+
+
+async def _open_loop(run: _LoadRun, duration: float, rate: float, poisson: bool) -> None:
+    begin = due = time.perf_counter()
+    while True:
+        due += run.rng.expovariate(rate) if poisson else 1 / rate
+        if due - begin >= duration:
+            break
+        # Always yield, so handlers get to run even when the loop is behind
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        run.act(due)
+        run.drain()
+
+
+async def _closed_loop(run: _LoadRun, duration: float, concurrency: int, think: float) -> None:
+    end = time.perf_counter() + duration
+
+    async def user() -> None:
+        due = time.perf_counter()
+        while due < end:
+            done = run.act(due)
+            if done is not None:
+                await done
+            else:
+                await asyncio.sleep(0)
+            run.drain()
+            due = time.perf_counter() + (run.rng.expovariate(1 / think) if think > 0 else 0.0)
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+
+
+async def generate_load(
+        duration: float,
+        rate: float | None = None,
+        *,
+        users: int = 10,
+        concurrency: int | None = None,
+        think: float = 0.0,
+        mix: dict[Action, float] | None = None,
+        contents: Iterable[str] = ("!ping",),
+        emojis: Iterable[str] = DEFAULT_EMOJIS,
+        channels: Iterable[discord.TextChannel] | None = None,
+        poisson: bool = True,
+        seed: int | None = None,
+) -> LoadReport:
+    """
+        Drive simulated members against the configured client for a while, and measure how its handlers keep up.
+        Messages the client sends and command errors it raises during the run are counted, and taken off the
+        session's queues.
+
+    :param duration: How long to send actions for, in seconds
+    :param rate: Actions per second to send in an open loop, or None for a closed loop
+    :param users: Number of simulated members. Configured members of the guilds of ``channels`` are used first,
+                  and more are made to join those guilds if there aren't enough.
+    :param concurrency: Members acting at once in a closed loop, all of them if None
+    :param think: Mean time a member waits between actions in a closed loop, in seconds
+    :param mix: Relative weight of each kind of action
+    :param contents: Contents to pick messages from
+    :param emojis: Emojis to pick reactions from
+    :param channels: Channels to act in, every configured text channel if None
+    :param poisson: Whether open loop arrivals are random, like independent users, rather than evenly spaced
+    :param seed: Seed of the simulation's choices, the session's seed if None
+    :return: Throughput, latencies, queueing delays and error counts of the run
+    """
+    if rate is not None and rate <= 0:
+        raise ValueError("Load rate must be positive")
+    config = get_config()
+    client = config.client
+    channel_list = list(channels) if channels is not None else [
+        c for c in config.channels if isinstance(c, discord.TextChannel)
+    ]
+    if not channel_list:
+        raise ValueError("Load generation needs at least one text channel")
+
+    guilds = list({c.guild.id: c.guild for c in channel_list}.values())
+    members = list(itertools.islice((m for m in config.members if m.guild in guilds), users))
+    while len(members) < users:
+        user = back.make_user("LoadUser", len(members) % 9999 + 1)
+        members.append(back.make_member(user, guilds[len(members) % len(guilds)]))
+
+    # Collect the handler tasks every action starts
+    collector = utils.HandlerCollector(client)
+    run = _LoadRun(members, channel_list, mix or DEFAULT_MIX, list(contents), list(emojis),
+                   random.Random(facts.get_seed() if seed is None else seed), collector)
+    begin = time.perf_counter()
+    with collector:
+        if rate is not None:
+            await _open_loop(run, duration, rate, poisson)
+        else:
+            await _closed_loop(run, duration, concurrency or users, think)
+
+    if run.handlers:
+        await asyncio.wait(run.handlers)
+    run.drain()
+    return LoadReport(dict(run.actions), time.perf_counter() - begin, run.queue_delays, run.latencies,
+                      sum(run.error_types.values()), dict(run.error_types), run.failed, run.replies)
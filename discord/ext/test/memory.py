@@ -0,0 +1,241 @@
+"""
+    Tracking of the memory each test leaves behind, with ``tracemalloc``. Traces are cleared before every test,
+    so a snapshot after it holds exactly the allocations it made that are still alive. Each of those is attributed
+    to the first frame of its traceback that is in dpytest or in the code under test (the bot and its tests).
+    Allocations that discord.py or other libraries made on their behalf count as theirs, so a cache growing in
+    discord.py's state because dpytest fed it events counts as dpytest's.
+
+    Memory left behind is added up per origin over the session, though memory freed by a later test isn't taken
+    off, as only the allocations of the running test are traced. To tell real growth apart, the number of live
+    objects is counted after each test, and memory is flagged as growing when that count went up after every one
+    of many consecutive tests.
+
+    Enable it for a pytest run with the ``--dpytest-memory`` option of :py:mod:`discord.ext.test.plugin`, and write
+    the full report as JSON with ``--dpytest-memory-report=PATH``. Tracing makes tests several times slower.
+"""
+
+import functools
+import gc
+import json
+import linecache
+import os
+import tracemalloc
+from typing import Any, NamedTuple
+
+import discord
+
+# Whose code allocations are attributed to
+ORIGINS = ("dpytest", "bot", "discord.py", "other")
+
+_DPYTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+_DISCORD_DIR = os.path.dirname(os.path.abspath(discord.__file__))
+_LIBRARY_DIRS = tuple({
+    os.path.dirname(os.path.abspath(os.__file__)),
+    os.path.dirname(_DISCORD_DIR),
+})
+
+# Files whose allocations are part of tracing and test collection, and never a test's fault
+_IGNORED = frozenset({
+    tracemalloc.__file__,
+    linecache.__file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+})
+
+
+@functools.lru_cache(maxsize=None)
+def origin_of(filename: str) -> str:
+    """
+        Work out whose code a source file is
+
+    :param filename: Path of the file
+    :return: One of :py:data:`ORIGINS`
+    """
+    path = os.path.abspath(filename)
+    if path.startswith(_DPYTEST_DIR):
+        return "dpytest"
+    if path.startswith(_DISCORD_DIR):
+        return "discord.py"
+    if path.startswith(_LIBRARY_DIRS) or filename.startswith("<"):
+        return "other"
+    return "bot"
+
+
+class AllocationSite(NamedTuple):
+    """
+        Memory a test allocated at one line and didn't free
+    """
+
+    origin: str
+    filename: str
+    lineno: int
+    size: int
+    blocks: int
+
+
+class RetainedMemory(NamedTuple):
+    """
+        Memory a test left behind, in bytes
+    """
+
+    nodeid: str
+    retained: int
+    by_origin: dict[str, int]
+    top: list[AllocationSite]
+    objects: int
+
+
+class MemoryTracker:
+    """
+        Snapshots of the memory traced around each test, and what each test left behind
+    """
+
+    def __init__(self, top: int = 10, frames: int = 10, window: int = 10) -> None:
+        """
+            Create a tracker. Tracing starts with the first test.
+
+        :param top: Allocation sites to keep per test
+        :param frames: Frames to keep per traceback, more find the code responsible for an allocation further down
+                       the stack, at the cost of speed
+        :param window: Consecutive tests the number of live objects must go up after to be flagged
+        """
+        self.top = top
+        self.frames = frames
+        self.window = window
+        self.tests: list[RetainedMemory] = []
+        self.held = dict.fromkeys(ORIGINS, 0)
+        self._active = False
+        self._started = False
+
+    @staticmethod
+    def _attribute(frames: tuple[tuple[str, int], ...]) -> tuple[str, str, int]:
+        # The first dpytest or bot frame is responsible, else whatever allocated
+        for filename, lineno in frames:
+            origin = origin_of(filename)
+            if origin in ("dpytest", "bot"):
+                return origin, filename, lineno
+        filename, lineno = frames[0] if frames else ("<unknown>", 0)
+        return origin_of(filename), filename, lineno
+
+    def begin(self) -> None:
+        """
+            Start tracing the allocations of a test. Traces of earlier allocations are cleared, so a snapshot after
+            the test only holds what it left behind.
+        """
+        gc.collect()
+        if tracemalloc.is_tracing():
+            tracemalloc.clear_traces()
+        else:
+            tracemalloc.start(self.frames)
+            self._started = True
+        self._active = True
+
+    def end(self, nodeid: str) -> RetainedMemory | None:
+        """
+            Work out what a test left behind, from the allocations it made that are still alive
+
+        :param nodeid: Test that ran
+        :return: Memory it left behind, or None if :py:meth:`begin` wasn't called
+        """
+        if not self._active or not tracemalloc.is_tracing():
+            return None
+        self._active = False
+        gc.collect()
+        by_origin = dict.fromkeys(ORIGINS, 0)
+        sites: dict[tuple[str, str, int], list[int]] = {}
+        # Grouped by traceback, so each distinct call stack is only attributed once
+        for stat in tracemalloc.take_snapshot().statistics("traceback"):
+            # Tracebacks go from the oldest frame to the most recent one
+            frames = tuple((frame.filename, frame.lineno) for frame in reversed(stat.traceback))
+            if frames and frames[0][0] in _IGNORED:
+                continue
+            key = self._attribute(frames)
+            by_origin[key[0]] += stat.size
+            site = sites.get(key)
+            if site is None:
+                sites[key] = [stat.size, stat.count]
+            else:
+                site[0] += stat.size
+                site[1] += stat.count
+
+        top = sorted(
+            (AllocationSite(origin, filename, lineno, size, blocks)
+             for (origin, filename, lineno), (size, blocks) in sites.items()),
+            key=lambda s: s.size, reverse=True,
+        )[:self.top]
+        result = RetainedMemory(nodeid, sum(by_origin.values()), by_origin, top, len(gc.get_objects()))
+        self.tests.append(result)
+        for origin, size in by_origin.items():
+            self.held[origin] += size
+        return result
+
+    def stop(self) -> None:
+        """
+            Stop tracing, if this tracker started it
+        """
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def growing(self) -> dict[str, int]:
+        """
+            Check whether the number of live objects went up after every one of the last ``window`` tests
+
+        :return: Memory each origin left behind over those tests, keyed by origin, or nothing if it didn't grow
+        """
+        recent = self.tests[-self.window - 1:]
+        if len(recent) <= self.window or not all(a.objects < b.objects for a, b in zip(recent, recent[1:])):
+            return {}
+        return {origin: sum(test.by_origin[origin] for test in recent[1:]) for origin in ORIGINS}
+
+    def report(self) -> dict[str, Any]:
+        """
+            Summarise the memory left behind by the whole run
+
+        :return: JSON-ready report
+        """
+        return {
+            "held": self.held,
+            "growing": self.growing(),
+            "tests": [
+                {
+                    "nodeid": test.nodeid,
+                    "retained": test.retained,
+                    "by_origin": test.by_origin,
+                    "objects": test.objects,
+                    "top": [site._asdict() for site in test.top],
+                }
+                for test in self.tests
+            ],
+        }
+
+    def format(self, tests: int = 5) -> str:
+        """
+            Human readable summary of the tests that left the most behind, and of the origins growing
+
+        :param tests: How many tests to show
+        """
+        lines = []
+        for test in sorted(self.tests, key=lambda t: t.retained, reverse=True)[:tests]:
+            if test.retained <= 0:
+                break
+            lines.append(f"{test.retained / 1024:10.1f} KiB  {test.nodeid}")
+            for site in test.top[:3]:
+                lines.append(f"{site.size / 1024:22.1f} KiB  {site.origin:<10} {site.filename}:{site.lineno}")
+        held = ", ".join(f"{origin} {size / 1024:.1f} KiB" for origin, size in self.held.items())
+        lines.append(f"Left behind by all tests: {held}")
+        growing = self.growing()
+        if growing:
+            grown = ", ".join(f"{origin} {size / 1024:.1f} KiB" for origin, size in growing.items())
+            lines.append(f"Live objects went up after each of the last {self.window} tests, which left behind: {grown}")
+        return "\n".join(lines)
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        """
+            Write the report to a JSON file
+
+        :param path: File to write
+        """
+        with open(path, "w", encoding="utf-8") as fd:
+            json.dump(self.report(), fd, indent=2)
@@ -0,0 +1,242 @@
+"""
+    Simulated network latency. By default every ``FakeHttp`` route completes as soon as it's awaited, and gateway
+    events reach the client's handlers straight away, which makes awaiting requests one by one look as fast as
+    batching them or using ``asyncio.gather``. With :py:func:`simulate_network`, each request waits a delay drawn
+    from a distribution for its route before being served, and each gateway event waits a delay drawn for its
+    event before being dispatched.
+
+    .. code:: python
+
+        dpytest.simulate_network(http=dpytest.LogNormal(0.05, 0.5), gateway=dpytest.Uniform(0.01, 0.03),
+                                 routes={"send_message": 0.1})
+
+    Delays are real ``asyncio.sleep`` calls, even in seeded sessions, as their point is to show how long the
+    client waits on them. The client's cache is still updated as soon as an event is sent, only dispatching the
+    event is delayed, and events of one shard are dispatched in the order they were sent, like over a websocket.
+"""
+
+import asyncio
+import bisect
+import csv
+import itertools
+import json
+import math
+import os
+import random
+from typing import Any, NamedTuple, Union
+
+from . import backend as back, factories as facts
+from .session import get_session
+
+
+class Fixed(NamedTuple):
+    """
+        A constant delay, in seconds
+    """
+
+    seconds: float
+
+    def sample(self, rng: random.Random) -> float:
+        return self.seconds
+
+
+class Uniform(NamedTuple):
+    """
+        A delay spread evenly between two bounds, in seconds
+    """
+
+    low: float
+    high: float
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.uniform(self.low, self.high)
+
+
+class LogNormal(NamedTuple):
+    """
+        A long-tailed delay, like most network round trips. Half of the delays are below the median, in seconds,
+        and sigma sets how long the tail is.
+    """
+
+    median: float
+    sigma: float
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.lognormvariate(math.log(self.median), self.sigma)
+
+
+class Histogram:
+    """
+        Delays following a histogram, such as one measured in production. Each bucket covers the delays between
+        the previous bucket's upper bound and its own, and delays are spread evenly within a bucket.
+    """
+
+    def __init__(self, buckets: dict[float, int]) -> None:
+        """
+            Create a distribution from a histogram
+
+        :param buckets: Count of delays per bucket, keyed by the bucket's upper bound in seconds
+        """
+        self.bounds = sorted(buckets)
+        self.cumulative = list(itertools.accumulate(buckets[b] for b in self.bounds))
+        if not self.cumulative or self.cumulative[-1] <= 0 or self.bounds[0] < 0:
+            raise ValueError("A latency histogram needs at least one non-empty bucket, with positive bounds")
+
+    def sample(self, rng: random.Random) -> float:
+        index = bisect.bisect_right(self.cumulative, rng.random() * self.cumulative[-1])
+        index = min(index, len(self.bounds) - 1)
+        low = self.bounds[index - 1] if index > 0 else 0.0
+        return rng.uniform(low, self.bounds[index])
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> 'Histogram':
+        """
+            Read a histogram from a file, with bucket bounds in milliseconds. JSON files hold an object of counts
+            keyed by upper bound, like the histograms of :py:mod:`discord.ext.test.latency` reports. Other files are
+            read as CSV, with an upper bound and a count per row.
+
+        :param path: File to read
+        :return: New distribution
+        """
+        with open(path, encoding="utf-8", newline="") as fd:
+            if os.fspath(path).endswith(".json"):
+                buckets = {float(bound): int(count) for bound, count in json.load(fd).items()}
+            else:
+                # Rows that don't start with a number, like a header, are skipped
+                buckets = {float(row[0]): int(row[1]) for row in csv.reader(fd) if row and _is_number(row[0])}
+        return cls({bound / 1000: count for bound, count in buckets.items()})
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+Distribution = Union[Fixed, Uniform, LogNormal, Histogram]
+
+
+def _distribution(value: Distribution | float) -> Distribution:
+    return Fixed(float(value)) if isinstance(value, (int, float)) else value
+
+
+class NetworkConditions:
+    """
+        Latency distributions of one session's network, and the delays drawn from them so far
+    """
+
+    def __init__(
+            self,
+            http: Distribution | float | None = None,
+            gateway: Distribution | float | None = None,
+            *,
+            routes: dict[str, Distribution | float] | None = None,
+            events: dict[str, Distribution | float] | None = None,
+            seed: int | None = None,
+    ) -> None:
+        self.http = _distribution(http) if http is not None else None
+        self.gateway = _distribution(gateway) if gateway is not None else None
+        self.routes = {name: _distribution(value) for name, value in (routes or {}).items()}
+        self.events = {name: _distribution(value) for name, value in (events or {}).items()}
+        if seed is None:
+            seed = facts.get_seed()
+        self.rng = random.Random(seed)
+        self.http_delays: list[float] = []
+        self.gateway_delays: list[float] = []
+
+    def http_delay(self, route: str) -> float:
+        """
+            Draw the delay of a request
+
+        :param route: Name of the route requested
+        :return: Delay in seconds, 0 if the route has no latency
+        """
+        dist = self.routes.get(route, self.http)
+        if dist is None:
+            return 0.0
+        delay = max(0.0, dist.sample(self.rng))
+        self.http_delays.append(delay)
+        return delay
+
+    def gateway_delay(self, event: str) -> float:
+        """
+            Draw the delay of a gateway event
+
+        :param event: Name of the event, such as ``MESSAGE_CREATE``
+        :return: Delay in seconds, 0 if the event has no latency
+        """
+        dist = self.events.get(event, self.gateway)
+        if dist is None:
+            return 0.0
+        delay = max(0.0, dist.sample(self.rng))
+        self.gateway_delays.append(delay)
+        return delay
+
+    def wrap_http(self, name: str, func: back.HttpRoute) -> back.HttpRoute:
+        """
+            ``FakeHttp`` middleware delaying every request to a route
+
+        :param name: Name of the route
+        :param func: Function serving the route
+        :return: Delayed wrapper around it
+        """
+        if name not in self.routes and self.http is None:
+            return func
+
+        async def delayed_http(*args: Any, **kwargs: Any) -> Any:
+            delay = self.http_delay(name)
+            if delay:
+                await asyncio.sleep(delay)
+            return await func(*args, **kwargs)
+
+        back.transparent_frames.add(delayed_http.__code__)
+        return delayed_http
+
+
+def simulate_network(
+        http: Distribution | float | None = None,
+        gateway: Distribution | float | None = None,
+        *,
+        routes: dict[str, Distribution | float] | None = None,
+        events: dict[str, Distribution | float] | None = None,
+        seed: int | None = None,
+) -> NetworkConditions:
+    """
+        Start delaying the current session's HTTP requests and gateway events, replacing any latency it already has.
+        Delays can be given as distributions, or as a number of seconds for a fixed delay.
+
+    :param http: Delay of requests to every route not in ``routes``
+    :param gateway: Delay of every gateway event not in ``events``
+    :param routes: Delay of requests per ``FakeHttp`` route name, such as ``send_message``
+    :param events: Delay per gateway event name, such as ``MESSAGE_CREATE``
+    :param seed: Seed of the delays drawn, the session's seed if None
+    :return: The new network conditions
+    """
+    stop_simulating_network()
+    network = NetworkConditions(http, gateway, routes=routes, events=events, seed=seed)
+    get_session().network = network
+    state = back.get_state()
+    state.network = network
+    state.http.add_middleware(network.wrap_http)
+    return network
+
+
+def stop_simulating_network() -> NetworkConditions | None:
+    """
+        Stop delaying the current session's HTTP requests and gateway events. Events already delayed are still
+        dispatched.
+
+    :return: The network conditions that were in use, if any
+    """
+    session = get_session()
+    network = session.network
+    if network is None:
+        return None
+    session.network = None
+    if session.backend is not None:
+        state = session.backend.state
+        state.network = None
+        state.http.remove_middleware(network.wrap_http)
+    return network
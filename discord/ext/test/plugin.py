@@ -0,0 +1,191 @@
+"""
+    Pytest plugin providing a configured bot that is shared between many tests, instead of building and configuring
+    a new client (and reloading its extensions) for every single test. In between tests the world is put back
+    with :py:func:`discord.ext.test.runner.reset`, which is much cheaper than a new ``configure``.
+
+    Enable it by adding ``pytest_plugins = ("discord.ext.test.plugin",)`` to your root ``conftest.py``, then
+    override ``dpytest_make_bot`` to build your bot and request ``dpytest_bot`` in your tests. The shared bot lives
+    in the session event loop, so tests using it should be marked ``@pytest.mark.asyncio(loop_scope="session")``.
+
+    .. code:: python
+
+        # conftest.py
+        import discord
+        import pytest_asyncio
+        from discord.ext import commands
+
+        pytest_plugins = ("discord.ext.test.plugin",)
+
+
+        @pytest_asyncio.fixture(scope="session", loop_scope="session")
+        async def dpytest_make_bot() -> discord.Client:
+            bot = commands.Bot(command_prefix="!", intents=discord.Intents.all())
+
+            @bot.command()
+            async def ping(ctx: commands.Context[commands.Bot]) -> None:
+                await ctx.send("Pong !")
+
+            return bot
+
+        # test_ping.py
+        import discord
+        import pytest
+        import discord.ext.test as dpytest
+
+
+        @pytest.mark.asyncio(loop_scope="session")
+        async def test_ping(dpytest_bot: discord.Client) -> None:
+            await dpytest.message("!ping")
+            assert dpytest.verify().message().content("Pong !")
+
+    The bot is shared for the whole session by default, set the ``dpytest_bot_scope`` ini option to ``module``
+    or ``package`` to share it for less.
+
+    Response times of the shared bot are only tracked when asked for, see :py:mod:`discord.ext.test.latency`.
+    Passing ``--dpytest-latency-report=PATH``, or setting the ``dpytest_latency_report`` ini option, tracks them
+    over the whole run and writes them to ``PATH`` as JSON at the end.
+
+    Passing ``--dpytest-memory`` traces the memory each test leaves behind, see :py:mod:`discord.ext.test.memory`,
+    and summarises it at the end of the run. ``--dpytest-memory-report=PATH`` also writes the full report as JSON.
+"""
+
+from typing import Any, AsyncGenerator, Generator
+
+import discord
+import pytest
+import pytest_asyncio
+from discord.client import _LoopSentinel
+from discord.ext import commands
+
+from . import latency, memory, runner
+
+_latency_key = pytest.StashKey[latency.LatencyTracker]()
+_memory_key = pytest.StashKey[memory.MemoryTracker]()
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addini("dpytest_bot_scope", "Scope of the shared dpytest bot: session, package or module",
+                  default="session")
+    parser.addini("dpytest_latency_report", "Track response times of the shared dpytest bot, and write them to "
+                  "this path as JSON", default="")
+    parser.addoption("--dpytest-latency-report", metavar="PATH", default=None,
+                     help="Track response times of the shared dpytest bot, and write them to PATH as JSON")
+    parser.addoption("--dpytest-memory", action="store_true", default=False,
+                     help="Trace the memory each test leaves behind, and summarise it at the end")
+    parser.addoption("--dpytest-memory-report", metavar="PATH", default=None,
+                     help="Trace the memory each test leaves behind, and write the report to PATH as JSON")
+    parser.addoption("--dpytest-memory-frames", metavar="N", type=int, default=10,
+                     help="Frames traced per allocation, more find the code responsible further down the stack")
+
+
+def _latency_report(config: pytest.Config) -> str | None:
+    return config.getoption("dpytest_latency_report", None) or config.getini("dpytest_latency_report") or None
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    if _latency_report(config):
+        config.stash[_latency_key] = latency.LatencyTracker()
+    if config.getoption("dpytest_memory", False) or config.getoption("dpytest_memory_report", None):
+        config.stash[_memory_key] = memory.MemoryTracker(frames=config.getoption("dpytest_memory_frames"))
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_protocol(item: pytest.Item) -> Generator[None, object, object]:
+    tracker = item.config.stash.get(_memory_key, None)
+    if tracker is None:
+        return (yield)
+    tracker.begin()
+    try:
+        return (yield)
+    finally:
+        tracker.end(item.nodeid)
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    tracker = session.config.stash.get(_latency_key, None)
+    path = _latency_report(session.config)
+    if tracker is not None and path:
+        tracker.save(path)
+
+    mem_tracker = session.config.stash.get(_memory_key, None)
+    mem_path = session.config.getoption("dpytest_memory_report", None)
+    if mem_tracker is not None:
+        mem_tracker.stop()
+        if mem_path:
+            mem_tracker.save(mem_path)
+
+
+def pytest_terminal_summary(terminalreporter: Any, config: pytest.Config) -> None:
+    tracker = config.stash.get(_memory_key, None)
+    if tracker is not None and tracker.tests:
+        terminalreporter.write_sep("-", "dpytest memory retained per test")
+        terminalreporter.write_line(tracker.format())
+
+
+def _bot_scope(fixture_name: str, config: pytest.Config) -> Any:
+    scope = config.getini("dpytest_bot_scope")
+    if scope not in ("session", "package", "module"):
+        raise ValueError(f"Invalid dpytest_bot_scope '{scope}', must be one of session, package or module")
+    return scope
+
+
+@pytest.fixture(scope=_bot_scope)
+def dpytest_configure_options() -> dict[str, Any]:
+    """
+        Keyword arguments passed to :py:func:`discord.ext.test.runner.configure` for the shared bot.
+        Override to configure a different world.
+    """
+    return {}
+
+
+@pytest_asyncio.fixture(scope=_bot_scope, loop_scope="session")
+async def dpytest_make_bot() -> discord.Client:
+    """
+        Build the client to share between tests. Override to build your own bot and load its extensions,
+        this only runs once per scope.
+    """
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    return commands.Bot(command_prefix="!", intents=intents)
+
+
+@pytest_asyncio.fixture(scope=_bot_scope, loop_scope="session")
+async def dpytest_shared_bot(
+        dpytest_make_bot: discord.Client,
+        dpytest_configure_options: dict[str, Any],
+) -> AsyncGenerator[discord.Client, None]:
+    """
+        The configured client shared by every test in the scope. Prefer ``dpytest_bot``, which also resets
+        the world after each test.
+    """
+    bot = dpytest_make_bot
+    if isinstance(bot.loop, _LoopSentinel):
+        await bot._async_setup_hook()
+    runner.configure(bot, **dpytest_configure_options)
+    yield bot
+    await runner.empty_queue()
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def dpytest_bot(
+        dpytest_shared_bot: discord.Client,
+        dpytest_configure_options: dict[str, Any],
+        pytestconfig: pytest.Config,
+) -> AsyncGenerator[discord.Client, None]:
+    """
+        The shared configured client, reset to its configured state after the test. Callback subscribers the
+        test added are removed then, unless subscribed with ``keep``.
+    """
+    # Someone else configured a different client since, so start over for this one
+    if runner.get_config().client is not dpytest_shared_bot:
+        runner.configure(dpytest_shared_bot, **dpytest_configure_options)
+    tracker = pytestconfig.stash.get(_latency_key, None)
+    if tracker is not None:
+        latency.track_latency(tracker)
+    try:
+        yield dpytest_shared_bot
+    finally:
+        if tracker is not None:
+            latency.stop_tracking_latency()
+    await runner.reset()
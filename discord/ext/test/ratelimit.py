@@ -0,0 +1,237 @@
+"""
+    Opt-in emulation of discord's rate limits in ``FakeHttp``. Every route gets a bucket per major parameter (the
+    channel or guild it acts on), all routes share the global limit of 50 requests per second, and messages are
+    limited to 5 per 5 seconds in each channel.
+
+    When a request is limited, the limiter either waits the limit out, like discord.py does when it gets a 429,
+    or raises the 429 itself, to test a bot's own backoff logic. With a seeded, deterministic session (see
+    :py:func:`discord.ext.test.factories.seed`) time follows the logical clock, so waiting advances that clock
+    instead of sleeping.
+"""
+
+import asyncio
+import datetime as dt
+import inspect
+import time
+from typing import Any, Literal, NamedTuple
+
+import discord
+
+from . import backend as back, factories as facts
+from .session import get_session
+
+
+class RouteLimit(NamedTuple):
+    """
+        Requests allowed on a route per major parameter, within a window of seconds
+    """
+
+    limit: int
+    per: float
+
+
+# Known limits of the routes dpytest serves, routes not listed only count towards the global limit
+DEFAULT_ROUTE_LIMITS: dict[str, RouteLimit] = {
+    "send_message": RouteLimit(5, 5.0),
+    "edit_message": RouteLimit(5, 5.0),
+    "delete_message": RouteLimit(5, 1.0),
+    "add_reaction": RouteLimit(1, 0.25),
+    "remove_reaction": RouteLimit(1, 0.25),
+    "remove_own_reaction": RouteLimit(1, 0.25),
+    "clear_reactions": RouteLimit(1, 0.25),
+    "pin_message": RouteLimit(5, 5.0),
+    "unpin_message": RouteLimit(5, 5.0),
+    "edit_member": RouteLimit(10, 10.0),
+    "add_role": RouteLimit(10, 10.0),
+    "remove_role": RouteLimit(10, 10.0),
+    "change_my_nickname": RouteLimit(1, 1.0),
+    "create_channel": RouteLimit(5, 5.0),
+    "delete_channel": RouteLimit(5, 5.0),
+    "create_role": RouteLimit(5, 5.0),
+    "edit_role": RouteLimit(5, 5.0),
+}
+GLOBAL_LIMIT = RouteLimit(50, 1.0)
+
+# Routes that aren't part of the API, like the CDN, and never rate limited
+_UNLIMITED = frozenset({"get_from_cdn"})
+_MAJOR_PARAMETERS = ("channel_id", "guild_id", "webhook_id")
+
+
+class _Bucket:
+    """
+        Fixed window bucket, refilled all at once when its window resets, like discord's
+    """
+
+    __slots__ = ("limit", "per", "remaining", "reset_at")
+
+    def __init__(self, limit: RouteLimit) -> None:
+        self.limit = limit.limit
+        self.per = limit.per
+        self.remaining = limit.limit
+        self.reset_at = 0.0
+
+    def retry_after(self, now: float) -> float:
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per
+        return 0.0 if self.remaining > 0 else self.reset_at - now
+
+
+class RateLimiter:
+    """
+        Rate limit state of one ``FakeHttp``, and counts of the limits it hit
+    """
+
+    def __init__(
+            self,
+            routes: dict[str, RouteLimit] | None = None,
+            global_limit: RouteLimit | None = GLOBAL_LIMIT,
+            on_limit: Literal["wait", "raise"] = "wait",
+    ) -> None:
+        if on_limit not in ("wait", "raise"):
+            raise ValueError(f"Unknown rate limit behaviour '{on_limit}'")
+        self.routes = DEFAULT_ROUTE_LIMITS if routes is None else routes
+        self.global_limit = global_limit
+        self.on_limit = on_limit
+        self._global = _Bucket(global_limit) if global_limit is not None else None
+        self._buckets: dict[tuple[str, Any], _Bucket] = {}
+        self.requests = 0
+        self.limited = 0
+        self.waited = 0.0
+        self.hits: dict[str, int] = {}
+
+    @staticmethod
+    def now() -> float:
+        """
+            Current time in seconds, from the logical clock when the session is seeded
+        """
+        if facts.get_seed() is not None:
+            return facts.utcnow().timestamp()
+        return time.monotonic()
+
+    def check(self, route: str, major: Any = None) -> tuple[float, bool]:
+        """
+            Count a request against its buckets, if none of them is exhausted
+
+        :param route: Name of the route requested
+        :param major: Major parameter of the request, the channel or guild id it acts on
+        :return: Seconds until the request may be retried, 0 if it went through, and whether the global limit
+                 was the one hit
+        """
+        now = self.now()
+        bucket = None
+        limit = self.routes.get(route)
+        if limit is not None:
+            bucket = self._buckets.get((route, major))
+            if bucket is None:
+                bucket = self._buckets[(route, major)] = _Bucket(limit)
+
+        global_retry = self._global.retry_after(now) if self._global is not None else 0.0
+        route_retry = bucket.retry_after(now) if bucket is not None else 0.0
+        if global_retry or route_retry:
+            self.limited += 1
+            self.hits[route] = self.hits.get(route, 0) + 1
+            return max(global_retry, route_retry), global_retry >= route_retry
+
+        self.requests += 1
+        if self._global is not None:
+            self._global.remaining -= 1
+        if bucket is not None:
+            bucket.remaining -= 1
+        return 0.0, False
+
+    async def wait(self, seconds: float) -> None:
+        """
+            Wait a rate limit out, moving the logical clock when the session is seeded
+        """
+        self.waited += seconds
+        if facts.get_seed() is not None:
+            facts.advance_clock(dt.timedelta(seconds=seconds))
+        else:
+            await asyncio.sleep(seconds)
+
+    def wrap_http(self, name: str, func: back.HttpRoute) -> back.HttpRoute:
+        """
+            ``FakeHttp`` middleware applying the limits to every request to a route
+
+        :param name: Name of the route
+        :param func: Function serving the route
+        :return: Rate limited wrapper around it
+        """
+        if name in _UNLIMITED:
+            return func
+        params = list(inspect.signature(func).parameters)
+        major_name = next((p for p in _MAJOR_PARAMETERS if p in params), None)
+        major_index = params.index(major_name) if major_name is not None else -1
+
+        async def rate_limited_http(*args: Any, **kwargs: Any) -> Any:
+            major = None
+            if 0 <= major_index < len(args):
+                major = args[major_index]
+            elif major_name is not None:
+                major = kwargs.get(major_name)
+            while True:
+                retry_after, is_global = self.check(name, major)
+                if not retry_after:
+                    return await func(*args, **kwargs)
+                if self.on_limit == "raise":
+                    raise _too_many_requests(name, retry_after, is_global)
+                http = back.get_state().http
+                if http.max_ratelimit_timeout is not None and retry_after > http.max_ratelimit_timeout:
+                    raise discord.RateLimited(retry_after)
+                await self.wait(retry_after)
+
+        back.transparent_frames.add(rate_limited_http.__code__)
+        return rate_limited_http
+
+
+def _too_many_requests(route: str, retry_after: float, is_global: bool) -> discord.HTTPException:
+    response = back.FakeRequest(429, "Too Many Requests")
+    response.headers["Retry-After"] = str(retry_after)
+    response.headers["X-RateLimit-Bucket"] = route
+    response.headers["X-RateLimit-Scope"] = "global" if is_global else "user"
+    if is_global:
+        response.headers["X-RateLimit-Global"] = "true"
+    return discord.HTTPException(response, {
+        "message": "You are being rate limited.",
+        "retry_after": retry_after,
+        "global": is_global,
+        "code": 0,
+    })
+
+
+def enable_rate_limits(
+        routes: dict[str, RouteLimit] | None = None,
+        global_limit: RouteLimit | None = GLOBAL_LIMIT,
+        on_limit: Literal["wait", "raise"] = "wait",
+) -> RateLimiter:
+    """
+        Start emulating rate limits for the current session's client, replacing any limits it already has
+
+    :param routes: Limits per route name, :py:data:`DEFAULT_ROUTE_LIMITS` if None
+    :param global_limit: Limit shared by all routes, or None for no global limit
+    :param on_limit: ``wait`` to wait limits out like discord.py does, ``raise`` to raise the 429 as an
+                     ``HTTPException``
+    :return: The new limiter
+    """
+    disable_rate_limits()
+    limiter = RateLimiter(routes, global_limit, on_limit)
+    get_session().rate_limiter = limiter
+    back.get_state().http.add_middleware(limiter.wrap_http)
+    return limiter
+
+
+def disable_rate_limits() -> RateLimiter | None:
+    """
+        Stop emulating rate limits for the current session's client
+
+    :return: The limiter that was in use, if any
+    """
+    session = get_session()
+    limiter = session.rate_limiter
+    if limiter is None:
+        return None
+    session.rate_limiter = None
+    if session.backend is not None:
+        session.backend.state.http.remove_middleware(limiter.wrap_http)
+    return limiter
@@ -0,0 +1,232 @@
+"""
+    Recorder of everything the backend does for a client: HTTP routes served by ``FakeHttp``, gateway events
+    parsed by the state, callbacks dispatched, and the event handlers of the client they start. Records go into
+    a bounded ring buffer with monotonic timestamps and the task they ran in, and can be exported to the Chrome
+    trace event format, to look at in ``chrome://tracing`` or Perfetto.
+
+    .. code:: python
+
+        with dpytest.recording() as recorder:
+            await dpytest.message("!slow")
+        recorder.save_chrome_trace("slow.json")
+"""
+
+import asyncio
+import collections
+import contextlib
+import json
+import os
+import time
+import weakref
+from typing import Any, Callable, Coroutine, Iterator, NamedTuple
+
+import discord
+
+from . import backend as back
+from .session import get_session
+
+
+class ActivityRecord(NamedTuple):
+    """
+        One recorded operation. Times are ``time.perf_counter_ns`` values.
+    """
+
+    kind: str
+    name: str
+    start: int
+    end: int
+    task: int
+    args: dict[str, Any] | None
+
+
+class ActivityRecorder:
+    """
+        Bounded record of backend activity. Once full, the oldest records are dropped to make room.
+    """
+
+    records: collections.deque[ActivityRecord]
+
+    def __init__(self, capacity: int = 100_000) -> None:
+        if capacity <= 0:
+            raise ValueError("Recorder capacity must be positive")
+        self.records = collections.deque(maxlen=capacity)
+        self.dropped = 0
+        self.started = time.perf_counter_ns()
+        self._task_ids: weakref.WeakKeyDictionary[asyncio.Task[Any], int] = weakref.WeakKeyDictionary()
+        self._task_names: dict[int, str] = {0: "no task"}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _task_id(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            return 0
+        task_id = self._task_ids.get(task)
+        if task_id is None:
+            task_id = self._task_ids[task] = len(self._task_names)
+            self._task_names[task_id] = task.get_name()
+        return task_id
+
+    def add(self, kind: str, name: str, start: int, end: int | None = None, args: dict[str, Any] | None = None) -> None:
+        """
+            Add a record for an operation that happened in the current task
+
+        :param kind: Kind of operation, such as ``http`` or ``gateway``
+        :param name: Name of the operation
+        :param start: When it started, from ``time.perf_counter_ns``
+        :param end: When it ended, or None for now
+        :param args: Extra details to show with it
+        """
+        if end is None:
+            end = time.perf_counter_ns()
+        if len(self.records) == self.records.maxlen:
+            self.dropped += 1
+        self.records.append(ActivityRecord(kind, name, start, end, self._task_id(), args))
+
+    @contextlib.contextmanager
+    def span(self, kind: str, name: str, args: dict[str, Any] | None = None) -> Iterator[None]:
+        """
+            Record the duration of a ``with`` block
+
+        :param kind: Kind of operation
+        :param name: Name of the operation
+        :param args: Extra details to show with it
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add(kind, name, start, args=args)
+
+    def clear(self) -> None:
+        """
+            Drop all records
+        """
+        self.records.clear()
+        self.dropped = 0
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """
+            Export the records in the Chrome trace event format, one thread per task
+
+        :return: Trace, ready to be dumped as JSON
+        """
+        events: list[dict[str, Any]] = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+            for tid, name in self._task_names.items()
+        ]
+        for record in self.records:
+            event = {
+                "name": record.name,
+                "cat": record.kind,
+                "ph": "X",
+                "ts": (record.start - self.started) / 1000,
+                "dur": (record.end - record.start) / 1000,
+                "pid": 1,
+                "tid": record.task,
+            }
+            if record.args:
+                event["args"] = record.args
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"dropped": self.dropped}}
+
+    def wrap_http(self, name: str, func: back.HttpRoute) -> back.HttpRoute:
+        """
+            ``FakeHttp`` middleware recording every request to a route
+
+        :param name: Name of the route
+        :param func: Function serving the route
+        :return: Recording wrapper around it
+        """
+        async def recorded_http(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter_ns()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.add("http", name, start)
+
+        back.transparent_frames.add(recorded_http.__code__)
+        return recorded_http
+
+    def save_chrome_trace(self, path: str | os.PathLike[str]) -> None:
+        """
+            Write the records to a file in the Chrome trace event format
+
+        :param path: File to write
+        """
+        with open(path, "w", encoding="utf-8") as fd:
+            json.dump(self.to_chrome_trace(), fd, default=str)
+
+
+def start_recording(capacity: int = 100_000) -> ActivityRecorder:
+    """
+        Start recording the activity of the current session's client, replacing any recorder it already has
+
+    :param capacity: Most records to keep, older ones are dropped
+    :return: The new recorder
+    """
+    stop_recording()
+    session = get_session()
+    if session.runner is None:
+        raise RuntimeError("Configure a client before recording it")
+    recorder = ActivityRecorder(capacity)
+    session.recorder = recorder
+
+    state = back.get_state()
+    state.recorder = recorder
+    state.http.add_middleware(recorder.wrap_http)
+
+    client = session.runner.client
+    run_event = client._run_event
+
+    async def _run_event(coro: Callable[..., Coroutine[Any, Any, Any]], event_name: str,
+                         *args: Any, **kwargs: Any) -> None:
+        start = time.perf_counter_ns()
+        try:
+            await run_event(coro, event_name, *args, **kwargs)
+        finally:
+            recorder.add("handler", getattr(coro, "__qualname__", event_name), start, args={"event": event_name})
+
+    client._run_event = _run_event  # type: ignore[method-assign]
+    return recorder
+
+
+def stop_recording() -> ActivityRecorder | None:
+    """
+        Stop recording the current session's client
+
+    :return: The recorder that was in use, if any
+    """
+    session = get_session()
+    recorder = session.recorder
+    if recorder is None:
+        return None
+    session.recorder = None
+
+    if session.backend is not None:
+        state = session.backend.state
+        state.recorder = None
+        state.http.remove_middleware(recorder.wrap_http)
+    if session.runner is not None:
+        client: discord.Client = session.runner.client
+        client.__dict__.pop("_run_event", None)
+    return recorder
+
+
+@contextlib.contextmanager
+def recording(capacity: int = 100_000) -> Iterator[ActivityRecorder]:
+    """
+        Record the activity of the current session's client for the duration of a ``with`` block
+
+    :param capacity: Most records to keep, older ones are dropped
+    :return: The recorder in use
+    """
+    recorder = start_recording(capacity)
+    try:
+        yield recorder
+    finally:
+        stop_recording()
@@ -0,0 +1,316 @@
+"""
+    Replay of recorded gateway traffic against the configured client, to reproduce production load offline.
+
+    A trace is a JSONL file with one gateway frame per line, as read from a real shard: ``op``, ``t``, ``s`` and
+    ``d``, plus an optional ``ts`` holding the time the frame was received, in seconds. Only dispatch frames
+    are replayed. Ids in the trace are mapped onto the configured world, so recorded guilds, channels, members
+    and roles become the fake ones, and the handlers of the client see objects they know about.
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from typing import Any, Iterable, NamedTuple
+
+import discord
+
+from . import backend as back, factories as facts, utils
+from .runner import RunnerConfig, get_config
+
+
+class TraceEvent(NamedTuple):
+    """
+        One dispatch frame of a recorded trace
+    """
+
+    time: float | None
+    event: str
+    data: dict[str, Any]
+
+
+# Events that would rebuild the configured world instead of acting inside it
+DEFAULT_SKIPPED = frozenset({"READY", "RESUMED", "GUILD_CREATE", "GUILD_DELETE"})
+
+# Keys holding the ids of a known kind of object, and keys holding objects of a known kind
+_ID_KEYS = {
+    "guild_id": "guild", "channel_id": "channel", "parent_id": "channel", "user_id": "user", "owner_id": "user",
+    "role_id": "role", "message_id": "message", "last_message_id": "message",
+}
+_ID_LIST_KEYS = {"roles": "role", "mention_roles": "role", "user_ids": "user"}
+_OBJECT_KEYS = {
+    "author": "user", "user": "user", "mentions": "user", "recipients": "user", "role": "role",
+    "channel": "channel", "thread": "channel", "message": "message", "referenced_message": "message",
+}
+# Kind of the top level ``id`` of an event, by event name prefix
+_EVENT_KINDS = (
+    ("MESSAGE_", "message"), ("CHANNEL_", "channel"), ("THREAD_", "channel"), ("GUILD_", "guild"),
+)
+
+_MENTION = re.compile(r"<(@!?|@&|#)([0-9]{15,21})>")
+
+
+def load_trace(trace: str | os.PathLike[str] | Iterable[str]) -> list[TraceEvent]:
+    """
+        Read a recorded gateway trace
+
+    :param trace: Path of a JSONL trace file, or an iterable of its lines
+    :return: Dispatch events of the trace, in order
+    """
+    if isinstance(trace, (str, os.PathLike)):
+        with open(trace, encoding="utf-8") as fd:
+            return load_trace(list(fd))
+
+    out = []
+    for line in trace:
+        line = line.strip()
+        if not line:
+            continue
+        frame = json.loads(line)
+        if frame.get("op", 0) != 0 or not frame.get("t"):
+            continue
+        ts = frame.get("ts")
+        out.append(TraceEvent(None if ts is None else float(ts), frame["t"], frame.get("d") or {}))
+    return out
+
+
+class IdRemapper:
+    """
+        Consistently maps the ids of a recorded trace onto the configured world. Guilds, channels, members and
+        roles are handed out round-robin, in order of first appearance, inside the guild they were seen in. Ids of
+        anything else, like messages, get a fresh snowflake.
+    """
+
+    def __init__(self, config: RunnerConfig, bot_id: int | None = None) -> None:
+        self.config = config
+        self._maps: dict[str, dict[int, int]] = {"guild": {}, "channel": {}, "user": {}, "role": {}, "other": {}}
+        self._counters: dict[tuple[str, int | None], int] = {}
+        self._pools: dict[tuple[str, int | None], list[Any]] = {}
+        self._users: dict[int, discord.user.BaseUser] = {}
+        user = config.client.user
+        if bot_id is not None and user is not None:
+            self._maps["user"][bot_id] = user.id
+            self._users[user.id] = user
+
+    def _pool(self, kind: str, guild: discord.Guild | None) -> list[Any]:
+        if kind == "guild":
+            return self.config.guilds
+        if guild is None:
+            return []
+        if kind == "channel":
+            return guild.text_channels
+        if kind == "role":
+            return [r for r in guild.roles if not r.is_default()]
+        me = self.config.client.user
+        return [m for m in guild.members if me is None or m.id != me.id]
+
+    def map_id(self, kind: str, old: int, guild: discord.Guild | None = None) -> int:
+        """
+            Map one id of the trace
+
+        :param kind: Kind of object the id is for: guild, channel, user, role, or anything else
+        :param old: Id in the trace
+        :param guild: Configured guild the id was seen in, if any
+        :return: Id in the configured world
+        """
+        if kind == "role" and old in self._maps["guild"]:
+            # The default role shares the id of its guild
+            return self._maps["guild"][old]
+        mapping = self._maps.get(kind, self._maps["other"])
+        new = mapping.get(old)
+        if new is not None:
+            return new
+
+        key = (kind, None if guild is None or kind == "guild" else guild.id)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = self._pool(kind, guild) if kind in self._maps else []
+        if pool:
+            count = self._counters.get(key, 0)
+            self._counters[key] = count + 1
+            obj = pool[count % len(pool)]
+            new = obj.id
+            if kind == "user":
+                self._users[new] = obj._user
+        else:
+            new = facts.make_id()
+        mapping[old] = new
+        return new
+
+    def _map_value(self, kind: str, value: Any, guild: discord.Guild | None) -> Any:
+        if isinstance(value, int):
+            return self.map_id(kind, value, guild)
+        if isinstance(value, str) and value.isdigit():
+            return str(self.map_id(kind, int(value), guild))
+        return value
+
+    def _map_content(self, content: str, guild: discord.Guild | None) -> str:
+        kinds = {"@": "user", "@!": "user", "@&": "role", "#": "channel"}
+
+        def repl(match: re.Match[str]) -> str:
+            return f"<{match[1]}{self.map_id(kinds[match[1]], int(match[2]), guild)}>"
+
+        return _MENTION.sub(repl, content)
+
+    def _map_object(self, obj: dict[str, Any], kind: str, guild: discord.Guild | None) -> dict[str, Any]:
+        out: dict[str, Any] = {}
+        for key, value in obj.items():
+            if key == "id":
+                out[key] = self._map_value(kind, value, guild)
+            elif key in _ID_KEYS:
+                out[key] = self._map_value(_ID_KEYS[key], value, guild)
+            elif key in _ID_LIST_KEYS and isinstance(value, list):
+                out[key] = [self._map_value(_ID_LIST_KEYS[key], v, guild) for v in value]
+            elif isinstance(value, dict):
+                out[key] = self._map_object(value, _OBJECT_KEYS.get(key, "other"), guild)
+            elif isinstance(value, list):
+                sub_kind = _OBJECT_KEYS.get(key, "other")
+                out[key] = [self._map_object(v, sub_kind, guild) if isinstance(v, dict) else v for v in value]
+            elif key == "content" and isinstance(value, str):
+                out[key] = self._map_content(value, guild)
+            else:
+                out[key] = value
+
+        if kind == "user" and (user := self._users.get(int(out.get("id", 0)))) is not None:
+            # Show the configured user, not the recorded one, so the client doesn't see a user update
+            out.update(username=user.name, discriminator=user.discriminator, global_name=user.global_name,
+                       avatar=user._avatar)
+        return out
+
+    def remap(self, event: str, data: dict[str, Any]) -> dict[str, Any]:
+        """
+            Map all ids in the payload of an event
+
+        :param event: Name of the event
+        :param data: Payload from the trace
+        :return: New payload, acting on the configured world
+        """
+        guild = None
+        guild_id = data.get("guild_id")
+        if guild_id is None and event.startswith("GUILD_"):
+            guild_id = data.get("id")
+        if guild_id is not None:
+            guild = discord.utils.get(self.config.guilds, id=self.map_id("guild", int(guild_id)))
+
+        kind = next((kind for prefix, kind in _EVENT_KINDS if event.startswith(prefix)), "other")
+        return self._map_object(data, kind, guild)
+
+
+class ReplayReport(NamedTuple):
+    """
+        Results of a trace replay. Latencies are measured from delivering an event until every handler it
+        started has finished, in seconds.
+    """
+
+    events: int
+    skipped: int
+    duration: float
+    latencies: list[float]
+
+    @property
+    def throughput(self) -> float:
+        """
+            Events handled per second
+        """
+        return self.events / self.duration if self.duration > 0 else math.inf
+
+    def percentile(self, percent: float) -> float:
+        """
+            Get a percentile of the handler latencies
+
+        :param percent: Percentile to get, between 0 and 100
+        :return: Latency in seconds, or 0 if nothing was replayed
+        """
+        return utils.percentile(self.latencies, percent)
+
+    def format(self) -> str:
+        """
+            Human readable summary of the replay
+        """
+        return (f"{self.events} events ({self.skipped} skipped) in {self.duration:.3f}s, "
+                f"{self.throughput:.1f} events/s, latency p50 {self.percentile(50) * 1000:.2f}ms "
+                f"p95 {self.percentile(95) * 1000:.2f}ms p99 {self.percentile(99) * 1000:.2f}ms "
+                f"max {self.percentile(100) * 1000:.2f}ms")
+
+
+async def replay_trace(
+        trace: str | os.PathLike[str] | Iterable[TraceEvent],
+        *,
+        speed: float | None = None,
+        skip: Iterable[str] = DEFAULT_SKIPPED,
+        bot_id: int | None = None,
+) -> ReplayReport:
+    """
+        Replay a recorded gateway trace into the configured client, and measure how its handlers keep up
+
+    :param trace: Path of a JSONL trace, or events from :py:func:`load_trace`
+    :param speed: How much faster than recorded to replay, 2 being twice as fast. None replays as fast as
+                  possible, as do traces without timestamps.
+    :param skip: Names of events not to replay
+    :param bot_id: Id of the recorded bot, mapped onto the configured client. Read from the trace's READY
+                   event if it has one.
+    :return: Throughput and latency of the replay
+    """
+    if isinstance(trace, (str, os.PathLike)):
+        trace = load_trace(trace)
+    events = list(trace)
+    skip = frozenset(skip)
+    if bot_id is None:
+        ready = next((e for e in events if e.event == "READY"), None)
+        if ready is not None and "user" in ready.data:
+            bot_id = int(ready.data["user"]["id"])
+
+    config = get_config()
+    client = config.client
+    state = back.get_state()
+    messages = back.get_config().messages
+    remapper = IdRemapper(config, bot_id)
+    latencies: list[float] = []
+
+    def _track(start: float, tasks: list[asyncio.Task[None]]) -> None:
+        if not tasks:
+            latencies.append(time.perf_counter() - start)
+            return
+        remaining = len(tasks)
+
+        def done(_: asyncio.Task[None]) -> None:
+            nonlocal remaining
+            remaining -= 1
+            if remaining == 0:
+                latencies.append(time.perf_counter() - start)
+
+        for task in tasks:
+            task.add_done_callback(done)
+
+    handlers: list[asyncio.Task[None]] = []
+    replayed = skipped = 0
+    first_ts = next((e.time for e in events if e.time is not None), None)
+    begin = time.perf_counter()
+    # Collect the handler tasks every event starts
+    with utils.HandlerCollector(client) as collector:
+        for item in events:
+            if item.event in skip or item.event not in state.parsers:
+                skipped += 1
+                continue
+
+            if speed is not None and item.time is not None and first_ts is not None:
+                delay = (item.time - first_ts) / speed - (time.perf_counter() - begin)
+                await asyncio.sleep(max(delay, 0))
+            else:
+                await asyncio.sleep(0)
+
+            data = remapper.remap(item.event, item.data)
+            start = time.perf_counter()
+            state.receive_event(item.event, data)
+            if item.event == "MESSAGE_CREATE":
+                messages.setdefault(int(data["channel_id"]), []).append(data)  # type: ignore[arg-type]
+            started = collector.take()
+            _track(start, started)
+            handlers.extend(started)
+            replayed += 1
+
+    if handlers:
+        await asyncio.wait(handlers)
+    return ReplayReport(replayed, skipped, time.perf_counter() - begin, latencies)
@@ -12,21 +12,21 @@
 import sys
 import asyncio
 import logging
-from typing import NamedTuple, Callable, Any
+from typing import NamedTuple, Callable, Any, Sequence, Generic
 
 import discord
 import pathlib
 
-from itertools import count
-
 from discord.ext import commands
 from discord.ext.commands import CommandError
 from discord.ext.commands._types import BotT
 from typing_extensions import ParamSpec, TypeVar
 
-from . import backend as back, callbacks, _types
+from . import backend as back, callbacks, factories as facts, latency, _types
 from .callbacks import CallbackEvent
+from .session import Session, get_session
 from .utils import PeekableQueue
+from .websocket import WireFormat
 
 
 class RunnerConfig(NamedTuple):
@@ -38,21 +38,37 @@ class RunnerConfig(NamedTuple):
     client: discord.Client
     guilds: list[discord.Guild]
     channels: list[discord.abc.GuildChannel]
-    members: list[discord.Member]
+    members: Sequence[discord.Member]
 
 
 log = logging.getLogger("discord.ext.tests")
-_cur_config: RunnerConfig | None = None
-sent_queue: PeekableQueue[discord.Message] = PeekableQueue()
-error_queue: PeekableQueue[tuple[
-    commands.Context[commands.Bot | commands.AutoShardedBot], CommandError
-]] = PeekableQueue()
-
 
 T = TypeVar('T')
 P = ParamSpec('P')
 
 
+class _CurrentQueue(Generic[T]):
+    """
+        Stand-in for one of the queues of the current session, so ``sent_queue`` and ``error_queue`` keep
+        working as module attributes
+    """
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(getattr(get_session(), self._name), item)
+
+    def __repr__(self) -> str:
+        return repr(getattr(get_session(), self._name))
+
+
+sent_queue: PeekableQueue[discord.Message] = _CurrentQueue("sent_queue")  # type: ignore[assignment]
+error_queue: PeekableQueue[tuple[
+    commands.Context[commands.Bot | commands.AutoShardedBot], CommandError
+]] = _CurrentQueue("error_queue")  # type: ignore[assignment]
+
+
 def require_config(func: Callable[P, T]) -> Callable[P, T]:
     """
         Decorator to enforce that configuration is completed before the decorated function is
@@ -65,7 +81,7 @@ def require_config(func: Callable[P, T]) -> Callable[P, T]:
     wrapper: _types.Wrapper[P, T]
 
     def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:  # type: ignore[no-redef]
-        if _cur_config is None:
+        if get_session().runner is None:
             log.error("Attempted to make call before runner configured")
             raise RuntimeError(f"Configure runner before calling {func.__name__}")
         return func(*args, **kwargs)
@@ -76,6 +92,10 @@ def require_config(func: Callable[P, T]) -> Callable[P, T]:
     return wrapper
 
 
+# Coroutines of the tasks that run the client's handlers, or dispatch events to them after a network delay
+_EVENT_TASKS = ("_run_event", "_delayed_dispatch")
+
+
 def _task_coro_name(task: asyncio.Task[Any]) -> str | None:
     """
         Uses getattr() to avoid AttributeErrors when the coroutine doesn't have a __name__
@@ -93,10 +113,10 @@ async def run_all_events() -> None:
             pending = asyncio.all_tasks()
         else:
             pending = asyncio.Task.all_tasks()
-        if not any(map(lambda x: _task_coro_name(x) == "_run_event" and not (x.done() or x.cancelled()), pending)):
+        if not any(map(lambda x: _task_coro_name(x) in _EVENT_TASKS and not (x.done() or x.cancelled()), pending)):
             break
         for task in pending:
-            if _task_coro_name(task) == "_run_event" and not (task.done() or task.cancelled()):
+            if _task_coro_name(task) in _EVENT_TASKS and not (task.done() or task.cancelled()):
                 await task
 
 
@@ -106,9 +126,9 @@ async def finish_on_command_error() -> None:
         wait for dpy related coroutines, not any other coroutines currently running.
     """
     if sys.version_info[1] >= 7:
-        pending = filter(lambda x: _task_coro_name(x) == "_run_event", asyncio.all_tasks())
+        pending = filter(lambda x: _task_coro_name(x) in _EVENT_TASKS, asyncio.all_tasks())
     else:
-        pending = filter(lambda x: _task_coro_name(x) == "_run_event", asyncio.Task.all_tasks())
+        pending = filter(lambda x: _task_coro_name(x) in _EVENT_TASKS, asyncio.Task.all_tasks())
     for task in pending:
         if not (task.done() or task.cancelled()):
             await task
@@ -121,10 +141,11 @@ def get_message(peek: bool = False) -> discord.Message:
     :param peek: If true, message will not be removed from the queue
     :return: Most recent message from the queue
     """
+    queue = get_session().sent_queue
     if peek:
-        message = sent_queue.peek()
+        message = queue.peek()
     else:
-        message = sent_queue.get_nowait()
+        message = queue.get_nowait()
     return message
 
 
@@ -136,10 +157,11 @@ def get_embed(peek: bool = False) -> discord.Embed:
     :return: Embed of the most recent message in the queue
     """
 
+    queue = get_session().sent_queue
     if peek:
-        message = sent_queue.peek()
+        message = queue.peek()
     else:
-        message = sent_queue.get_nowait()
+        message = queue.get_nowait()
     return message.embeds[0]
 
 
@@ -149,10 +171,32 @@ async def empty_queue() -> None:
         is not immediately added to after running.
     """
     await run_all_events()
-    while not sent_queue.empty():
-        await sent_queue.get()
-    while not error_queue.empty():
-        await error_queue.get()
+    session = get_session()
+    while not session.sent_queue.empty():
+        await session.sent_queue.get()
+    while not session.error_queue.empty():
+        await session.error_queue.get()
+
+
+@require_config
+async def reset() -> None:
+    """
+        Cheaply put the configured world back to how :py:func:`configure` left it, without rebuilding the client.
+        Empties the queues, restores the runner callbacks, forgets stored messages, removes any channels, roles
+        and members created since and recreates deleted ones. In a seeded session, ids and random choices start
+        over from where :py:func:`configure` left them. Subscribers to the callbacks are removed, except those
+        subscribed with ``keep`` such as open event streams. Meant to be called in between tests sharing one
+        configured bot.
+    """
+    await empty_queue()
+
+    callbacks.clear_callbacks(subscribers=True, keep=True)
+    callbacks.set_callback(_message_callback, CallbackEvent.send_message)
+    callbacks.set_callback(_edit_member_callback, CallbackEvent.edit_member)
+
+    snapshot = get_session().snapshot
+    if snapshot is not None:
+        back.restore_snapshot(snapshot)
 
 
 async def _message_callback(message: discord.Message) -> None:
@@ -161,7 +205,7 @@ async def _message_callback(message: discord.Message) -> None:
 
     :param message: Message sent on discord
     """
-    await sent_queue.put(message)
+    await get_session().sent_queue.put(message)
 
 
 async def _edit_member_callback(fields: Any, member: discord.Member, reason: str | None) -> None:
@@ -181,9 +225,6 @@ async def _edit_member_callback(fields: Any, member: discord.Member, reason: str
         guild._update_voice_state(data, channel)  # type: ignore[arg-type]
 
 
-counter = count(0)
-
-
 @require_config
 async def message(
         content: str,
@@ -210,7 +251,7 @@ async def message(
     attachments_model = [
         discord.Attachment(
             data={
-                'id': counter.__next__(),
+                'id': facts.make_id(),
                 'filename': os.path.basename(attachment),
                 'size': 0,
                 'url': str(attachment),
@@ -222,12 +263,22 @@ async def message(
         ) for attachment in attachments
     ]
 
-    mes = back.make_message(content, member, channel, attachments=attachments_model)
-
-    await run_all_events()
-
-    if not error_queue.empty():
-        err = await error_queue.get()
+    tracker = get_session().latency
+    if tracker is None:
+        mes = back.make_message(content, member, channel, attachments=attachments_model)
+        await run_all_events()
+    else:
+        # Handlers started for the message inherit the pending context, linking their responses to it
+        pending = tracker.begin(facts.make_id())
+        with latency.measure(pending):
+            mes = back.make_message(content, member, channel, attachments=attachments_model,
+                                    id_num=pending.message_id)
+        await run_all_events()
+        tracker.finish(pending, await latency.command_name(get_config().client, mes))
+
+    queue = get_session().error_queue
+    if not queue.empty():
+        err = await queue.get()
         raise err[1]
 
     return mes
@@ -281,8 +332,7 @@ async def add_role(member: discord.Member | int, role: discord.Role) -> None:
     if not isinstance(role, discord.Role):
         raise TypeError("Role argument must be of type discord.Role")
 
-    roles = [role] + [x for x in member.roles if x.id != member.guild.id]
-    back.update_member(member, roles=roles)
+    back.update_members([member], add=[role])
 
 
 @require_config
@@ -298,8 +348,7 @@ async def remove_role(member: discord.Member | int, role: discord.Role) -> None:
     if not isinstance(role, discord.Role):
         raise TypeError("Role argument must be of type discord.Role")
 
-    roles = [x for x in member.roles if x.id != role.id and x.id != member.guild.id]
-    back.update_member(member, roles=roles)
+    back.update_members([member], remove=[role])
 
 
 @require_config
@@ -346,15 +395,14 @@ async def member_join(
     :param name: If creating a new user, the name of the user. None to auto-generate
     :param discrim: If creating a new user, the discrim of the user. None to auto-generate
     """
-    import random
     if isinstance(guild, int):
-        guild = _cur_config.guilds[guild]  # type: ignore[union-attr]
+        guild = get_config().guilds[guild]
 
     if user is None:
         if name is None:
             name = "TestUser"
         if discrim is None:
-            discrim = random.randint(1, 9999)
+            discrim = facts.get_rng().randint(1, 9999)
         user = back.make_user(name, discrim)
     elif name is not None or discrim is not None:
         raise ValueError("Cannot supply user at the same time as name/discrim")
@@ -368,34 +416,47 @@ def get_config() -> RunnerConfig:
 
     :return: Current runner config
     """
-    if _cur_config is None:
+    config = get_session().runner
+    if config is None:
         raise RuntimeError("Runner not configured yet")
-    return _cur_config
+    return config
 
 
 def configure(client: discord.Client,
               guilds: int | list[str] = 1,
               text_channels: int | list[str] = 1,
               voice_channels: int | list[str] = 1,
-              members: int | list[str] = 1) -> None:
+              members: int | list[str] = 1,
+              lazy_members: bool = False,
+              seed: int | None = None,
+              wire_format: WireFormat | None = None) -> Session:
     """
         Set up the runner configuration. This should be done before any tests are run.
 
-    :param client: Client to configure with. Should be the bot/client that is going to be tested.
+    :param client: Client to configure with. Should be the bot/client that is going to be tested. Sharded clients
+                   get one websocket per shard, using the client's ``shard_count`` (or a single shard if unset).
     :param guilds: Number or list of names of guilds to start the configuration with. Default is 1
     :param text_channels: Number or list of names of text channels in each guild to start with. Default is 1
     :param voice_channels: Number or list of names of voice channels in each guild to start with. Default is 1.
     :param members: Number or list of names of members in each guild (other than the client) to start with. Default is 1.
+    :param lazy_members: Whether to only create members once the client touches them. Useful for very large guilds.
+    :param seed: Seed to make ids, timestamps and random choices reproducible from here on, see :py:func:`discord.ext.test.factories.seed`
+    :param wire_format: Send events to the client as real gateway frames, ``json`` or ``zlib-stream``, instead of calling its parsers directly. Slower, but exercises the whole gateway path like production does.
+    :return: The session of the newly configured client, made current for the calling context
     """  # noqa: E501
 
-    global _cur_config
-
     if not isinstance(client, discord.Client):
         raise TypeError("Runner client must be an instance of discord.Client")
-    if isinstance(client, discord.AutoShardedClient):
-        raise TypeError("Sharded clients not yet supported")
+    # Callbacks or queued messages set up before the first configure are kept, otherwise start over
+    session = get_session()
+    if session.backend is not None:
+        session = Session()
+    session.make_current()
+
+    if seed is not None:
+        facts.seed(seed)
 
-    back.configure(client)
+    back.configure(client, wire_format=wire_format)
 
     # Wrap on_error so errors will be reported
     old_error = None
@@ -409,7 +470,7 @@ def configure(client: discord.Client,
             if old_error:
                 await old_error(ctx, error)
         finally:
-            await error_queue.put((ctx, error))
+            await session.error_queue.put((ctx, error))
 
     on_command_error.__old__ = old_error
 
@@ -432,7 +493,7 @@ def configure(client: discord.Client,
             _guilds.append(guild)
 
     _channels: list[discord.abc.GuildChannel] = []
-    _members = []
+    _members: list[discord.Member] | back.LazyMemberList = back.LazyMemberList() if lazy_members else []
     for guild in _guilds:
         # Text channels
         if isinstance(text_channels, int):
@@ -455,12 +516,19 @@ def configure(client: discord.Client,
                 _channels.append(voice)
 
         # Members
-        if isinstance(members, int):
+        if isinstance(_members, back.LazyMemberList):
+            if isinstance(members, int):
+                names = [f"TestUser{str(num)}" for num in range(members)]
+            else:
+                names = members
+            nicks = [f"{name}_{str(num)}_nick" for num, name in enumerate(names)]
+            _members.extend(guild, back.make_lazy_members(guild, names, nicks))
+        elif isinstance(members, int):
             for num in range(members):
                 user = back.make_user(f"TestUser{str(num)}", f"{num + 1:04}")
                 member = back.make_member(user, guild, nick=f"{user.name}_{str(num)}_nick")
                 _members.append(member)
-        if isinstance(members, list):
+        elif isinstance(members, list):
             for num, name in enumerate(members):
                 user = back.make_user(name, f"{num + 1:04}")
                 member = back.make_member(user, guild, nick=f"{user.name}_{str(num)}_nick")
@@ -472,4 +540,6 @@ def configure(client: discord.Client,
 
     back.get_state().start_dispatch()
 
-    _cur_config = RunnerConfig(client, _guilds, _channels, _members)
+    session.runner = RunnerConfig(client, _guilds, _channels, _members)
+    session.snapshot = back.take_snapshot()
+    return session
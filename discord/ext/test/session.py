@@ -0,0 +1,130 @@
+"""
+    Module holding the per-client state of dpytest. Every configured client gets its own :py:class:`Session`,
+    containing the backend state, runner configuration, message queues and callbacks. The module-level functions
+    of the library act on whichever session is current, which allows running many isolated bots at once.
+
+    :py:func:`discord.ext.test.runner.configure` makes its session current for the calling context (so tasks
+    started from it inherit it), and the default for contexts that haven't picked one. To run bots concurrently,
+    configure each one in its own task or thread, or switch between them with :py:meth:`Session.activate`.
+"""
+
+import contextlib
+import contextvars
+import random
+from typing import TYPE_CHECKING, Any, Iterator
+
+import discord
+from discord.ext import commands
+
+from .utils import PeekableQueue
+
+if TYPE_CHECKING:
+    from .backend import BackendState, BackendSnapshot
+    from .callbacks import CallbackBus
+    from .factories import SnowflakeGenerator
+    from .latency import LatencyTracker
+    from .network import NetworkConditions
+    from .ratelimit import RateLimiter
+    from .recorder import ActivityRecorder
+    from .runner import RunnerConfig
+
+
+class Session:
+    """
+        One isolated fake discord, and the client configured against it
+    """
+
+    backend: 'BackendState | None'
+    runner: 'RunnerConfig | None'
+    snapshot: 'BackendSnapshot | None'
+    sent_queue: PeekableQueue[discord.Message]
+    error_queue: PeekableQueue[tuple[commands.Context[commands.Bot | commands.AutoShardedBot], commands.CommandError]]
+    _callbacks: 'CallbackBus | None'
+    _ids: 'SnowflakeGenerator | None'
+    rng: random.Random
+    payloads: dict[int, dict[int, tuple[object, Any]]]
+    recorder: 'ActivityRecorder | None'
+    latency: 'LatencyTracker | None'
+    rate_limiter: 'RateLimiter | None'
+    network: 'NetworkConditions | None'
+
+    def __init__(self) -> None:
+        self.backend = None
+        self.runner = None
+        self.snapshot = None
+        self.sent_queue = PeekableQueue()
+        self.error_queue = PeekableQueue()
+        self._callbacks = None
+        self._ids = None
+        self.rng = random.Random()
+        # guild id -> id(obj) -> (obj, payload), see factories.dict_from_object
+        self.payloads = {}
+        self.recorder = None
+        self.latency = None
+        self.rate_limiter = None
+        self.network = None
+
+    @property
+    def callbacks(self) -> 'CallbackBus':
+        """
+            Callbacks and subscribers of the events of this session
+        """
+        if self._callbacks is None:
+            # Imported here, as the callbacks module needs this one
+            from .callbacks import CallbackBus
+            self._callbacks = CallbackBus()
+        return self._callbacks
+
+    @property
+    def ids(self) -> 'SnowflakeGenerator':
+        """
+            Generator of the ids and timestamps of this session, see :py:func:`discord.ext.test.factories.seed`
+        """
+        if self._ids is None:
+            # Imported here, as the factories module needs this one
+            from .factories import SnowflakeGenerator
+            self._ids = SnowflakeGenerator()
+        return self._ids
+
+    @ids.setter
+    def ids(self, value: 'SnowflakeGenerator') -> None:
+        self._ids = value
+
+    def __repr__(self) -> str:
+        client = self.runner.client if self.runner is not None else None
+        return f"<Session client={client!r}>"
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator['Session']:
+        """
+            Make this session current for the duration of a ``with`` block, in the current context only
+        """
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def make_current(self) -> None:
+        """
+            Make this session current for the calling context, and the default for any context without one
+        """
+        global _default
+        _default = self
+        _current.set(self)
+
+
+_current: contextvars.ContextVar[Session | None] = contextvars.ContextVar("dpytest_session", default=None)
+_default: Session = Session()
+
+
+def get_session() -> Session:
+    """
+        Get the session current for the calling context, or the default session if none was picked
+
+    :return: Current session
+    """
+    session = _current.get()
+    if session is None:
+        return _default
+    return session
@@ -4,8 +4,9 @@
 """
 
 import asyncio
+import time
 from asyncio import Future
-from typing import TypeVar, ParamSpec, Any, Literal, overload
+from typing import TypeVar, ParamSpec, Any, Callable, Literal, overload, TYPE_CHECKING
 
 import discord
 import discord.http as dhttp
@@ -14,12 +15,54 @@ import discord.state as dstate
 from . import _types
 from . import factories as facts
 from . import backend as back
+from .session import Session, get_session
 from .voice import FakeVoiceChannel
+from .websocket import FakeWebSocket
+
+if TYPE_CHECKING:
+    from .network import NetworkConditions
+    from .recorder import ActivityRecorder
 
 
 P = ParamSpec('P')
 T = TypeVar('T')
 
+# Events that can't change any payload cached by ``factories.dict_from_object``
+_PAYLOAD_SAFE_EVENTS = ("MESSAGE_", "GUILD_MEMBER", "TYPING_", "PRESENCE_", "CHANNEL_PINS_")
+# Events that can change the names of a guild's members, see ``backend.member_index``. Member joins, updates and
+# removals are applied to the index one member at a time instead.
+_MEMBER_INDEX_EVENTS = ("GUILD_CREATE", "GUILD_DELETE", "PRESENCE_UPDATE")
+_MEMBER_EVENTS = ("GUILD_MEMBER_ADD", "GUILD_MEMBER_UPDATE", "GUILD_MEMBER_REMOVE")
+# Events that can change someone's permissions in a guild, see ``backend.permissions_for``
+_PERMISSION_EVENTS = ("GUILD_ROLE_", "GUILD_MEMBER_UPDATE", "GUILD_MEMBER_REMOVE", "GUILD_CREATE", "GUILD_UPDATE",
+                      "GUILD_DELETE", "CHANNEL_UPDATE", "CHANNEL_DELETE")
+# Intents the client needs for discord to send it each event, in guilds and in DMs. Other events are always sent.
+_EVENT_INTENTS: dict[str, tuple[str, str | None]] = {
+    "GUILD_MEMBER_ADD": ("members", None),
+    "GUILD_MEMBER_UPDATE": ("members", None),
+    "GUILD_MEMBER_REMOVE": ("members", None),
+    "PRESENCE_UPDATE": ("presences", None),
+    "VOICE_STATE_UPDATE": ("voice_states", None),
+    "GUILD_BAN_ADD": ("moderation", None),
+    "GUILD_BAN_REMOVE": ("moderation", None),
+    "GUILD_EMOJIS_UPDATE": ("expressions", None),
+    "GUILD_STICKERS_UPDATE": ("expressions", None),
+    "INVITE_CREATE": ("invites", None),
+    "INVITE_DELETE": ("invites", None),
+    "WEBHOOKS_UPDATE": ("webhooks", None),
+    "MESSAGE_CREATE": ("guild_messages", "dm_messages"),
+    "MESSAGE_UPDATE": ("guild_messages", "dm_messages"),
+    "MESSAGE_DELETE": ("guild_messages", "dm_messages"),
+    "MESSAGE_DELETE_BULK": ("guild_messages", "dm_messages"),
+    "MESSAGE_REACTION_ADD": ("guild_reactions", "dm_reactions"),
+    "MESSAGE_REACTION_REMOVE": ("guild_reactions", "dm_reactions"),
+    "MESSAGE_REACTION_REMOVE_ALL": ("guild_reactions", "dm_reactions"),
+    "MESSAGE_REACTION_REMOVE_EMOJI": ("guild_reactions", "dm_reactions"),
+    "TYPING_START": ("guild_typing", "dm_typing"),
+    "MESSAGE_POLL_VOTE_ADD": ("guild_polls", "dm_polls"),
+    "MESSAGE_POLL_VOTE_REMOVE": ("guild_polls", "dm_polls"),
+}
+
 
 class FakeState(dstate.ConnectionState):
     """
@@ -29,6 +72,9 @@ class FakeState(dstate.ConnectionState):
 
     http: 'back.FakeHttp'  # String because of circular import
     user: discord.ClientUser
+    session: Session
+    recorder: 'ActivityRecorder | None'
+    network: 'NetworkConditions | None'
 
     def __init__(self, client: discord.Client, http: dhttp.HTTPClient, user: discord.ClientUser | None = None,
                  loop: asyncio.AbstractEventLoop | None = None) -> None:
@@ -44,8 +90,14 @@ class FakeState(dstate.ConnectionState):
             user.bot = True
         self.user = user
         self.shard_count = client.shard_count
-        self._get_websocket = lambda x: client.ws
+        self._get_websocket = client._get_websocket
         self._do_dispatch = True
+        self.session = get_session()
+        self.recorder = None
+        self.network = None
+        # Delay and shard of the gateway event being parsed, while its dispatch is delayed
+        self._delivery: tuple[float, int | None] | None = None
+        self._deliveries: dict[int | None, asyncio.Task[None]] = {}
         self._get_client = lambda: client
 
         real_disp = self.dispatch
@@ -53,10 +105,132 @@ class FakeState(dstate.ConnectionState):
         def dispatch(*args: Any, **kwargs: Any) -> Any | None:
             if not self._do_dispatch:
                 return None
+            if self._delivery is not None:
+                self._delay_dispatch(real_disp, args, kwargs)
+                return None
             return real_disp(*args, **kwargs)
 
         self.dispatch = dispatch
 
+    def receive_event(self, event: str, data: Any) -> None:
+        """
+            Handle a gateway event from the backend, as if it arrived over the websocket of the shard it belongs to.
+            Events for guilds on a shard this client doesn't run are dropped, like discord wouldn't send them.
+            If the websocket has a wire format, the event is sent through it as a gateway frame. The event is
+            handled in the session of this client, so handlers it starts belong to it too.
+
+        :param event: Name of the gateway event, such as ``MESSAGE_CREATE``
+        :param data: Payload of the event
+        """
+        with self.session.activate():
+            self._receive_event(event, data)
+
+    def _receive_event(self, event: str, data: Any) -> None:
+        if event.startswith("GUILD_") and "guild_id" not in data:
+            guild_id = data.get("id")
+        else:
+            guild_id = data.get("guild_id")
+
+        try:
+            if guild_id is None:
+                # Discord sends events outside of guilds, like DMs, to shard 0
+                ws = self._get_websocket(shard_id=0)
+            else:
+                ws = self._get_websocket(int(guild_id))
+        except KeyError:
+            return
+
+        if guild_id is not None and not event.startswith(_PAYLOAD_SAFE_EVENTS):
+            facts.invalidate(int(guild_id))
+        if guild_id is not None and event.startswith(_MEMBER_INDEX_EVENTS):
+            back.invalidate_member_index(int(guild_id))
+        if guild_id is not None and event in _MEMBER_EVENTS:
+            back.update_member_index(int(guild_id), event, data)
+        if guild_id is not None and event.startswith(_PERMISSION_EVENTS):
+            back.invalidate_permissions(int(guild_id))
+        if event == "GUILD_MEMBER_UPDATE":
+            back.update_lazy_member(int(guild_id), data)
+        if not self.receives(event, data):
+            return
+        if event in ("MESSAGE_CREATE", "MESSAGE_UPDATE"):
+            data = self._elide_content(data)
+        start = time.perf_counter_ns()
+        delay = self.network.gateway_delay(event) if self.network is not None else 0.0
+        if delay:
+            self._delivery = (delay, ws.shard_id)
+        try:
+            if isinstance(ws, FakeWebSocket) and ws.wire_format is not None:
+                ws.receive_frame(ws.make_frame(event, data))
+            else:
+                ws.sequence = (ws.sequence or 0) + 1
+                self.parsers[event](data)
+        finally:
+            self._delivery = None
+        if self.recorder is not None:
+            self.recorder.add("gateway", event, start, args={"shard": ws.shard_id})
+
+    def receives(self, event: str, data: Any) -> bool:
+        """
+            Check whether discord would send an event to the client, given its intents. Member events about the
+            client itself are sent whatever its intents.
+
+        :param event: Name of the gateway event
+        :param data: Payload of the event
+        :return: Whether the client gets the event
+        """
+        needed = _EVENT_INTENTS.get(event)
+        if needed is None:
+            return True
+        intent = needed[0] if data.get("guild_id") is not None else needed[1]
+        if intent is None or getattr(self._intents, intent):
+            return True
+        return event.startswith("GUILD_MEMBER_") and int(data["user"]["id"]) == self.self_id
+
+    def _elide_content(self, data: Any) -> Any:
+        """
+            Empty the content of a guild message, like discord does for clients without the message content intent,
+            unless the client wrote the message or is mentioned in it
+        """
+        if self._intents.message_content or data.get("guild_id") is None:
+            return data
+        author = data.get("author")
+        if author is not None and int(author["id"]) == self.self_id:
+            return data
+        if any(int(user["id"]) == self.self_id for user in data.get("mentions", ())):
+            return data
+
+        data = dict(data)
+        data["content"] = ""
+        data["embeds"] = []
+        data["attachments"] = []
+        data["components"] = []
+        data.pop("poll", None)
+        return data
+
+    def _delay_dispatch(self, dispatch: Callable[..., Any], args: tuple[Any, ...], kwargs: dict[str, Any]) -> None:
+        """
+            Dispatch an event once the delay of the gateway event being parsed has passed, and after every event
+            delayed before it on the same shard
+        """
+        assert self._delivery is not None
+        delay, shard_id = self._delivery
+        previous = self._deliveries.get(shard_id)
+
+        async def _delayed_dispatch() -> None:
+            await asyncio.sleep(delay)
+            if previous is not None:
+                await asyncio.wait([previous])
+            if self._do_dispatch:
+                dispatch(*args, **kwargs)
+
+        def _delivered(task: asyncio.Task[None]) -> None:
+            if self._deliveries.get(shard_id) is task:
+                del self._deliveries[shard_id]
+
+        task = asyncio.get_running_loop().create_task(_delayed_dispatch())
+        task.add_done_callback(_delivered)
+        self._deliveries[shard_id] = task
+
     def stop_dispatch(self) -> None:
         """
             Stop dispatching events to the client, if we are
@@ -69,11 +243,17 @@ class FakeState(dstate.ConnectionState):
         """
         self._do_dispatch = True
 
-    # TODO: Respect limit parameters
     async def query_members(self, guild: discord.Guild, query: str | None, limit: int, user_ids: list[int] | None,
                             cache: bool, presences: bool) -> list[discord.Member]:
-        guild = discord.utils.get(self.guilds, id=guild.id)  # type: ignore[assignment]
-        return list(guild.members)
+        guild = self._get_guild(guild.id)  # type: ignore[assignment]
+        request = dstate.ChunkRequest(guild.id, guild.shard_id, asyncio.get_running_loop(), self._get_guild,
+                                      cache=cache)
+        self._chunk_requests[request.nonce] = request
+        # Chunks are delivered before request_members returns, so the future must exist first
+        future = request.get_future()
+        with self.session.activate():
+            back.request_members(guild, query=query or "", limit=limit, user_ids=user_ids, nonce=request.nonce)
+        return await future
 
     @overload
     async def chunk_guild(
@@ -95,7 +275,21 @@ class FakeState(dstate.ConnectionState):
             *, wait: bool = True,
             cache: bool | None = None,
     ) -> list[discord.Member] | Future[list[discord.Member]]:
-        return []
+        cache = cache or self.member_cache_flags.joined
+        request = self._chunk_requests.get(guild.id)
+        if request is None:
+            request = dstate.ChunkRequest(guild.id, guild.shard_id, asyncio.get_running_loop(), self._get_guild,
+                                          cache=cache)
+            self._chunk_requests[guild.id] = request
+            future = request.get_future()
+            with self.session.activate():
+                back.request_members(guild, nonce=request.nonce)
+        else:
+            future = request.get_future()
+
+        if wait:
+            return await future
+        return future
 
     def _guild_needs_chunking(self, guild: discord.Guild) -> bool:
         """
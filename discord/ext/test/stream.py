@@ -0,0 +1,230 @@
+"""
+    A live stream of what the client does against the fake discord: messages it sends, edits and deletes,
+    reactions, role and member changes, kicks, bans and presence changes. Each action is yielded as a
+    :py:class:`BotAction` as it happens, so tests of long-running bots can consume them in order instead of
+    polling the sent queue after the fact.
+
+    Every stream has its own bounded queue. When the test doesn't keep up and the queue is full, the oldest
+    action is dropped and counted in :py:attr:`EventStream.dropped`.
+
+    .. code:: python
+
+        async with dpytest.events(kinds=["send_message", "add_role"], channel=channel, timeout=1.0) as stream:
+            await dpytest.message("!promote")
+            async for action in stream:
+                print(action.kind, action.message or action.role)
+"""
+
+import asyncio
+import collections
+import datetime as dt
+from typing import Any, Iterable, NamedTuple
+
+import discord
+
+from . import callbacks, factories as facts
+from .callbacks import CallbackEvent
+
+ActionChannel = discord.abc.GuildChannel | discord.abc.PrivateChannel | discord.Thread | discord.PartialMessageable
+
+# Events that are the client acting, rather than reading
+ACTIONS = frozenset({
+    CallbackEvent.presence,
+    CallbackEvent.start_private_message,
+    CallbackEvent.send_message,
+    CallbackEvent.send_typing,
+    CallbackEvent.delete_message,
+    CallbackEvent.edit_message,
+    CallbackEvent.add_reaction,
+    CallbackEvent.remove_reaction,
+    CallbackEvent.remove_own_reaction,
+    CallbackEvent.kick,
+    CallbackEvent.ban,
+    CallbackEvent.unban,
+    CallbackEvent.change_nickname,
+    CallbackEvent.edit_member,
+    CallbackEvent.create_role,
+    CallbackEvent.edit_role,
+    CallbackEvent.delete_role,
+    CallbackEvent.move_role,
+    CallbackEvent.add_role,
+    CallbackEvent.remove_role,
+})
+
+
+class BotAction(NamedTuple):
+    """
+        One thing the client did. The guild, channel, message, member and role are picked out of the arguments
+        of the action where it has them, and the raw arguments are kept as well.
+    """
+
+    kind: str
+    timestamp: dt.datetime
+    guild: discord.Guild | None
+    channel: ActionChannel | None
+    message: discord.Message | None
+    member: discord.Member | discord.abc.User | None
+    role: discord.Role | None
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+
+
+def _make_action(event: CallbackEvent, args: tuple[Any, ...], kwargs: dict[str, Any]) -> BotAction:
+    guild: discord.Guild | None = None
+    channel: ActionChannel | None = None
+    message: discord.Message | None = None
+    member: discord.Member | discord.abc.User | None = None
+    role: discord.Role | None = None
+    for arg in args:
+        if isinstance(arg, discord.Message):
+            message = message or arg
+            channel = channel or arg.channel
+            guild = guild or arg.guild
+        elif isinstance(arg, (discord.abc.GuildChannel, discord.abc.PrivateChannel)):
+            channel = channel or arg
+            guild = guild or getattr(arg, "guild", None)
+        elif isinstance(arg, discord.Guild):
+            guild = guild or arg
+        elif isinstance(arg, discord.Role):
+            role = role or arg
+            guild = guild or arg.guild
+        elif isinstance(arg, discord.abc.User):
+            member = member or arg
+            guild = guild or getattr(arg, "guild", None)
+    return BotAction(event.value, facts.utcnow(), guild, channel, message, member, role, args, kwargs)
+
+
+class EventStream:
+    """
+        Actions of the client, queued for a test to iterate over. Made with :py:func:`events`.
+    """
+
+    def __init__(self, kinds: Iterable[CallbackEvent], guild: discord.abc.Snowflake | None,
+                 channel: discord.abc.Snowflake | None, maxsize: int, timeout: float | None) -> None:
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.dropped = 0
+        self.received = 0
+        self._queue: collections.deque[BotAction] = collections.deque()
+        self._waiter: asyncio.Future[None] | None = None
+        self._closed = False
+        self._subscriptions = [
+            callbacks.subscribe(kind, self._subscriber(kind), guild=guild, channel=channel, keep=True)
+            for kind in kinds
+        ]
+
+    def _subscriber(self, event: CallbackEvent) -> callbacks.Subscriber:
+        def push(*args: Any, **kwargs: Any) -> None:
+            self.put(_make_action(event, args, kwargs))
+
+        return push
+
+    def put(self, action: BotAction) -> None:
+        """
+            Queue an action, dropping the oldest one if the queue is full
+
+        :param action: Action to queue
+        """
+        if self._closed:
+            return
+        self.received += 1
+        if len(self._queue) >= self.maxsize:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append(action)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    @property
+    def pending(self) -> int:
+        """
+            Number of actions queued and not yet taken
+        """
+        return len(self._queue)
+
+    def get_nowait(self) -> BotAction | None:
+        """
+            Take the oldest queued action, without waiting
+
+        :return: The action, or None if none are queued
+        """
+        return self._queue.popleft() if self._queue else None
+
+    async def get(self, timeout: float | None = None) -> BotAction | None:
+        """
+            Take the oldest queued action, waiting for one if none are queued
+
+        :param timeout: Most seconds to wait, or None to wait until the stream is closed
+        :return: The action, or None if the wait timed out or the stream was closed
+        """
+        while not self._queue:
+            if self._closed:
+                return None
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self._waiter, timeout)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                self._waiter = None
+        return self._queue.popleft()
+
+    def close(self) -> None:
+        """
+            Stop receiving actions. Actions already queued can still be taken.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for sub in self._subscriptions:
+            callbacks.unsubscribe(sub)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def __aiter__(self) -> 'EventStream':
+        return self
+
+    async def __anext__(self) -> BotAction:
+        action = await self.get(self.timeout)
+        if action is None:
+            raise StopAsyncIteration
+        return action
+
+    def __enter__(self) -> 'EventStream':
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    async def __aenter__(self) -> 'EventStream':
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def events(
+        kinds: Iterable[CallbackEvent | str] | None = None,
+        *,
+        guild: discord.abc.Snowflake | None = None,
+        channel: discord.abc.Snowflake | None = None,
+        maxsize: int = 1000,
+        timeout: float | None = None,
+) -> EventStream:
+    """
+        Start streaming the actions of the configured client. Iterate over the stream with ``async for``, which
+        ends once the stream is closed, or once no action came for ``timeout`` seconds. Close it when done, or use
+        it as a context manager.
+
+    :param kinds: Kinds of actions to get, as callback events or their names, or None for every action in
+                  :py:data:`ACTIONS`
+    :param guild: Only get actions in this guild
+    :param channel: Only get actions in this channel. Conflicts with ``guild``
+    :param maxsize: Most actions to queue before dropping the oldest
+    :param timeout: Seconds iteration waits for the next action before ending, or None to wait until closed
+    :return: The new stream
+    """
+    if maxsize < 1:
+        raise ValueError("Event stream size must be at least 1")
+    selected = ACTIONS if kinds is None else {CallbackEvent(kind) for kind in kinds}
+    return EventStream(sorted(selected, key=lambda e: e.value), guild, channel, maxsize, timeout)
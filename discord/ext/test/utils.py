@@ -5,7 +5,8 @@
 
 import asyncio
 import collections
-from typing import TypeVar
+import math
+from typing import Any, Sequence, TypeVar
 
 import discord
 
@@ -72,6 +73,54 @@ def embed_proxy_eq(embed_proxy1: discord.embeds.EmbedProxy, embed_proxy2: discor
     return embed_proxy1.__repr__ == embed_proxy2.__repr__
 
 
+def percentile(values: Sequence[float], percent: float) -> float:
+    """
+        Get a percentile of some values, with the nearest-rank method
+
+    :param values: Values to look at, in any order
+    :param percent: Percentile to get, between 0 and 100
+    :return: The value at that percentile, or 0 if there are no values
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(percent / 100 * len(ordered)) - 1))]
+
+
+class HandlerCollector:
+    """
+        Collects the handler tasks a client's dispatch starts, by wrapping its event scheduler while used as a
+        context manager. Used to find out when everything an event started has finished.
+    """
+
+    def __init__(self, client: discord.Client) -> None:
+        self.client = client
+        self.started: list[asyncio.Task[None]] = []
+
+    def take(self) -> list[asyncio.Task[None]]:
+        """
+            Take the tasks started since the last call
+
+        :return: Handler tasks, in the order they were started
+        """
+        started, self.started = self.started, []
+        return started
+
+    def __enter__(self) -> 'HandlerCollector':
+        schedule_event = self.client._schedule_event
+
+        def _schedule_event(*args: Any, **kwargs: Any) -> asyncio.Task[None]:
+            task = schedule_event(*args, **kwargs)
+            self.started.append(task)
+            return task
+
+        self.client._schedule_event = _schedule_event  # type: ignore[method-assign]
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        del self.client._schedule_event
+
+
 T = TypeVar('T')
 
 
@@ -3,13 +3,50 @@
     hooking of its methods to update the backend and provide callbacks.
 """
 
-from typing import Any
+import zlib
+from typing import Any, Coroutine, Literal
 
 import discord
 import discord.gateway as gateway
+from discord import utils
 
 from . import callbacks
 from .callbacks import CallbackEvent
+from .session import Session, get_session
+
+
+WireFormat = Literal["json", "zlib-stream"]
+
+
+class _ZlibStreamContext:
+    """
+        Decompression context for zlib-stream frames, the same as discord.py's own one, which it doesn't
+        define when a zstd library is available
+    """
+
+    COMPRESSION_TYPE = "zlib-stream"
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+        self.context = zlib.decompressobj()
+
+    def decompress(self, data: bytes, /) -> str | None:
+        self.buffer.extend(data)
+        if len(data) < 4 or data[-4:] != b'\x00\x00\xff\xff':
+            return None
+        msg = self.context.decompress(self.buffer)
+        self.buffer = bytearray()
+        return msg.decode('utf-8')
+
+
+def _run_inline(coro: Coroutine[Any, Any, None]) -> None:
+    # received_message never suspends for dispatch frames, so it can run to completion without the event loop
+    try:
+        coro.send(None)
+    except StopIteration:
+        return
+    coro.close()
+    raise RuntimeError("Gateway frame handling tried to suspend")
 
 
 class FakeWebSocket(gateway.DiscordWebSocket):
@@ -21,18 +58,80 @@ class FakeWebSocket(gateway.DiscordWebSocket):
     cur_event: CallbackEvent | None
     event_args: tuple[Any, ...]
     event_kwargs: dict[str, Any]
+    activity: discord.BaseActivity | None
+    status: str | None
+    fake_latency: float | None
+    wire_format: WireFormat | None
+    session: Session
+    _compressor: 'zlib._Compress | None'
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
+        self.shard_id = None
         self.cur_event = None
         self.event_args = ()
         self.event_kwargs = {}
+        self.activity = None
+        self.status = None
+        self.fake_latency = None
+        self.wire_format = None
+        self.session = get_session()
+        self._compressor = None
+
+    def set_wire_format(self, wire_format: WireFormat | None) -> None:
+        """
+            Pick how events reach the client. By default the backend calls the state parsers directly, in a wire
+            format every event is encoded into a gateway frame and goes through ``received_message``, like it
+            would with a real connection.
+
+        :param wire_format: ``json`` for plain text frames, ``zlib-stream`` for compressed binary frames,
+                            or None to skip the gateway path
+        """
+        if wire_format not in (None, "json", "zlib-stream"):
+            raise ValueError(f"Unknown wire format '{wire_format}'")
+        self.wire_format = wire_format
+        if wire_format == "zlib-stream":
+            self._compressor = zlib.compressobj()
+            self._decompressor = _ZlibStreamContext()
+        else:
+            self._compressor = None
+
+    def make_frame(self, event: str, data: Any) -> str | bytes:
+        """
+            Encode an event into the next dispatch frame of this websocket, in its wire format
+
+        :param event: Name of the gateway event
+        :param data: Payload of the event
+        :return: Frame as discord would send it
+        """
+        frame = utils._to_json({"op": self.DISPATCH, "t": event, "s": (self.sequence or 0) + 1, "d": data})
+        if self._compressor is None:
+            return frame
+        return self._compressor.compress(frame.encode('utf-8')) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def receive_frame(self, frame: str | bytes) -> None:
+        """
+            Handle a gateway frame, as if it was read from the socket
+
+        :param frame: Text or compressed frame
+        """
+        _run_inline(self.received_message(frame))
+
+    @property
+    def latency(self) -> float:
+        if self.fake_latency is None:
+            return super().latency
+        return self.fake_latency
+
+    async def close(self, code: int = 4000) -> None:
+        self._close_code = code
 
     async def send(self, data: str) -> None:
         self._dispatch('socket_raw_send', data)
         if self.cur_event is None:
             raise ValueError("Unhandled Websocket send event")
-        await callbacks.dispatch_event(self.cur_event, *self.event_args, **self.event_kwargs)
+        with self.session.activate():
+            await callbacks.dispatch_event(self.cur_event, *self.event_args, **self.event_kwargs)
         self.cur_event = None
         self.event_args = ()
         self.event_kwargs = {}
@@ -46,4 +145,6 @@ class FakeWebSocket(gateway.DiscordWebSocket):
     ) -> None:
         self.cur_event = CallbackEvent.presence
         self.event_args = (activity, status, since)
+        self.activity = activity
+        self.status = status
         await super().change_presence(activity=activity, status=status, since=since)
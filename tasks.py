@@ -115,6 +115,17 @@ def test(c):
     c.run("pytest tests/")
 
 
+@task
+def bench(c, filter="", save=False, threshold=1.25):
+    """Run the benchmark suite, and compare it to benchmarks/baseline.json. Use --save to store a new baseline"""
+    args = f"--threshold {threshold}"
+    if filter:
+        args += f" --filter {filter}"
+    if save:
+        args += " --save-baseline"
+    c.run(f"python -m benchmarks.suite {args}")
+
+
 @task
 def coverage(c):
     """Run unit-tests using pytest, with coverage reporting."""
@@ -8,6 +8,8 @@ import discord.ext.test as dpytest
 from pytest import FixtureRequest
 from discord.client import _LoopSentinel
 
+pytest_plugins = ("discord.ext.test.plugin",)
+
 
 @pytest_asyncio.fixture
 async def bot(request: FixtureRequest) -> commands.Bot:
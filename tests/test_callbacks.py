@@ -0,0 +1,98 @@
+from unittest.mock import AsyncMock
+
+import discord
+import pytest
+import discord.ext.test as dpytest
+from discord.ext.test import callbacks
+from discord.ext.test.callbacks import CallbackEvent
+
+
+@pytest.mark.asyncio
+async def test_many_subscribers(bot: discord.Client) -> None:
+    channel = bot.guilds[0].text_channels[0]
+    seen: list[str] = []
+
+    async def async_sub(message: discord.Message) -> None:
+        seen.append(f"async {message.content}")
+
+    def sync_sub(message: discord.Message) -> None:
+        seen.append(f"sync {message.content}")
+
+    first = callbacks.subscribe(CallbackEvent.send_message, async_sub)
+    callbacks.subscribe(CallbackEvent.send_message, sync_sub)
+    await channel.send("Hello")
+    assert seen == ["async Hello", "sync Hello"]
+    # The runner's own callback still gets the message
+    assert dpytest.verify().message().content("Hello")
+
+    callbacks.unsubscribe(first)
+    callbacks.unsubscribe(first)
+    await channel.send("Again")
+    assert seen == ["async Hello", "sync Hello", "sync Again"]
+    await dpytest.empty_queue()
+
+
+@pytest.mark.asyncio
+async def test_awaitable_subscribers(bot: discord.Client) -> None:
+    channel = bot.guilds[0].text_channels[0]
+    seen: list[str] = []
+
+    async def record(kind: str, message: discord.Message) -> None:
+        seen.append(f"{kind} {message.content}")
+
+    class Handler:
+        async def __call__(self, message: discord.Message) -> None:
+            await record("object", message)
+
+    mock = AsyncMock()
+    callbacks.subscribe(CallbackEvent.send_message, lambda m: record("lambda", m))
+    callbacks.subscribe(CallbackEvent.send_message, Handler())
+    callbacks.subscribe(CallbackEvent.send_message, mock)
+    await channel.send("Hello")
+
+    assert seen == ["lambda Hello", "object Hello"]
+    mock.assert_awaited_once()
+    await dpytest.empty_queue()
+
+
+@pytest.mark.asyncio
+async def test_filtered_subscribers(bot: discord.Client) -> None:
+    dpytest.configure(bot, guilds=2, text_channels=2)
+    first, second = bot.guilds[0].text_channels
+    other = bot.guilds[1].text_channels[0]
+    by_channel: list[str] = []
+    by_guild: list[str] = []
+
+    callbacks.subscribe(CallbackEvent.send_message, lambda m: by_channel.append(m.content), channel=second)
+    callbacks.subscribe(CallbackEvent.send_message, lambda m: by_guild.append(m.content), guild=bot.guilds[0])
+    for channel in (first, second, other):
+        await channel.send(channel.name)
+
+    assert by_channel == [second.name]
+    assert by_guild == [first.name, second.name]
+    with pytest.raises(ValueError):
+        callbacks.subscribe(CallbackEvent.send_message, print, guild=bot.guilds[0], channel=first)
+    await dpytest.empty_queue()
+
+
+@pytest.mark.asyncio
+async def test_error_policy(bot: discord.Client) -> None:
+    channel = bot.guilds[0].text_channels[0]
+
+    def broken(message: discord.Message) -> None:
+        raise RuntimeError("Broken subscriber")
+
+    callbacks.subscribe(CallbackEvent.send_message, broken)
+    await channel.send("Logged")
+
+    callbacks.set_error_policy("collect")
+    await channel.send("Collected")
+    errors = callbacks.collected_errors()
+    assert [(event, str(error)) for event, error in errors] == [(CallbackEvent.send_message, "Broken subscriber")]
+    assert callbacks.collected_errors() == []
+
+    callbacks.set_error_policy("raise")
+    with pytest.raises(RuntimeError):
+        await channel.send("Raised")
+    callbacks.set_error_policy("log")
+    await dpytest.empty_queue()
@@ -0,0 +1,55 @@
+import datetime
+
+import discord
+import pytest
+import discord.ext.test as dpytest
+from discord.ext.test import factories
+
+
+async def _run(bot: discord.Client) -> tuple[list[int], list[str], dict[str, object]]:
+    dpytest.configure(bot, guilds=2, members=3, seed=1234)
+    config = dpytest.get_config()
+    ids = [g.id for g in config.guilds] + [c.id for c in config.channels] + [m.id for m in config.members]
+    joined = await dpytest.member_join()
+    mes = await dpytest.message("Hello")
+    return ids, [joined.discriminator], factories.dict_from_object(mes)  # type: ignore[return-value]
+
+
+@pytest.mark.asyncio
+async def test_seeded_runs_match(bot: discord.Client) -> None:
+    try:
+        first = await _run(bot)
+        second = await _run(bot)
+    finally:
+        factories.seed(None)
+    assert first == second
+
+
+@pytest.mark.asyncio
+async def test_logical_clock(bot: discord.Client) -> None:
+    factories.seed(5)
+    try:
+        start = factories.utcnow()
+        assert factories.utcnow() == start
+        factories.advance_clock(datetime.timedelta(minutes=5))
+        assert factories.utcnow() - start == datetime.timedelta(minutes=5)
+
+        mes = await dpytest.message("Later")
+        assert mes.created_at - start >= datetime.timedelta(minutes=5)
+    finally:
+        factories.seed(None)
+
+    with pytest.raises(ValueError):
+        factories.advance_clock(datetime.timedelta(seconds=1))
+
+
+@pytest.mark.asyncio
+async def test_reset_rewinds_seed(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=1, seed=99)
+    try:
+        first = await dpytest.member_join()
+        await dpytest.reset()
+        second = await dpytest.member_join()
+    finally:
+        factories.seed(None)
+    assert (second.id, second.discriminator) == (first.id, first.discriminator)
@@ -0,0 +1,92 @@
+import discord
+import pytest
+import discord.ext.test as dpytest
+
+
+@pytest.mark.asyncio
+async def test_fetch_channel(bot: discord.Client) -> None:
+    dpytest.configure(bot, guilds=3, text_channels=2)
+    channel = bot.guilds[2].text_channels[1]
+
+    fetched = await bot.fetch_channel(channel.id)
+    assert fetched.id == channel.id
+
+    await channel.delete()
+    with pytest.raises(discord.NotFound):
+        await bot.fetch_channel(channel.id)
+
+
+@pytest.mark.asyncio
+async def test_fetch_user(bot: discord.Client) -> None:
+    dpytest.configure(bot, guilds=2)
+    member = await dpytest.member_join(1, name="Elsewhere")
+    assert bot.guilds[0].get_member(member.id) is None
+
+    user = await bot.fetch_user(member.id)
+    assert user.name == "Elsewhere"
+
+    lonely = dpytest.backend.make_user("Lonely", 1)
+    assert (await bot.fetch_user(lonely.id)).name == "Lonely"
+
+    with pytest.raises(discord.NotFound):
+        await bot.fetch_user(1234)
+
+
+@pytest.mark.asyncio
+async def test_fetch_lazy_user(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=5, lazy_members=True)
+    guild = bot.guilds[0]
+    user_id = next(iter(dpytest.backend.get_config().lazy_members[guild.id]))
+
+    user = await bot.fetch_user(user_id)
+    assert user.id == user_id
+    assert guild.get_member(user_id) is None
+
+
+@pytest.mark.asyncio
+async def test_fetch_guild(bot: discord.Client) -> None:
+    dpytest.configure(bot, guilds=3)
+
+    fetched = await bot.fetch_guild(bot.guilds[2].id)
+    assert fetched.name == bot.guilds[2].name
+
+    with pytest.raises(discord.NotFound):
+        await bot.fetch_guild(1234)
+
+
+@pytest.mark.asyncio
+async def test_fetch_members_paging(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=2500, lazy_members=True)
+    guild = bot.guilds[0]
+    dpytest.get_config().members[7]  # One cached member among the lazy ones
+
+    fetched = [m.id async for m in guild.fetch_members(limit=None)]
+    assert len(fetched) == len(set(fetched)) == 2500 + 1
+    assert len(guild.members) == 2
+
+    limited = [m.id async for m in guild.fetch_members(limit=150)]
+    assert sorted(limited) == sorted(fetched)[:150]
+
+    ids = sorted(fetched)
+    after = [m.id async for m in guild.fetch_members(limit=None, after=discord.Object(ids[2000]))]
+    assert sorted(after) == ids[2001:]
+
+    pages = await bot.http.get_members(guild.id, 5000, None)
+    assert len(pages) == 1000
+
+
+@pytest.mark.asyncio
+async def test_fetch_guilds_paging(bot: discord.Client) -> None:
+    dpytest.configure(bot, guilds=250, text_channels=0, voice_channels=0)
+    ids = sorted(g.id for g in bot.guilds)
+
+    fetched = [g.id async for g in bot.fetch_guilds(limit=None)]
+    assert fetched == ids
+
+    after = [g.id async for g in bot.fetch_guilds(limit=30, after=discord.Object(ids[200]))]
+    assert after == ids[201:231]
+
+    before = [g.id async for g in bot.fetch_guilds(limit=30, before=discord.Object(ids[100]))]
+    assert sorted(before) == ids[70:100]
+
+    assert len(await bot.http.get_guilds(500)) == 200
@@ -1,6 +1,6 @@
 import pytest
 import discord
-import discord.ext.test as dpytest  # noqa: F401
+import discord.ext.test as dpytest
 from discord.utils import get
 
 
@@ -28,3 +28,25 @@ async def test_get_channel_history(bot: discord.Client) -> None:
     channel_history = [msg async for msg in channel_get.history(limit=10)]
 
     assert test_message in channel_history
+
+
+@pytest.mark.asyncio
+async def test_channel_history_paging(bot: discord.Client) -> None:
+    channel = bot.guilds[0].text_channels[0]
+    sent = [await channel.send(f"Message {i}") for i in range(250)]
+
+    newest_first = [msg async for msg in channel.history(limit=None)]
+    assert newest_first == sent[::-1]
+
+    oldest_first = [msg async for msg in channel.history(limit=None, oldest_first=True)]
+    assert oldest_first == sent
+
+    after = [msg async for msg in channel.history(limit=120, after=sent[100])]
+    assert after == sent[101:221]
+
+    before = [msg async for msg in channel.history(limit=5, before=sent[3])]
+    assert before == sent[2::-1]
+
+    around = [msg async for msg in channel.history(limit=5, around=sent[50])]
+    assert around == sent[52:47:-1]
+    await dpytest.empty_queue()
@@ -0,0 +1,160 @@
+import discord
+import pytest
+import discord.ext.commands as commands
+import discord.ext.test as dpytest
+from discord.client import _LoopSentinel
+
+
+async def _make_bot(intents: discord.Intents) -> commands.Bot:
+    b = commands.Bot(command_prefix="!", intents=intents)
+    if isinstance(b.loop, _LoopSentinel):
+        await b._async_setup_hook()
+    return b
+
+
+@pytest.mark.asyncio
+async def test_no_members_intent() -> None:
+    bot = await _make_bot(discord.Intents.default())
+    joined: list[discord.Member] = []
+
+    async def on_member_join(member: discord.Member) -> None:
+        joined.append(member)
+
+    bot.add_listener(on_member_join)
+    dpytest.configure(bot, members=3)
+    guild = bot.guilds[0]
+
+    # Members exist, but the client was never told about them
+    members = dpytest.get_config().members
+    assert all(isinstance(m, discord.Member) for m in members)
+    assert guild.me is not None
+    assert guild.get_member(members[0].id) is None
+
+    await dpytest.member_join()
+    await dpytest.run_all_events()
+    assert joined == []
+
+    fetched = await guild.fetch_member(members[1].id)
+    assert fetched.name == members[1].name
+
+
+@pytest.mark.asyncio
+async def test_no_message_content_intent() -> None:
+    bot = await _make_bot(discord.Intents.default())
+    dpytest.configure(bot, members=2)
+    assert bot.user
+
+    mes = await dpytest.message("Secret")
+    assert mes.content == ""
+
+    mes = await dpytest.message(f"<@{bot.user.id}> Not secret")
+    assert mes.content == f"<@{bot.user.id}> Not secret"
+
+    dm = await dpytest.get_config().members[0].create_dm()
+    mes = await dpytest.message("Private", dm)
+    assert mes.content == "Private"
+
+    channel = dpytest.get_config().channels[0]
+    assert isinstance(channel, discord.TextChannel)
+    await channel.send("Mine")
+    assert dpytest.verify().message().content("Mine")
+
+
+@pytest.mark.asyncio
+async def test_no_reactions_intent() -> None:
+    intents = discord.Intents.default()
+    intents.guild_reactions = False
+    intents.message_content = True
+    bot = await _make_bot(intents)
+    reactions: list[discord.Reaction] = []
+
+    async def on_reaction_add(reaction: discord.Reaction, user: discord.User) -> None:
+        reactions.append(reaction)
+
+    bot.add_listener(on_reaction_add)
+    dpytest.configure(bot, members=1)
+
+    mes = await dpytest.message("React to me")
+    await dpytest.add_reaction(dpytest.get_config().members[0], mes, "\N{THUMBS UP SIGN}")
+    assert reactions == []
+    assert mes.reactions == []
+
+
+@pytest.mark.asyncio
+async def test_no_members_intent_roles() -> None:
+    bot = await _make_bot(discord.Intents.default())
+    dpytest.configure(bot, members=1)
+    guild = bot.guilds[0]
+    role = await guild.create_role(name="Known")
+    other = await guild.create_role(name="Other")
+
+    user = dpytest.backend.make_user("Roled", "0001")
+    member = dpytest.backend.make_member(user, guild, roles=[role])
+    assert guild.get_member(member.id) is None
+    fetched = await guild.fetch_member(member.id)
+    assert [r.name for r in fetched.roles] == ["@everyone", "Known"]
+
+    configured = dpytest.get_config().members[0]
+    await dpytest.add_role(configured, other)
+    await dpytest.add_role(configured, role)
+    await dpytest.remove_role(configured, other)
+    fetched = await guild.fetch_member(configured.id)
+    assert [r.name for r in fetched.roles] == ["@everyone", "Known"]
+
+
+@pytest.mark.asyncio
+async def test_no_members_intent_keeps_roles() -> None:
+    bot = await _make_bot(discord.Intents.default())
+    dpytest.configure(bot, members=1)
+    guild = bot.guilds[0]
+    role = await guild.create_role(name="Known")
+
+    configured = dpytest.get_config().members[0]
+    await dpytest.add_role(configured, role)
+    dpytest.backend.update_member(configured, nick="Renamed")
+    edited = await configured.edit(nick="Edited")
+    assert edited is not None and [r.name for r in edited.roles] == ["@everyone", "Known"]
+
+    fetched = await guild.fetch_member(configured.id)
+    assert [r.name for r in fetched.roles] == ["@everyone", "Known"]
+    assert fetched.nick == "Edited"
+
+
+@pytest.mark.asyncio
+async def test_no_members_intent_kick() -> None:
+    bot = await _make_bot(discord.Intents.default())
+    dpytest.configure(bot, members=2)
+    guild = bot.guilds[0]
+    kicked, banned = dpytest.get_config().members
+
+    for member in (kicked, banned):
+        await guild.fetch_member(member.id)
+        assert guild.get_member(member.id) is not None
+    await guild.kick(kicked)
+    await guild.ban(banned)
+
+    for member in (kicked, banned):
+        assert guild.get_member(member.id) is None
+        with pytest.raises(discord.NotFound):
+            await guild.fetch_member(member.id)
+
+
+@pytest.mark.asyncio
+async def test_no_members_intent_author_roles() -> None:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    bot = await _make_bot(intents)
+
+    @bot.command()
+    async def roles(ctx: commands.Context[commands.Bot]) -> None:
+        assert isinstance(ctx.author, discord.Member)
+        await ctx.send(", ".join(r.name for r in ctx.author.roles))
+
+    dpytest.configure(bot, members=1)
+    guild = bot.guilds[0]
+    role = await guild.create_role(name="Speaker")
+    member = dpytest.get_config().members[0]
+    await dpytest.add_role(member, role)
+
+    await dpytest.message("!roles", member=member)
+    assert dpytest.verify().message().content("@everyone, Speaker")
@@ -0,0 +1,53 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+import discord.ext.commands as commands
+import discord.ext.test as dpytest
+
+
+@pytest.mark.asyncio
+async def test_track_latency(bot: commands.Bot, tmp_path: Path) -> None:
+    @bot.command()
+    async def ping(ctx: commands.Context[commands.Bot]) -> None:
+        await ctx.send("Pong !")
+
+    @bot.command()
+    async def slow(ctx: commands.Context[commands.Bot]) -> None:
+        mes = await ctx.reply("Working")
+        await asyncio.sleep(0.01)
+        await mes.edit(content="Done")
+
+    @bot.command()
+    async def quiet(ctx: commands.Context[commands.Bot]) -> None:
+        pass
+
+    tracker = dpytest.track_latency()
+    for _ in range(5):
+        await dpytest.message("!ping")
+    await dpytest.message("!slow")
+    await dpytest.message("!quiet")
+    await dpytest.message("Hello")
+    assert dpytest.stop_tracking_latency() is tracker
+    await dpytest.message("!ping")
+
+    assert set(tracker.commands) == {"ping", "slow", "quiet", "(no command)"}
+    ping_stats = tracker.commands["ping"]
+    assert ping_stats.count == 5
+    assert ping_stats.replies == 5
+    assert ping_stats.handlers >= 5
+    assert 0 < ping_stats.percentile(50) <= ping_stats.percentile(99)
+    assert sum(ping_stats.histogram().values()) == 5
+
+    assert tracker.commands["slow"].replies == 2
+    assert tracker.commands["slow"].percentile(100) < 0.01
+    assert tracker.commands["quiet"].unanswered == 1
+
+    path = tmp_path / "latency.json"
+    tracker.save(path)
+    report = json.loads(path.read_text())
+    assert report["ping"]["count"] == 5
+    assert "p95" in report["ping"]
+    assert "ping" in tracker.format()
+    await dpytest.empty_queue()
@@ -0,0 +1,57 @@
+import discord
+import pytest
+import discord.ext.test as dpytest
+
+
+@pytest.mark.asyncio
+async def test_lazy_configure(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=5000, lazy_members=True)
+    guild = bot.guilds[0]
+    assert len(guild.members) == 1  # only the bot itself
+    assert guild.member_count is not None and guild.member_count > 5000
+    assert len(dpytest.get_config().members) == 5000
+
+    member = dpytest.get_config().members[42]
+    assert member.name == "TestUser42"
+    assert member.nick == "TestUser42_42_nick"
+    assert guild.get_member(member.id) is member
+    assert len(guild.members) == 2
+
+
+@pytest.mark.asyncio
+async def test_lazy_mention(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=10, lazy_members=True)
+    guild = bot.guilds[0]
+    user_id = next(iter(dpytest.backend.get_config().lazy_members[guild.id]))
+    assert guild.get_member(user_id) is None
+
+    mes = await dpytest.message(f"<@{user_id}>", member=dpytest.get_config().members[9])
+    assert len(mes.mentions) == 1
+    assert mes.mentions[0].id == user_id
+    assert guild.get_member(user_id) is not None
+
+
+@pytest.mark.asyncio
+async def test_lazy_fetch(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=10, lazy_members=True)
+    guild = bot.guilds[0]
+    user_id = next(iter(dpytest.backend.get_config().lazy_members[guild.id]))
+
+    member = await guild.fetch_member(user_id)
+    assert member.id == user_id
+    assert guild.get_member(user_id) is not None
+
+    fetched = [m async for m in guild.fetch_members(limit=None)]
+    assert len(fetched) == 10 + 1
+    assert len(guild.members) == 2
+
+
+@pytest.mark.asyncio
+async def test_lazy_chunk(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=10, lazy_members=True)
+    guild = bot.guilds[0]
+
+    members = await guild.chunk()
+    assert len(members) == 10 + 1
+    assert len(guild.members) == 10 + 1
+    assert not dpytest.backend.get_config().lazy_members[guild.id]
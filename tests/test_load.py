@@ -0,0 +1,72 @@
+import discord
+import pytest
+import discord.ext.commands as commands
+import discord.ext.test as dpytest
+
+
+@pytest.mark.asyncio
+async def test_open_loop(bot: commands.Bot) -> None:
+    @bot.command()
+    async def ping(ctx: commands.Context[commands.Bot]) -> None:
+        await ctx.send("Pong !")
+
+    @bot.command()
+    async def fail(ctx: commands.Context[commands.Bot]) -> None:
+        raise commands.CommandError("Failed")
+
+    guild = dpytest.get_config().guilds[0]
+    members = guild.member_count or 0
+    report = await dpytest.generate_load(0.2, rate=200, users=5, contents=["!ping", "!fail", "hello"], seed=1)
+
+    assert 10 < report.total < 80
+    assert set(report.actions) <= {"message", "reaction", "join"}
+    # Only !ping replies, and only !fail errors
+    assert report.replies > 0 and report.errors > 0
+    assert report.replies + report.errors <= report.actions["message"]
+    assert report.error_types == {"CommandError": report.errors}
+    assert report.failed == 0
+    assert len(report.queue_delays) == report.total
+    assert len(report.latencies) == report.total
+    assert report.throughput > 0
+    assert "actions/s" in report.format()
+    assert guild.member_count == members + 4 + report.actions.get("join", 0)
+    assert dpytest.get_session().sent_queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_closed_loop(bot: commands.Bot) -> None:
+    seen: list[discord.Message] = []
+
+    async def on_message(message: discord.Message) -> None:
+        seen.append(message)
+
+    bot.add_listener(on_message)
+    report = await dpytest.generate_load(0.05, users=3, mix={"message": 1.0}, contents=["hello"], seed=2)
+    assert report.actions["message"] == len(seen) > 0
+    assert report.errors == 0
+    assert report.replies == 0
+
+    with pytest.raises(ValueError):
+        await dpytest.generate_load(1, rate=0)
+
+
+@pytest.mark.asyncio
+async def test_members_stay_in_guild(bot: commands.Bot) -> None:
+    dpytest.configure(bot, guilds=3, members=2)
+    seen: list[discord.Message] = []
+    reactions: list[tuple[discord.Reaction, discord.Member | discord.User]] = []
+
+    async def on_message(message: discord.Message) -> None:
+        seen.append(message)
+
+    async def on_reaction_add(reaction: discord.Reaction, user: discord.Member | discord.User) -> None:
+        reactions.append((reaction, user))
+
+    bot.add_listener(on_message)
+    bot.add_listener(on_reaction_add)
+    report = await dpytest.generate_load(0.1, rate=300, users=9, mix={"message": 0.6, "reaction": 0.4}, seed=3)
+
+    assert report.failed == 0
+    assert seen and reactions
+    assert all(message.guild is not None and message.guild.get_member(message.author.id) for message in seen)
+    assert all(reaction.message.guild == getattr(user, "guild", None) for reaction, user in reactions)
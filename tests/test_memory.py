@@ -0,0 +1,49 @@
+import discord
+import pytest
+import discord.ext.test as dpytest
+from discord.ext.test import memory
+
+_leaked: list[object] = []
+
+
+@pytest.mark.asyncio
+async def test_memory_tracker(bot: discord.Client) -> None:
+    tracker = memory.MemoryTracker(top=5)
+    try:
+        tracker.begin()
+        _leaked.extend(bytearray(1024) for _ in range(100))
+        await dpytest.message("Hello")
+        result = tracker.end("first")
+    finally:
+        tracker.stop()
+        _leaked.clear()
+
+    assert result is not None
+    assert result.retained == sum(result.by_origin.values())
+    assert result.by_origin["bot"] >= 100 * 1024
+    assert result.by_origin["dpytest"] > 0
+    top = result.top[0]
+    assert top.origin == "bot" and top.filename == __file__ and top.blocks >= 100
+    assert tracker.held["bot"] == result.by_origin["bot"]
+    assert tracker.end("not started") is None
+    assert "first" in tracker.format()
+
+
+def test_growing() -> None:
+    tracker = memory.MemoryTracker(window=3)
+    by_origin = dict.fromkeys(memory.ORIGINS, 10)
+    for objects in (100, 90, 95, 110, 120):
+        tracker.tests.append(memory.RetainedMemory(str(objects), 40, by_origin, [], objects))
+    assert tracker.growing() == dict.fromkeys(memory.ORIGINS, 30)
+    assert "Live objects went up" in tracker.format()
+
+    tracker.tests.append(memory.RetainedMemory("freed", 40, by_origin, [], 115))
+    assert tracker.growing() == {}
+    assert len(tracker.report()["tests"]) == 6
+
+
+def test_origin_of() -> None:
+    assert memory.origin_of(memory.__file__) == "dpytest"
+    assert memory.origin_of(discord.__file__) == "discord.py"
+    assert memory.origin_of(pytest.__file__) == "other"
+    assert memory.origin_of(__file__) == "bot"
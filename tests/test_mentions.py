@@ -56,3 +56,57 @@ async def test_bot_mention(bot: discord.Client) -> None:
     mes = await dpytest.message("Not a mention in sight")
 
     assert len(mes.mentions) == 0
+
+
+@pytest.mark.asyncio
+async def test_repeated_mentions(bot: discord.Client) -> None:
+    guild = bot.guilds[0]
+    channel = guild.channels[0]
+    content = f"<@{guild.me.id}> <@!{guild.me.id}> <#{channel.id}> <#{channel.id}> <#12345678901234567>"
+    mes = await dpytest.message(content)
+
+    assert mes.mentions == [guild.me]
+    assert mes.channel_mentions == [channel]
+
+
+@pytest.mark.asyncio
+async def test_everyone_mention(bot: discord.Client) -> None:
+    guild = bot.guilds[0]
+    mes = await dpytest.message("Hello @everyone")
+    assert mes.mention_everyone
+
+    mes = await dpytest.message("Hello @here")
+    assert mes.mention_everyone
+
+    mes = await dpytest.message("Hello everyone")
+    assert not mes.mention_everyone
+
+    mes = await dpytest.message("Mail admin@everyone.com or foo@here, not @@here")
+    assert not mes.mention_everyone
+
+    await guild.default_role.edit(permissions=discord.Permissions(send_messages=True))
+    mes = await dpytest.message("Hello @everyone")
+    assert not mes.mention_everyone
+
+
+@pytest.mark.asyncio
+async def test_dm_mention(bot: discord.Client) -> None:
+    assert bot.user
+    member = dpytest.get_config().members[0]
+    dm = await member.create_dm()
+    mes = await dpytest.message(f"<@{bot.user.id}> @everyone", dm)
+
+    assert mes.mentions == [bot.user]
+    assert not mes.mention_everyone
+
+
+@pytest.mark.asyncio
+async def test_dm_mention_uncached(bot: discord.Client) -> None:
+    member = dpytest.get_config().members[0]
+    other = dpytest.backend.make_user("Elsewhere", "0002")
+    dm = await member.create_dm()
+    # The client only holds users weakly, so it may have forgotten them
+    dpytest.backend.get_state()._users.pop(other.id)
+    mes = await dpytest.message(f"<@{other.id}>", dm)
+
+    assert [user.id for user in mes.mentions] == [other.id]
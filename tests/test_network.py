@@ -0,0 +1,82 @@
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+
+import discord
+import pytest
+import discord.ext.commands as commands
+import discord.ext.test as dpytest
+
+
+@pytest.mark.asyncio
+async def test_http_latency(bot: discord.Client) -> None:
+    channel = dpytest.get_config().channels[0]
+    assert isinstance(channel, discord.TextChannel)
+    network = dpytest.simulate_network(routes={"send_message": 0.02})
+
+    start = time.perf_counter()
+    for i in range(4):
+        await channel.send(f"Sequential {i}")
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*(channel.send(f"Gathered {i}") for i in range(4)))
+    gathered = time.perf_counter() - start
+
+    assert sequential >= 0.08
+    assert gathered < sequential - 0.04
+    assert network.http_delays == [0.02] * 8
+
+    assert dpytest.stop_simulating_network() is network
+    await channel.send("Instant")
+    assert len(network.http_delays) == 8
+    await dpytest.empty_queue()
+
+
+@pytest.mark.asyncio
+async def test_gateway_latency(bot: commands.Bot) -> None:
+    seen: list[str] = []
+
+    async def on_message(message: discord.Message) -> None:
+        seen.append(message.content)
+
+    bot.add_listener(on_message)
+    network = dpytest.simulate_network(gateway=dpytest.Uniform(0.001, 0.02), seed=3)
+
+    mes = await dpytest.message("First")
+    # The cache is up to date straight away, and message waits for the delayed handlers
+    assert mes in bot.cached_messages
+    assert seen == ["First"]
+
+    channel = dpytest.get_config().channels[0]
+    member = dpytest.get_config().members[0]
+    for i in range(10):
+        dpytest.backend.make_message(f"Burst {i}", member, channel)
+    assert seen == ["First"]
+    await dpytest.run_all_events()
+    assert seen == ["First"] + [f"Burst {i}" for i in range(10)]
+    assert len(network.gateway_delays) == 11
+    dpytest.stop_simulating_network()
+
+
+def test_distributions(tmp_path: Path) -> None:
+    rng = random.Random(1)
+    assert dpytest.Fixed(0.5).sample(rng) == 0.5
+    assert all(0.1 <= dpytest.Uniform(0.1, 0.2).sample(rng) <= 0.2 for _ in range(100))
+    samples = sorted(dpytest.LogNormal(0.05, 0.5).sample(rng) for _ in range(1001))
+    assert 0.04 < samples[500] < 0.06
+
+    csv_path = tmp_path / "latency.csv"
+    csv_path.write_text("upper_ms,count\n10,0\n20,5\n40,5\n")
+    hist = dpytest.Histogram.load(csv_path)
+    assert all(0.01 <= hist.sample(rng) <= 0.04 for _ in range(100))
+
+    json_path = tmp_path / "latency.json"
+    json_path.write_text(json.dumps({"0.1": 3, "0.2": 1}))
+    hist = dpytest.Histogram.load(json_path)
+    assert all(hist.sample(rng) <= 0.0002 for _ in range(100))
+
+    with pytest.raises(ValueError):
+        dpytest.Histogram({0.1: 0})
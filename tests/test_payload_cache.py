@@ -0,0 +1,61 @@
+import discord
+import pytest
+import discord.ext.test as dpytest
+from discord.ext.test import factories
+
+
+@pytest.mark.asyncio
+async def test_guild_payload_cached(bot: discord.Client) -> None:
+    guild = bot.guilds[0]
+    first = factories.dict_from_object(guild)
+    second = factories.dict_from_object(guild)
+    assert first == second
+    assert first is not second
+    assert first["roles"] is second["roles"]
+
+    # Messages don't change the guild, so the payload stays cached
+    await dpytest.message("Hello")
+    assert factories.dict_from_object(guild)["roles"] is first["roles"]
+
+
+@pytest.mark.asyncio
+async def test_guild_payload_invalidated(bot: discord.Client) -> None:
+    guild = bot.guilds[0]
+    before = factories.dict_from_object(guild)
+
+    role = await guild.create_role(name="Cached")
+    after = factories.dict_from_object(guild)
+    assert len(after["roles"]) == len(before["roles"]) + 1
+
+    cached_role = guild.get_role(role.id)
+    assert cached_role is not None
+    assert factories.dict_from_object(cached_role)["name"] == "Cached"
+    await role.edit(name="Renamed")
+    assert factories.dict_from_object(cached_role)["name"] == "Renamed"
+    fetched = await bot.fetch_guild(guild.id)
+    assert "Renamed" in [r.name for r in fetched.roles]
+
+
+@pytest.mark.asyncio
+async def test_channel_payload_invalidated(bot: discord.Client) -> None:
+    guild = bot.guilds[0]
+    channel = guild.text_channels[0]
+    member = guild.members[0]
+    assert factories.dict_from_object(channel)["permission_overwrites"] == []
+
+    await dpytest.set_permission_overrides(member, channel, send_messages=False)
+    overwrites = factories.dict_from_object(channel)["permission_overwrites"]
+    assert [o["id"] for o in overwrites] == [member.id]
+
+
+@pytest.mark.asyncio
+async def test_payload_cache_per_session(bot: discord.Client) -> None:
+    first = dpytest.get_session()
+    guild = bot.guilds[0]
+    factories.dict_from_object(guild)
+    assert guild.id in first.payloads
+
+    second = dpytest.Session()
+    with second.activate():
+        factories.invalidate()
+    assert guild.id in first.payloads
@@ -1,3 +1,5 @@
+import io
+
 import pytest
 import discord
 import discord.ext.test as dpytest
@@ -53,3 +55,76 @@ async def test_bot_send_not_allowed(bot: discord.Client) -> None:
     await dpytest.set_permission_overrides(g.me, c, perm)
     await dpytest.message("!echo hello", channel=c)
     assert dpytest.verify().message().content("hello")
+
+
+@pytest.mark.asyncio
+async def test_bot_send_embed_file_not_allowed(bot: discord.Client) -> None:
+    g = bot.guilds[0]
+    c = g.text_channels[0]
+
+    await dpytest.set_permission_overrides(g.me, c, embed_links=False, attach_files=False)
+    with pytest.raises(discord.Forbidden):
+        await c.send(embed=discord.Embed(title="Nope"))
+    with pytest.raises(discord.Forbidden):
+        await c.send(file=discord.File(io.BytesIO(b"data"), "data.txt"))
+    assert dpytest.sent_queue.empty()
+
+    await c.send("Plain text is fine")
+    assert dpytest.verify().message().content("Plain text is fine")
+
+
+@pytest.mark.asyncio
+async def test_manage_messages(bot: discord.Client) -> None:
+    g = bot.guilds[0]
+    c = g.text_channels[0]
+    mes = await dpytest.message("Delete me")
+
+    with pytest.raises(discord.Forbidden):
+        await mes.delete()
+    with pytest.raises(discord.Forbidden):
+        await mes.pin()
+    with pytest.raises(discord.Forbidden):
+        await mes.clear_reactions()
+
+    # Cached permissions are dropped when the member's roles change
+    role = await g.create_role(name="Mod", permissions=discord.Permissions(manage_messages=True))
+    await dpytest.add_role(g.me, role)
+    await mes.pin()
+    await mes.delete()
+    assert c.id in {key[0] for key in dpytest.backend.get_config().permissions[g.id]}
+
+
+@pytest.mark.asyncio
+async def test_add_reactions(bot: discord.Client) -> None:
+    g = bot.guilds[0]
+    c = g.text_channels[0]
+    mes = await dpytest.message("React to me")
+    await dpytest.add_reaction(g.members[0], mes, "\N{THUMBS UP SIGN}")
+
+    await dpytest.set_permission_overrides(g.me, c, add_reactions=False)
+    with pytest.raises(discord.Forbidden):
+        await mes.add_reaction("\N{HEAVY BLACK HEART}")
+
+    # Adding to an existing reaction is still allowed
+    await mes.add_reaction("\N{THUMBS UP SIGN}")
+
+
+@pytest.mark.asyncio
+async def test_add_custom_reactions(bot: discord.Client) -> None:
+    g = bot.guilds[0]
+    c = g.text_channels[0]
+    blob = discord.PartialEmoji(name="blob", id=123456789012345678)
+    mes = await dpytest.message("React to me")
+    await dpytest.add_reaction(g.members[0], mes, "<:blob:123456789012345678>")
+
+    await dpytest.set_permission_overrides(g.me, c, add_reactions=False)
+    with pytest.raises(discord.Forbidden):
+        await mes.add_reaction(discord.PartialEmoji(name="other", id=223456789012345678))
+
+    # The same custom emoji is an existing reaction, whatever form it comes in
+    mes = await c.fetch_message(mes.id)
+    await mes.add_reaction(blob)
+    mes = await c.fetch_message(mes.id)
+    assert len(mes.reactions) == 1
+    assert mes.reactions[0].count == 2
+    assert mes.reactions[0].me
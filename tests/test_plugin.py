@@ -0,0 +1,64 @@
+import discord
+import pytest
+import discord.ext.test as dpytest
+
+
+_seen: list[discord.Client] = []
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_shared_bot_changes(dpytest_bot: discord.Client) -> None:
+    _seen.append(dpytest_bot)
+    guild = dpytest_bot.guilds[0]
+    member = guild.members[0]
+
+    role = await guild.create_role(name="Temporary")
+    await member.add_roles(role)
+    await guild.create_text_channel("temporary")
+    await dpytest.member_join(guild, name="Newcomer")
+    await dpytest.message("Hello")
+
+    assert len(guild.roles) == 2
+    assert len(guild.text_channels) == 2
+    assert len(guild.members) == 3
+    assert dpytest.backend.get_config().messages
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_shared_bot_reset(dpytest_bot: discord.Client) -> None:
+    assert _seen == [dpytest_bot]
+    guild = dpytest_bot.guilds[0]
+
+    assert len(guild.roles) == 1
+    assert len(guild.text_channels) == 1
+    assert len(guild.members) == 2
+    assert guild.members[0].roles == [guild.default_role]
+    assert not dpytest.backend.get_config().messages
+    assert dpytest.verify().message().nothing()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_recreates_deleted(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=2)
+    guild = bot.guilds[0]
+    channel = guild.text_channels[0]
+    member = guild.get_member(dpytest.get_config().members[0].id)
+    assert member is not None
+    role = await guild.create_role(name="Kept")
+    await member.add_roles(role)
+    snapshot = dpytest.backend.take_snapshot()
+    count = guild.member_count
+
+    await channel.delete()
+    await member.kick()
+    await role.delete()
+    dpytest.backend.make_lazy_members(guild, ["Extra1", "Extra2"])
+    dpytest.backend.restore_snapshot(snapshot)
+
+    assert guild.get_channel(channel.id) is not None
+    assert await bot.fetch_channel(channel.id) == guild.get_channel(channel.id)
+    restored = guild.get_member(member.id)
+    assert restored is not None
+    assert [r.name for r in restored.roles] == ["@everyone", "Kept"]
+    assert not dpytest.backend.get_config().lazy_members[guild.id]
+    assert guild.member_count == count
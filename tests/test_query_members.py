@@ -0,0 +1,84 @@
+from typing import Any
+
+import discord
+import pytest
+import discord.ext.test as dpytest
+
+
+@pytest.mark.asyncio
+async def test_query_prefix(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=30, lazy_members=True)
+    guild = bot.guilds[0]
+
+    # TestUser1 and TestUser10 to TestUser19
+    found = await guild.query_members("testuser1", limit=20)
+    assert sorted(m.name for m in found) == sorted(["TestUser1"] + [f"TestUser{i}" for i in range(10, 20)])
+    assert all(guild.get_member(m.id) is not None for m in found)
+
+    assert len(await guild.query_members("TestUser", limit=7)) == 7
+    assert await guild.query_members("Nobody") == []
+
+
+@pytest.mark.asyncio
+async def test_query_nick(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=5, lazy_members=True)
+    guild = bot.guilds[0]
+
+    found = await guild.query_members("testuser3_3_n")
+    assert [m.nick for m in found] == ["TestUser3_3_nick"]
+
+    # The index sees members that joined after it was built
+    joined = await dpytest.member_join(name="Newcomer")
+    assert await guild.query_members("newc", cache=False) == [joined]
+
+
+@pytest.mark.asyncio
+async def test_query_user_ids(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=10, lazy_members=True)
+    guild = bot.guilds[0]
+    ids = list(dpytest.backend.get_config().lazy_members[guild.id])[:3]
+
+    found = await guild.query_members(user_ids=ids + [1234], cache=False)
+    assert sorted(m.id for m in found) == sorted(ids)
+    assert all(guild.get_member(i) is None for i in ids)
+
+
+@pytest.mark.asyncio
+async def test_chunk_many(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=2500, lazy_members=True)
+    guild = bot.guilds[0]
+    state = dpytest.backend.get_state()
+    parse_chunk = state.parsers["GUILD_MEMBERS_CHUNK"]
+    chunks: list[int] = []
+
+    def count_chunk(data: Any) -> None:
+        chunks.append(len(data["members"]))
+        parse_chunk(data)
+
+    state.parsers["GUILD_MEMBERS_CHUNK"] = count_chunk
+    try:
+        members = await guild.chunk()
+    finally:
+        state.parsers["GUILD_MEMBERS_CHUNK"] = parse_chunk
+    assert chunks == [1000, 1000, 501]
+    assert len(members) == 2500 + 1
+    assert len(guild.members) == 2500 + 1
+    assert not dpytest.backend.get_config().lazy_members[guild.id]
+
+
+@pytest.mark.asyncio
+async def test_index_updated_in_place(bot: discord.Client) -> None:
+    dpytest.configure(bot, members=5, lazy_members=True)
+    guild = bot.guilds[0]
+    index = dpytest.backend.member_index(guild)
+
+    joined = await dpytest.member_join(name="Newcomer")
+    await joined.edit(nick="Renamed")
+    (kicked,) = await guild.query_members("testuser2")
+    await kicked.kick()
+
+    assert dpytest.backend.member_index(guild) is index
+    fresh = dpytest.backend.MemberIndex(guild, dpytest.backend.get_config().lazy_members[guild.id].values())
+    assert (index.names, index.ids, index.member_ids) == (fresh.names, fresh.ids, fresh.member_ids)
+    assert await guild.query_members("renamed", cache=False) == [joined]
+    assert await guild.query_members("newc", cache=False) == [joined]
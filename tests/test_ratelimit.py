@@ -0,0 +1,76 @@
+import datetime
+
+import discord
+import pytest
+import discord.ext.test as dpytest
+from discord.ext.test import factories
+
+
+@pytest.mark.asyncio
+async def test_raise_on_limit(bot: discord.Client) -> None:
+    config = dpytest.get_config()
+    channel = config.channels[0]
+    assert isinstance(channel, discord.TextChannel)
+
+    limiter = dpytest.enable_rate_limits(on_limit="raise")
+    for i in range(5):
+        await channel.send(f"Message {i}")
+    with pytest.raises(discord.HTTPException) as exc:
+        await channel.send("One too many")
+    assert exc.value.status == 429
+    assert float(exc.value.response.headers["Retry-After"]) > 0
+    assert limiter.limited == 1
+    assert limiter.hits == {"send_message": 1}
+
+    # Buckets are per channel
+    other = await channel.guild.create_text_channel("other")
+    await other.send("Fine")
+    assert dpytest.disable_rate_limits() is limiter
+    await channel.send("Unlimited again")
+    await dpytest.empty_queue()
+
+
+@pytest.mark.asyncio
+async def test_wait_on_logical_clock(bot: discord.Client) -> None:
+    config = dpytest.get_config()
+    channel = config.channels[0]
+    assert isinstance(channel, discord.TextChannel)
+
+    factories.seed(5)
+    try:
+        limiter = dpytest.enable_rate_limits()
+        start = factories.utcnow()
+        for i in range(12):
+            await channel.send(f"Message {i}")
+        assert limiter.requests == 12
+        assert limiter.limited == 2
+        assert factories.utcnow() - start == datetime.timedelta(seconds=10)
+        assert limiter.waited == 10
+    finally:
+        dpytest.disable_rate_limits()
+        factories.seed(None)
+    await dpytest.empty_queue()
+
+
+@pytest.mark.asyncio
+async def test_global_limit(bot: discord.Client) -> None:
+    config = dpytest.get_config()
+    channel = config.channels[0]
+    assert isinstance(channel, discord.TextChannel)
+    mes = await channel.send("Hello")
+
+    limiter = dpytest.enable_rate_limits(routes={}, global_limit=dpytest.RouteLimit(3, 60), on_limit="raise")
+    for _ in range(3):
+        await mes.edit(content="Edited")
+    with pytest.raises(discord.HTTPException) as exc:
+        await mes.pin()
+    assert exc.value.response.headers["X-RateLimit-Global"] == "true"
+    assert limiter.hits == {"pin_message": 1}
+
+    bot.http.max_ratelimit_timeout = 1.0
+    dpytest.enable_rate_limits(routes={}, global_limit=dpytest.RouteLimit(1, 60))
+    await mes.edit(content="Once")
+    with pytest.raises(discord.RateLimited):
+        await mes.edit(content="Twice")
+    dpytest.disable_rate_limits()
+    await dpytest.empty_queue()
@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+
+import discord
+import pytest
+import discord.ext.commands as commands
+import discord.ext.test as dpytest
+
+
+@pytest.mark.asyncio
+async def test_recording(bot: commands.Bot, tmp_path: Path) -> None:
+    @bot.command()
+    async def ping(ctx: commands.Context[commands.Bot]) -> None:
+        await ctx.send("Pong !")
+
+    with dpytest.recording() as recorder:
+        await dpytest.message("!ping")
+        await dpytest.run_all_events()
+    assert dpytest.verify().message().content("Pong !")
+
+    kinds = {(r.kind, r.name) for r in recorder.records}
+    assert ("gateway", "MESSAGE_CREATE") in kinds
+    assert ("http", "send_message") in kinds
+    assert ("callback", "send_message") in kinds
+    assert any(kind == "handler" for kind, _ in kinds)
+    http = next(r for r in recorder.records if r.kind == "http")
+    handler = next(r for r in recorder.records if r.kind == "handler" and r.task == http.task)
+    assert handler.start <= http.start <= http.end <= handler.end
+
+    path = tmp_path / "trace.json"
+    recorder.save_chrome_trace(path)
+    trace = json.loads(path.read_text())
+    complete = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert len(complete) == len(recorder)
+    assert all(e["dur"] >= 0 for e in complete)
+
+    # Stopped recorders leave the client alone
+    await dpytest.message("!ping")
+    assert dpytest.verify().message().content("Pong !")
+    assert "_run_event" not in vars(bot)
+    assert len(recorder) == len(complete)
+
+
+@pytest.mark.asyncio
+async def test_ring_buffer(bot: commands.Bot) -> None:
+    recorder = dpytest.start_recording(capacity=3)
+    channel = dpytest.get_config().channels[0]
+    assert isinstance(channel, discord.TextChannel)
+    for _ in range(5):
+        await channel.send("Hello")
+    assert dpytest.stop_recording() is recorder
+    assert dpytest.stop_recording() is None
+
+    assert len(recorder) == 3
+    assert recorder.dropped > 0
+    await dpytest.empty_queue()
@@ -0,0 +1,106 @@
+import json
+from pathlib import Path
+
+import discord
+import pytest
+import discord.ext.commands as commands
+import discord.ext.test as dpytest
+
+GUILD = 81384788765712384
+CHANNEL = 381887113391505410
+BOT = 159985870458322944
+USER = 80351110224678912
+OTHER = 80088516616269824
+ROLE = 268429328447848458
+
+
+def _user(id_num: int, name: str) -> dict[str, object]:
+    return {"id": str(id_num), "username": name, "discriminator": "0", "global_name": None, "avatar": None}
+
+
+def _message(id_num: int, author: int, content: str, ts: float, mentions: tuple[int, ...] = ()) -> dict[str, object]:
+    return {
+        "op": 0, "t": "MESSAGE_CREATE", "s": id_num % 100, "ts": ts,
+        "d": {
+            "id": str(id_num), "guild_id": str(GUILD), "channel_id": str(CHANNEL), "content": content,
+            "author": _user(author, "recorded"), "member": {"roles": [str(ROLE)], "joined_at": None},
+            "mentions": [_user(m, "mentioned") for m in mentions], "mention_roles": [], "attachments": [],
+            "embeds": [], "pinned": False, "tts": False, "mention_everyone": False,
+            "timestamp": "2024-01-01T00:00:00+00:00", "edited_timestamp": None, "type": 0,
+        },
+    }
+
+
+@pytest.fixture
+def trace(tmp_path: Path) -> Path:
+    frames = [
+        {"op": 10, "d": {"heartbeat_interval": 41250}},
+        {"op": 0, "t": "READY", "s": 1, "ts": 0.0, "d": {"user": _user(BOT, "recorded bot")}},
+        _message(1001, USER, f"hi <@{OTHER}>", 0.0, mentions=(OTHER,)),
+        _message(1002, OTHER, "!ping", 0.01),
+        {"op": 0, "t": "MESSAGE_REACTION_ADD", "s": 4, "ts": 0.02, "d": {
+            "user_id": str(USER), "guild_id": str(GUILD), "channel_id": str(CHANNEL), "message_id": "1002",
+            "emoji": {"id": None, "name": "\N{THUMBS UP SIGN}"}, "type": 0, "burst": False,
+        }},
+        {"op": 0, "t": "MESSAGE_DELETE", "s": 5, "ts": 0.03, "d": {
+            "id": "1001", "guild_id": str(GUILD), "channel_id": str(CHANNEL),
+        }},
+    ]
+    path = tmp_path / "trace.jsonl"
+    path.write_text("\n".join(json.dumps(frame) for frame in frames))
+    return path
+
+
+@pytest.mark.asyncio
+async def test_load_trace(trace: Path) -> None:
+    events = dpytest.load_trace(trace)
+    assert [e.event for e in events] == ["READY", "MESSAGE_CREATE", "MESSAGE_CREATE", "MESSAGE_REACTION_ADD",
+                                         "MESSAGE_DELETE"]
+    assert events[2].time == 0.01
+
+
+@pytest.mark.asyncio
+async def test_replay(bot: commands.Bot, trace: Path) -> None:
+    dpytest.configure(bot, members=2)
+    config = dpytest.get_config()
+    channel = config.channels[0]
+    assert isinstance(channel, discord.TextChannel)
+
+    seen: list[discord.Message] = []
+    reactions: list[discord.Reaction] = []
+    deleted: list[discord.Message] = []
+
+    async def on_message(message: discord.Message) -> None:
+        seen.append(message)
+
+    async def on_reaction_add(reaction: discord.Reaction, user: discord.Member) -> None:
+        reactions.append(reaction)
+
+    async def on_message_delete(message: discord.Message) -> None:
+        deleted.append(message)
+
+    bot.add_listener(on_message)
+    bot.add_listener(on_reaction_add)
+    bot.add_listener(on_message_delete)
+
+    @bot.command()
+    async def ping(ctx: commands.Context[commands.Bot]) -> None:
+        await ctx.send("Pong !")
+
+    report = await dpytest.replay_trace(trace, speed=10)
+
+    assert report.events == 4
+    assert report.skipped == 1
+    assert len(report.latencies) == 4
+    assert report.throughput > 0
+    assert report.percentile(50) <= report.percentile(100)
+    assert "events/s" in report.format()
+
+    first, second = seen[:2]
+    assert first.channel == channel
+    assert {first.author, second.author} == set(config.members)
+    assert first.mentions == [second.author]
+    assert first.content == f"hi <@{second.author.id}>"
+    assert dpytest.verify().message().content("Pong !")
+    assert len(reactions) == 1 and reactions[0].message == second
+    assert deleted == [first]
@@ -0,0 +1,98 @@
+import asyncio
+
+import discord
+import pytest
+import discord.ext.commands as commands
+import discord.ext.test as dpytest
+from discord.ext.test import factories
+from discord.client import _LoopSentinel
+
+
+async def _make_bot() -> commands.Bot:
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    b = commands.Bot(command_prefix="!", intents=intents)
+    if isinstance(b.loop, _LoopSentinel):
+        await b._async_setup_hook()
+    await b.load_extension("tests.internal.cogs.echo")
+    return b
+
+
+@pytest.mark.asyncio
+async def test_configure_returns_session(bot: discord.Client) -> None:
+    session = dpytest.configure(bot)
+    assert dpytest.get_session() is session
+    assert session.runner is not None and session.runner.client is bot
+    assert dpytest.get_config() is session.runner
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sessions(bot: discord.Client) -> None:
+    async def scenario(name: str) -> dpytest.Session:
+        session = dpytest.configure(await _make_bot(), guilds=[name])
+        for _ in range(3):
+            await dpytest.message(f"!echo {name}")
+            await asyncio.sleep(0)
+        for _ in range(3):
+            assert dpytest.verify().message().content(name)
+        assert dpytest.verify().message().nothing()
+        return session
+
+    first, second = await asyncio.gather(scenario("first"), scenario("second"))
+    assert first is not second
+    assert first.runner is not None and first.runner.guilds[0].name == "first"
+    assert second.runner is not None and second.runner.guilds[0].name == "second"
+
+
+@pytest.mark.asyncio
+@pytest.mark.cogs("cogs.echo")
+async def test_activate_session(bot: discord.Client) -> None:
+    first = dpytest.configure(bot)
+    second = dpytest.configure(await _make_bot())
+
+    with first.activate():
+        await dpytest.message("!echo hello")
+        assert dpytest.get_config().client is bot
+    assert second.sent_queue.empty()
+    assert first.sent_queue.qsize() == 1
+    with first.activate():
+        assert dpytest.verify().message().content("hello")
+
+
+@pytest.mark.asyncio
+async def test_seed_per_session(bot: discord.Client) -> None:
+    first = dpytest.configure(bot, seed=1234)
+    second = dpytest.configure(await _make_bot())
+
+    assert second.ids.seed is None
+    with first.activate():
+        assert factories.get_seed() == 1234
+        factories.seed(99)
+    assert second.ids.seed is None
+    assert first.ids.seed == 99
+    assert first.rng is not second.rng
+
+
+@pytest.mark.asyncio
+async def test_send_outside_session(bot: discord.Client) -> None:
+    first = dpytest.configure(bot)
+    second = dpytest.configure(await _make_bot())
+    received: list[discord.Message] = []
+
+    async def on_message(message: discord.Message) -> None:
+        received.append(message)
+
+    assert second.runner is not None
+    second.runner.client.add_listener(on_message)  # type: ignore[attr-defined]
+    channel = bot.guilds[0].text_channels[0]
+    # The second session is current here, but the message belongs to the first bot
+    await channel.send("Hello")
+    await asyncio.sleep(0)
+
+    assert first.sent_queue.qsize() == 1
+    assert second.sent_queue.empty()
+    assert not received
+    assert second.backend is not None and not second.backend.messages
+    with first.activate():
+        assert dpytest.verify().message().content("Hello")
@@ -0,0 +1,92 @@
+import discord
+import pytest
+import discord.ext.commands as commands
+import discord.ext.test as dpytest
+from discord.ext.test import factories
+from discord.client import _LoopSentinel
+
+
+async def _make_bot(**kwargs: int | list[int]) -> commands.AutoShardedBot:
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    b = commands.AutoShardedBot(command_prefix="!", intents=intents, **kwargs)  # type: ignore[arg-type]
+    if isinstance(b.loop, _LoopSentinel):
+        await b._async_setup_hook()
+    return b
+
+
+@pytest.mark.asyncio
+async def test_sharded_configure() -> None:
+    bot = await _make_bot(shard_count=4)
+    dpytest.configure(bot, guilds=8)
+
+    assert len(bot.shards) == 4
+    assert len(bot.guilds) == 8
+    for guild in bot.guilds:
+        assert guild.shard_id == (guild.id >> 22) % 4
+
+    await dpytest.message("Hello")
+    channel = dpytest.get_config().channels[0]
+    ws = bot._get_websocket(channel.guild.id)
+    assert ws.sequence is not None and ws.sequence > 0
+
+
+@pytest.mark.asyncio
+async def test_sharded_routing() -> None:
+    bot = await _make_bot(shard_count=2, shard_ids=[0])
+    dpytest.configure(bot, guilds=0)
+
+    base = factories.make_id() >> 22 << 22
+    on_zero = base if (base >> 22) % 2 == 0 else base + (1 << 22)
+    guild = dpytest.backend.make_guild("Shard 0", id_num=on_zero)
+    assert guild is not None and guild.shard_id == 0
+
+    # This client doesn't run shard 1, so it never hears about the guild
+    missing = dpytest.backend.make_guild("Shard 1", id_num=on_zero + (1 << 22))
+    assert missing.shard_id == 1
+    assert bot.get_guild(missing.id) is None
+    assert list(bot.guilds) == [guild]
+
+
+@pytest.mark.asyncio
+async def test_sharded_subset_configure() -> None:
+    bot = await _make_bot(shard_count=3, shard_ids=[0])
+    dpytest.configure(bot, guilds=6, members=2)
+
+    assert len(bot.guilds) == 6
+    assert all(guild.shard_id == 0 for guild in bot.guilds)
+    assert len(dpytest.get_config().channels) == 12
+    assert len(dpytest.get_config().members) == 12
+    ids = [guild.id for guild in bot.guilds]
+    assert len(set(ids)) == 6
+    assert factories.make_id() > max(ids)
+
+
+@pytest.mark.asyncio
+async def test_sharded_latency_presence() -> None:
+    bot = await _make_bot(shard_count=2)
+    dpytest.configure(bot)
+
+    dpytest.backend.set_latency(0.25, shard_id=1)
+    assert dict(bot.latencies)[1] == 0.25
+
+    dpytest.backend.set_latency(0.1)
+    assert bot.latency == pytest.approx(0.1)
+
+    await bot.change_presence(activity=discord.Game("on shard 1"), shard_id=1)
+    ws = bot.shards[1]._parent.ws
+    assert isinstance(ws, dpytest.websocket.FakeWebSocket)
+    assert isinstance(ws.activity, discord.Game) and ws.activity.name == "on shard 1"
+    assert bot.shards[0]._parent.ws.activity is None  # type: ignore[attr-defined]
+
+
+@pytest.mark.asyncio
+async def test_sharded_spread() -> None:
+    bot = await _make_bot(shard_count=5)
+    dpytest.configure(bot, guilds=10)
+
+    counts = [0] * 5
+    for guild in bot.guilds:
+        counts[guild.shard_id] += 1
+    assert counts == [2] * 5
@@ -0,0 +1,52 @@
+import discord
+import pytest
+from discord.ext.test import factories
+
+
+def test_ids_increase() -> None:
+    gen = factories.SnowflakeGenerator()
+    ids = [gen() for _ in range(10_000)]
+    assert ids == sorted(set(ids))
+    assert all(id_num >> 17 & 0x1F == 1 for id_num in ids)
+
+
+def test_counter_overflow() -> None:
+    gen = factories.SnowflakeGenerator(seed=1)
+    ids = [gen() for _ in range(5000)]
+    assert ids == sorted(set(ids))
+    # The counter never spills into the worker and process bits
+    assert {id_num >> 12 & 0x3FF for id_num in ids} == {1 << 5}
+    assert discord.utils.snowflake_time(ids[-1]) > discord.utils.snowflake_time(ids[0])
+
+
+def test_seeded_ids() -> None:
+    first = factories.SnowflakeGenerator(seed=42)
+    second = factories.SnowflakeGenerator(seed=42)
+    other = factories.SnowflakeGenerator(seed=43)
+    ids = [first() for _ in range(100)]
+    assert ids == [second() for _ in range(100)]
+    assert ids != [other() for _ in range(100)]
+
+
+def test_xdist_process_id(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw3")
+    gen = factories.SnowflakeGenerator()
+    assert gen() >> 12 & 0x1F == 3
+
+
+def test_seed_ids() -> None:
+    factories.seed_ids(7)
+    try:
+        first = [factories.make_id() for _ in range(3)]
+        factories.seed_ids(7)
+        assert [factories.make_id() for _ in range(3)] == first
+    finally:
+        factories.seed_ids(None)
+
+
+def test_unseeded_ids_shared() -> None:
+    ids = []
+    for _ in range(100):
+        factories.seed_ids(None)
+        ids.append(factories.make_id())
+    assert ids == sorted(set(ids))
@@ -0,0 +1,111 @@
+import asyncio
+
+import discord
+import pytest
+import discord.ext.commands as commands
+import discord.ext.test as dpytest
+from discord.ext.test import callbacks
+from discord.ext.test.callbacks import CallbackEvent
+
+
+@pytest.mark.asyncio
+async def test_stream_actions(bot: commands.Bot) -> None:
+    guild = bot.guilds[0]
+    channel = guild.text_channels[0]
+    member = guild.members[0]
+
+    @bot.command()
+    async def promote(ctx: commands.Context[commands.Bot]) -> None:
+        role = await ctx.guild.create_role(name="Promoted")  # type: ignore[union-attr]
+        await ctx.author.add_roles(role)  # type: ignore[union-attr]
+        mes = await ctx.send("Promoted!")
+        await mes.add_reaction("\N{PARTY POPPER}")
+
+    async with dpytest.events(timeout=0.1) as stream:
+        await dpytest.message("!promote", member=member)
+        actions = [action async for action in stream]
+
+    assert [a.kind for a in actions] == ["create_role", "add_role", "send_message", "add_reaction"]
+    assert actions[1].member == member
+    assert actions[1].role == actions[0].role
+    assert actions[2].message is not None and actions[2].message.content == "Promoted!"
+    assert actions[2].channel == channel
+    assert actions[3].guild == guild
+    await dpytest.empty_queue()
+
+
+@pytest.mark.asyncio
+async def test_stream_filters(bot: discord.Client) -> None:
+    dpytest.configure(bot, text_channels=2)
+    first, second = bot.guilds[0].text_channels
+
+    with dpytest.events(kinds=["send_message"], channel=second) as stream:
+        await first.send("First")
+        mes = await second.send("Second")
+        await mes.edit(content="Edited")
+        assert stream.pending == 1
+        action = stream.get_nowait()
+        assert action is not None and action.message == mes
+    assert stream.get_nowait() is None
+    await dpytest.empty_queue()
+
+
+@pytest.mark.asyncio
+async def test_stream_overflow(bot: discord.Client) -> None:
+    channel = bot.guilds[0].text_channels[0]
+    stream = dpytest.events(kinds=["send_message"], maxsize=3)
+    for i in range(5):
+        await channel.send(f"Message {i}")
+    stream.close()
+    await channel.send("After close")
+
+    assert stream.received == 5
+    assert stream.dropped == 2
+    assert [a.message.content async for a in stream if a.message] == ["Message 2", "Message 3", "Message 4"]
+    await dpytest.empty_queue()
+
+
+@pytest.mark.asyncio
+async def test_stream_waits(bot: discord.Client) -> None:
+    channel = bot.guilds[0].text_channels[0]
+    stream = dpytest.events(kinds=["send_message"])
+
+    async def send_later() -> None:
+        await asyncio.sleep(0.01)
+        await channel.send("Later")
+
+    task = asyncio.create_task(send_later())
+    action = await stream.get(timeout=1.0)
+    assert action is not None and action.kind == "send_message"
+    await task
+
+    stream.close()
+    assert await stream.get() is None
+    await dpytest.empty_queue()
+
+
+@pytest.mark.asyncio
+async def test_stream_survives_reset(bot: discord.Client) -> None:
+    channel = bot.guilds[0].text_channels[0]
+
+    with dpytest.events(kinds=["send_message"]) as stream:
+        await dpytest.reset()
+        await channel.send("After reset")
+        action = stream.get_nowait()
+        assert action is not None and action.message is not None
+        assert action.message.content == "After reset"
+    await dpytest.empty_queue()
+
+
+@pytest.mark.asyncio
+async def test_reset_drops_subscribers(bot: discord.Client) -> None:
+    channel = bot.guilds[0].text_channels[0]
+    seen: list[str] = []
+    callbacks.subscribe(CallbackEvent.send_message, lambda m: seen.append(m.content))
+
+    with dpytest.events(kinds=["send_message"]) as stream:
+        await dpytest.reset()
+        await channel.send("After reset")
+        assert stream.get_nowait() is not None
+    assert seen == []
+    await dpytest.empty_queue()
@@ -0,0 +1,66 @@
+import discord
+import pytest
+from discord.ext import commands
+
+import discord.ext.test as dpytest
+
+
+@pytest.mark.asyncio
+async def test_member_update_keeps_fields(bot: commands.Bot) -> None:
+    guild = bot.guilds[0]
+    role = guild.get_role((await guild.create_role(name="Keep")).id)
+    assert role is not None
+    member = dpytest.get_config().members[0]
+    await dpytest.add_role(member, role)
+    avatar = member._user._avatar
+
+    dpytest.backend.update_member(member, nick="Renamed")
+    assert member.nick == "Renamed"
+    assert [r.id for r in member.roles] == [guild.id, role.id]
+    assert member._user._avatar == avatar
+
+    dpytest.backend.update_member(member, roles=[])
+    assert member.nick == "Renamed"
+    assert member.roles == [guild.default_role]
+
+
+@pytest.mark.asyncio
+async def test_role_update_payload(bot: commands.Bot) -> None:
+    guild = bot.guilds[0]
+    role = guild.get_role((await guild.create_role(name="Before", hoist=True)).id)
+    assert role is not None
+
+    dpytest.backend.update_role(role, colour=0xFF0000, name="After")
+    assert role.name == "After"
+    assert role.colour.value == 0xFF0000
+    assert role.hoist
+
+
+@pytest.mark.asyncio
+async def test_update_members(bot: commands.Bot) -> None:
+    dpytest.configure(bot, members=3)
+    guild = bot.guilds[0]
+    config = dpytest.get_config()
+    old = guild.get_role((await guild.create_role(name="Old")).id)
+    new = guild.get_role((await guild.create_role(name="New")).id)
+    assert old is not None and new is not None
+    await dpytest.add_role(config.members[0], old)
+    await dpytest.add_role(config.members[2], new)
+
+    updates = []
+
+    async def on_member_update(before: discord.Member, after: discord.Member) -> None:
+        updates.append(after)
+
+    bot.add_listener(on_member_update)
+    try:
+        updated = dpytest.backend.update_members(config.members, add=[new], remove=[old])
+        await dpytest.run_all_events()
+    finally:
+        bot.remove_listener(on_member_update)
+
+    assert updated == [config.members[0], config.members[1]]  # the last one already had only the new role
+    assert updates == updated
+    for member in config.members:
+        assert new in member.roles
+        assert old not in member.roles
@@ -0,0 +1,62 @@
+import zlib
+
+import discord
+import pytest
+import discord.ext.commands as commands
+import discord.ext.test as dpytest
+from discord.client import _LoopSentinel
+from discord.ext.test.websocket import FakeWebSocket
+
+
+async def _make_bot() -> commands.Bot:
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    b = commands.Bot(command_prefix="!", intents=intents)
+    if isinstance(b.loop, _LoopSentinel):
+        await b._async_setup_hook()
+
+    @b.command()
+    async def ping(ctx: commands.Context[commands.Bot]) -> None:
+        await ctx.send("Pong !")
+
+    return b
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("wire_format", ["json", "zlib-stream"])
+async def test_wire_format(wire_format: str) -> None:
+    bot = await _make_bot()
+    dpytest.configure(bot, wire_format=wire_format)  # type: ignore[arg-type]
+    assert isinstance(bot.ws, FakeWebSocket)
+    assert bot.ws.wire_format == wire_format
+
+    frames = []
+
+    async def on_socket_event_type(event: str) -> None:
+        frames.append(event)
+
+    bot.add_listener(on_socket_event_type)
+
+    sequence = bot.ws.sequence or 0
+    await dpytest.message("!ping")
+    assert dpytest.verify().message().content("Pong !")
+    assert bot.ws.sequence == sequence + 2  # the message, and the bot's reply
+    assert frames == ["MESSAGE_CREATE", "MESSAGE_CREATE"]
+
+
+@pytest.mark.asyncio
+async def test_zlib_frames() -> None:
+    bot = await _make_bot()
+    dpytest.configure(bot, wire_format="zlib-stream")
+    assert isinstance(bot.ws, FakeWebSocket)
+
+    # Start a new stream, as the configure events already went through the current one
+    bot.ws.set_wire_format("zlib-stream")
+    frame = bot.ws.make_frame("TYPING_START", {"channel_id": 0, "user_id": 0, "timestamp": 0})
+    assert isinstance(frame, bytes)
+    assert frame.endswith(b"\x00\x00\xff\xff")
+    assert b'"t":"TYPING_START"' in zlib.decompressobj().decompress(frame)
+
+    with pytest.raises(ValueError):
+        bot.ws.set_wire_format("etf")  # type: ignore[arg-type]